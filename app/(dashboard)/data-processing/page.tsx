@@ -286,6 +286,7 @@ export default function DataProcessingPage() {
               audioId={selectedLongAudio.id}
               audioPath={selectedLongAudio.path || ""}
               audioUrl={`/api/data/audio/${selectedLongAudio.savedAs || selectedLongAudio.id}`}
+              peaksUrl={`/api/data/peaks/${selectedLongAudio.id}`}
               filename={selectedLongAudio.filename}
               onComplete={handleChunkingComplete}
               onCancel={() => setSelectedLongAudio(null)}
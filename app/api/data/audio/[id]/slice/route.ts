@@ -0,0 +1,55 @@
+import { NextRequest, NextResponse } from "next/server";
+
+export const dynamic = "force-dynamic";
+
+export async function GET(
+  request: NextRequest,
+  { params }: { params: Promise<{ id: string }> }
+) {
+  try {
+    const { id } = await params;
+    const backendUrl = process.env.BACKEND_URL;
+
+    if (!backendUrl) {
+      return NextResponse.json(
+        { success: false, error: "Audio slices require BACKEND_URL" },
+        { status: 501 }
+      );
+    }
+
+    const query = request.nextUrl.searchParams.toString();
+    const ifNoneMatch = request.headers.get("if-none-match");
+    const response = await fetch(
+      `${backendUrl}/api/data/audio/${encodeURIComponent(id)}/slice${query ? `?${query}` : ""}`,
+      { headers: ifNoneMatch ? { "If-None-Match": ifNoneMatch } : {} }
+    );
+
+    if (response.status === 304) {
+      return new Response(null, {
+        status: 304,
+        headers: { ETag: response.headers.get("ETag") || "" },
+      });
+    }
+
+    if (!response.ok || !response.body) {
+      const error = await response.json().catch(() => ({}));
+      return NextResponse.json(
+        { success: false, error: error.detail || "Failed to slice audio" },
+        { status: response.status }
+      );
+    }
+
+    return new Response(response.body, {
+      headers: {
+        "Content-Type": response.headers.get("Content-Type") || "audio/ogg",
+        ETag: response.headers.get("ETag") || "",
+      },
+    });
+  } catch (error) {
+    console.error("Audio slice error:", error);
+    return NextResponse.json(
+      { success: false, error: "Failed to slice audio" },
+      { status: 500 }
+    );
+  }
+}
@@ -0,0 +1,34 @@
+import { NextRequest, NextResponse } from "next/server";
+
+export const dynamic = "force-dynamic";
+
+export async function GET(
+  request: NextRequest,
+  { params }: { params: Promise<{ id: string }> }
+) {
+  try {
+    const { id } = await params;
+    const backendUrl = process.env.BACKEND_URL;
+
+    if (!backendUrl) {
+      return NextResponse.json(
+        { success: false, error: "Waveform peaks require BACKEND_URL" },
+        { status: 501 }
+      );
+    }
+
+    const query = request.nextUrl.searchParams.toString();
+    const response = await fetch(
+      `${backendUrl}/api/data/peaks/${encodeURIComponent(id)}${query ? `?${query}` : ""}`
+    );
+
+    const result = await response.json();
+    return NextResponse.json(result, { status: response.status });
+  } catch (error) {
+    console.error("Peaks error:", error);
+    return NextResponse.json(
+      { success: false, error: "Failed to load waveform peaks" },
+      { status: 500 }
+    );
+  }
+}
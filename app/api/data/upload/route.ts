@@ -48,6 +48,13 @@ export async function POST(request: NextRequest) {
         size: buffer.length,
         path: filepath,
       });
+
+      // Let the backend build the waveform peaks now rather than on first view
+      if (process.env.BACKEND_URL) {
+        fetch(`${process.env.BACKEND_URL}/api/data/peaks/${fileId}?width=1`).catch((err) =>
+          console.error("Peaks precompute failed:", err)
+        );
+      }
     }
 
     return NextResponse.json({
@@ -0,0 +1,50 @@
+import { NextRequest, NextResponse } from "next/server";
+
+export const dynamic = "force-dynamic";
+
+export async function POST(request: NextRequest) {
+  try {
+    const config = await request.json();
+
+    if (!config.text || !config.text.trim()) {
+      return NextResponse.json(
+        { success: false, error: "Text is required" },
+        { status: 400 }
+      );
+    }
+
+    const backendUrl = process.env.BACKEND_URL;
+
+    if (!backendUrl) {
+      return NextResponse.json(
+        { success: false, error: "Streaming requires BACKEND_URL" },
+        { status: 501 }
+      );
+    }
+
+    const response = await fetch(`${backendUrl}/api/inference/generate/stream`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify(config),
+    });
+
+    if (!response.ok || !response.body) {
+      throw new Error("Backend streaming API error");
+    }
+
+    // Pass audio chunks through as they arrive
+    return new Response(response.body, {
+      headers: {
+        "Content-Type": response.headers.get("Content-Type") || "audio/wav",
+        "Cache-Control": "no-cache",
+        "X-Sample-Rate": response.headers.get("X-Sample-Rate") || "24000",
+      },
+    });
+  } catch (error) {
+    console.error("Streaming inference error:", error);
+    return NextResponse.json(
+      { success: false, error: "Streaming inference failed" },
+      { status: 500 }
+    );
+  }
+}
@@ -0,0 +1 @@
+# Benchmarks (run with python -m backend.benchmarks.<name>)
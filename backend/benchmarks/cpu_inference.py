@@ -0,0 +1,94 @@
+"""
+CPU inference benchmark - real-time factor before and after CPU optimizations
+
+Usage:
+    python -m backend.benchmarks.cpu_inference [--model NAME] [--runs 3] [--threads 8]
+
+RTF = synthesis time / audio duration (lower is better, < 1 is faster than real time).
+"""
+import argparse
+import time
+
+SENTENCES = [
+    "Привет! Это короткая проверка синтеза речи.",
+    "Модель должна звучать естественно даже на процессоре, без видеокарты.",
+    "Длинные предложения нагружают авторегрессионный декодер сильнее всего, поэтому они важны для оценки "
+    "производительности на серверах без графического ускорителя.",
+]
+
+
+def _benchmark(registry, model_name: str, speaker_wav: str, runs: int, language: str) -> dict:
+    import torch
+
+    from ..workers.inference import SAMPLE_RATE
+    from ..workers.speaker_cache import speaker_latent_cache
+
+    load_started = time.perf_counter()
+    model, model_id = registry.get(model_name)
+    load_time = time.perf_counter() - load_started
+
+    with torch.inference_mode():
+        gpt_cond_latent, speaker_embedding = speaker_latent_cache.get(model, model_id, speaker_wav)
+
+        # Warmup (first call allocates buffers / triggers compilation)
+        model.inference(SENTENCES[0], language, gpt_cond_latent, speaker_embedding)
+
+        synth_time = 0.0
+        audio_time = 0.0
+        for _ in range(runs):
+            for text in SENTENCES:
+                started = time.perf_counter()
+                out = model.inference(text, language, gpt_cond_latent, speaker_embedding)
+                synth_time += time.perf_counter() - started
+                audio_time += len(out["wav"]) / SAMPLE_RATE
+
+    return {
+        "load_time": load_time,
+        "synthesis_time": synth_time,
+        "audio_time": audio_time,
+        "rtf": synth_time / audio_time if audio_time else float("inf"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="XTTS CPU real-time factor benchmark")
+    parser.add_argument("--model", default=None, help="Registry model name (default: base model)")
+    parser.add_argument("--speaker", default=None, help="Speaker reference WAV")
+    parser.add_argument("--language", default="ru")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=0, help="Intra-op threads for the optimized run")
+    parser.add_argument("--interop-threads", type=int, default=0)
+    parser.add_argument("--compile", action="store_true", help="Also torch.compile the vocoder")
+    args = parser.parse_args()
+
+    import torch
+
+    from ..workers.inference import inference_worker
+    from ..workers.models import ModelRegistry, configure_cpu_threads
+
+    speaker_wav = inference_worker.resolve_speaker(args.speaker)
+    default_threads = torch.get_num_threads()
+
+    print(f"Baseline: fp32, {default_threads} threads")
+    baseline = _benchmark(
+        ModelRegistry(device="cpu", cpu_quantize=False, compile=False),
+        args.model, speaker_wav, args.runs, args.language,
+    )
+
+    configure_cpu_threads(args.threads, args.interop_threads)
+    print(f"Optimized: int8 dynamic quantization, {torch.get_num_threads()} threads"
+          f"{', torch.compile' if args.compile else ''}")
+    optimized = _benchmark(
+        ModelRegistry(device="cpu", cpu_quantize=True, compile=args.compile),
+        args.model, speaker_wav, args.runs, args.language,
+    )
+
+    print()
+    print(f"{'':12}{'load s':>10}{'synth s':>10}{'audio s':>10}{'RTF':>8}")
+    for label, r in (("baseline", baseline), ("optimized", optimized)):
+        print(f"{label:12}{r['load_time']:>10.1f}{r['synthesis_time']:>10.1f}{r['audio_time']:>10.1f}{r['rtf']:>8.2f}")
+    print(f"\nSpeedup: {baseline['rtf'] / optimized['rtf']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
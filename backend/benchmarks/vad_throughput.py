@@ -0,0 +1,105 @@
+"""
+VAD throughput benchmark - torch.hub Silero vs the batched ONNX engine
+
+Usage:
+    python -m backend.benchmarks.vad_throughput [--audio FILE] [--seconds 600] [--threads 1] [--lanes 1]
+
+Throughput is audio seconds per wall-clock second (higher is better). Both
+engines score the same 16 kHz audio; the segments they produce are compared
+at the end and the benchmark exits with status 1 when they differ (by more
+than --tolerance-ms, 0 by default).
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+
+def _synthetic(seconds: float, sample_rate: int = 16000) -> np.ndarray:
+    """Alternating tone bursts and near-silence, so both engines find segments"""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    voiced = (np.sin(2 * np.pi * t / 7) > 0).astype(np.float32)
+    carrier = 0.3 * np.sin(2 * np.pi * 180 * t) * (1 + 0.5 * np.sin(2 * np.pi * 4 * t))
+    return (voiced * carrier + 0.003 * rng.standard_normal(len(t))).astype(np.float32)
+
+
+def _load(path: str, seconds: float) -> np.ndarray:
+    from ..workers import audio_io
+
+    audio, sample_rate = audio_io.read_range(path, 0, seconds)
+    return audio_io.resample(audio, sample_rate, 16000).numpy()
+
+
+def _run(label: str, score, audio: np.ndarray) -> tuple[np.ndarray, float]:
+    from ..workers.vad import speech_segments
+
+    score(audio[:16000])  # warmup
+    started = time.perf_counter()
+    probs, num_samples = score(audio)
+    elapsed = time.perf_counter() - started
+    segments = speech_segments(probs, num_samples)
+    speed = len(audio) / 16000 / elapsed
+    print(f"{label:8}{elapsed:>10.2f}{speed:>12.1f}x{len(segments):>10}")
+    return segments, speed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Silero VAD throughput benchmark")
+    parser.add_argument("--audio", default=None, help="Audio file (default: synthetic audio)")
+    parser.add_argument("--seconds", type=float, default=600)
+    parser.add_argument("--threads", type=int, default=1, help="ONNX intra-op threads")
+    parser.add_argument("--lanes", type=int, default=1, help="ONNX lanes scored per step (>1 approximates)")
+    parser.add_argument("--overlap", type=int, default=64, help="Warm-up frames per lane")
+    parser.add_argument("--torch-threads", type=int, default=1, help="torch threads for the baseline")
+    parser.add_argument("--tolerance-ms", type=float, default=0, help="Allowed segment boundary difference")
+    args = parser.parse_args()
+
+    import torch
+
+    from ..workers.vad_onnx import SileroOnnx, find_model, WINDOW
+
+    audio = _load(args.audio, args.seconds) if args.audio else _synthetic(args.seconds)
+    print(f"{len(audio) / 16000:.0f}s of audio")
+
+    model, _ = torch.hub.load("snakers4/silero-vad", "silero_vad", onnx=False, trust_repo=True)
+    torch.set_num_threads(args.torch_threads)
+
+    def torch_score(samples):
+        model.reset_states()
+        tensor = torch.from_numpy(samples)
+        padded = torch.nn.functional.pad(tensor, (0, -len(tensor) % WINDOW))
+        with torch.inference_mode():
+            probs = [model(frame, 16000).item() for frame in padded.split(WINDOW)]
+        return probs, len(samples)
+
+    model_path = find_model()
+    if model_path is None:
+        raise SystemExit("silero_vad.onnx not found; install silero-vad or set VAD_ONNX_MODEL")
+    onnx = SileroOnnx(model_path, threads=args.threads, lanes=args.lanes, overlap=args.overlap)
+
+    def onnx_score(samples):
+        return onnx.probabilities([samples])
+
+    print(f"\n{'':8}{'wall s':>10}{'speed':>13}{'segments':>10}")
+    torch_segments, torch_speed = _run("torch", torch_score, audio)
+    onnx_segments, onnx_speed = _run("onnx", onnx_score, audio)
+
+    print(f"\nSpeedup: {onnx_speed / torch_speed:.2f}x")
+    if len(torch_segments) != len(onnx_segments):
+        print(f"FAIL: segment counts differ: torch {len(torch_segments)}, onnx {len(onnx_segments)}")
+        sys.exit(1)
+
+    drift = max(
+        (max(abs(a["start"] - b["start"]), abs(a["end"] - b["end"])) for a, b in zip(torch_segments, onnx_segments)),
+        default=0,
+    )
+    if drift / 16 > args.tolerance_ms:
+        print(f"FAIL: max boundary difference {drift / 16:.0f} ms (tolerance {args.tolerance_ms:g} ms)")
+        sys.exit(1)
+    print(f"Segments match; max boundary difference {drift / 16:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
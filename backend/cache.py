@@ -0,0 +1,104 @@
+"""
+Shared caching helpers - in-memory LRU and content hashing
+"""
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Hashable, Optional
+import hashlib
+import threading
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU cache with a fixed number of entries"""
+
+    def __init__(self, max_size: int = 128):
+        self.max_size = max_size
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def discard_where(self, predicate: callable) -> int:
+        """Remove all entries whose key matches predicate"""
+        with self._lock:
+            stale = [k for k in self._data if predicate(k)]
+            for k in stale:
+                del self._data[k]
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+# path -> (size, mtime_ns, digest)
+_hash_memo: dict[str, tuple[int, int, str]] = {}
+_hash_lock = threading.Lock()
+
+
+def file_hash(path: str | Path, block_size: int = 1 << 20) -> str:
+    """
+    SHA-256 of file contents
+
+    The digest is memoized per (path, size, mtime) so repeated lookups of an
+    unchanged file only cost a stat() call.
+    """
+    path = str(path)
+    st = Path(path).stat()
+
+    with _hash_lock:
+        memo = _hash_memo.get(path)
+    if memo and memo[0] == st.st_size and memo[1] == st.st_mtime_ns:
+        return memo[2]
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(block_size):
+            h.update(block)
+    digest = h.hexdigest()
+
+    with _hash_lock:
+        _hash_memo[path] = (st.st_size, st.st_mtime_ns, digest)
+    return digest
+
+
+def cached_file_hash(path: str | Path) -> Optional[str]:
+    """Return memoized hash for path without reading the file, if known"""
+    with _hash_lock:
+        memo = _hash_memo.get(str(path))
+    return memo[2] if memo else None
+
+
+def forget_file_hash(path: str | Path):
+    """Drop memoized hash for path"""
+    with _hash_lock:
+        _hash_memo.pop(str(path), None)
+
+
+def short_key(value: str, length: int = 12) -> str:
+    """Short stable identifier for arbitrary strings (model ids, paths)"""
+    return hashlib.sha1(value.encode("utf-8")).hexdigest()[:length]
@@ -29,5 +29,127 @@ PORT = int(os.getenv("PORT", 8000))
 WHISPER_MODEL = os.getenv("WHISPER_MODEL", "large-v3")
 WHISPER_DEVICE = os.getenv("WHISPER_DEVICE", "cuda")
 WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "float16")
+# Chunks per batched Whisper call when transcribing VAD chunks, and their beam size
+WHISPER_BATCH_SIZE = int(os.getenv("WHISPER_BATCH_SIZE", 16))
+WHISPER_BATCH_BEAM_SIZE = int(os.getenv("WHISPER_BATCH_BEAM_SIZE", 5))
+# Multi-file transcription: one model replica per device index ("0,1"), each
+# serving WHISPER_NUM_WORKERS transcriptions at once, fed by a decode pool
+WHISPER_DEVICE_INDEX = [int(i) for i in os.getenv("WHISPER_DEVICE_INDEX", "0").split(",") if i.strip()]
+WHISPER_NUM_WORKERS = int(os.getenv("WHISPER_NUM_WORKERS", 1))
+WHISPER_DECODE_WORKERS = int(os.getenv("WHISPER_DECODE_WORKERS", 4))
 
 XTTS_MODEL = os.getenv("XTTS_MODEL", "tts_models/multilingual/multi-dataset/xtts_v2")
+
+# Speaker conditioning latent cache
+SPEAKER_LATENT_CACHE_SIZE = int(os.getenv("SPEAKER_LATENT_CACHE_SIZE", 64))
+SPEAKER_LATENT_CACHE_DIR = CACHE_DIR / "speaker_latents"
+SPEAKER_LATENT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+# Inference queue / admission control
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", 16))
+INFERENCE_QUEUE_MAX_CHARS = int(os.getenv("INFERENCE_QUEUE_MAX_CHARS", 20000))
+INFERENCE_TIMEOUT = float(os.getenv("INFERENCE_TIMEOUT", 120))
+# Default deadlines grow with request cost: at least this many seconds per
+# character, so long-text / audiobook requests are not held to INFERENCE_TIMEOUT
+INFERENCE_TIMEOUT_PER_CHAR = float(os.getenv("INFERENCE_TIMEOUT_PER_CHAR", 0.1))
+
+# Long-text synthesis
+LONG_TEXT_THRESHOLD = int(os.getenv("LONG_TEXT_THRESHOLD", 500))
+LONG_TEXT_CROSSFADE_MS = int(os.getenv("LONG_TEXT_CROSSFADE_MS", 40))
+
+# Generated audio result cache
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", 5000))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+RESULT_CACHE_MAX_AGE = float(os.getenv("RESULT_CACHE_MAX_AGE", 30 * 24 * 3600))
+
+# Model registry residency budgets (MB)
+MODEL_DEVICE_BUDGET_MB = int(os.getenv("MODEL_DEVICE_BUDGET_MB", 8192))
+MODEL_HOST_BUDGET_MB = int(os.getenv("MODEL_HOST_BUDGET_MB", 16384))
+
+# XTTS serving device and CPU tuning
+XTTS_DEVICE = os.getenv("XTTS_DEVICE", "auto")  # auto, cuda, cuda:N or cpu
+XTTS_CPU_QUANTIZE = os.getenv("XTTS_CPU_QUANTIZE", "1") == "1"
+XTTS_CPU_THREADS = int(os.getenv("XTTS_CPU_THREADS", 0))  # 0 = torch default
+XTTS_CPU_INTEROP_THREADS = int(os.getenv("XTTS_CPU_INTEROP_THREADS", 0))
+XTTS_COMPILE = os.getenv("XTTS_COMPILE", "0") == "1"
+
+# Startup preloading: comma-separated xtts, xtts:<model name>, whisper, vad
+PRELOAD_MODELS = [m.strip() for m in os.getenv("PRELOAD_MODELS", "xtts,whisper,vad").split(",") if m.strip()]
+WARMUP = os.getenv("WARMUP", "1") == "1"
+
+# Multi-process inference pool: comma-separated worker devices, e.g.
+# "cuda:0,cuda:1" or "cpu:0-15,cpu:16-31" ("+" joins CPU ranges: cpu:0-7+16-23).
+# Empty runs synthesis in the server process.
+INFERENCE_POOL = [w.strip() for w in os.getenv("INFERENCE_POOL", "").split(",") if w.strip()]
+POOL_HEALTH_INTERVAL = float(os.getenv("POOL_HEALTH_INTERVAL", 5))
+POOL_PING_TIMEOUT = float(os.getenv("POOL_PING_TIMEOUT", 30))
+# Respawn backoff: doubles from POOL_RESTART_BACKOFF up to _MAX per failure in
+# a row; a worker that fails POOL_MAX_FAILED_STARTS times before becoming
+# ready is given up on and keeps its error
+POOL_RESTART_BACKOFF = float(os.getenv("POOL_RESTART_BACKOFF", 5))
+POOL_RESTART_BACKOFF_MAX = float(os.getenv("POOL_RESTART_BACKOFF_MAX", 300))
+POOL_MAX_FAILED_STARTS = int(os.getenv("POOL_MAX_FAILED_STARTS", 5))
+
+# Batch synthesis jobs
+BATCH_DIR = OUTPUT_DIR / "batches"
+BATCH_DIR.mkdir(parents=True, exist_ok=True)
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", 100000))
+
+# Speaker index: seconds between SPEAKERS_DIR change checks (0 disables the watcher)
+SPEAKER_INDEX_POLL_INTERVAL = float(os.getenv("SPEAKER_INDEX_POLL_INTERVAL", 5))
+
+# Speaker reference ingestion: uploads are stored as mono PCM_16 WAV at the
+# rate XTTS conditions on, silence-trimmed and capped in length
+SPEAKER_REF_SAMPLE_RATE = int(os.getenv("SPEAKER_REF_SAMPLE_RATE", 22050))
+SPEAKER_REF_MAX_SECONDS = float(os.getenv("SPEAKER_REF_MAX_SECONDS", 30))
+SPEAKER_REF_TRIM_DB = float(os.getenv("SPEAKER_REF_TRIM_DB", 40))
+SPEAKER_ORIGINALS_DIR = SPEAKERS_DIR / "originals"
+SPEAKER_ORIGINALS_DIR.mkdir(parents=True, exist_ok=True)
+
+# VAD cache: per-frame speech probabilities per (file hash, range, engine
+# and ONNX lane settings); VAD settings are applied to them afterwards.
+# VAD_CACHE_SIZE bounds the in-memory LRU, VAD_CACHE_MAX_BYTES the .npz
+# files on disk
+VAD_CACHE_SIZE = int(os.getenv("VAD_CACHE_SIZE", 64))
+VAD_CACHE_MAX_BYTES = int(os.getenv("VAD_CACHE_MAX_BYTES", 512 * 1024 ** 2))
+VAD_CACHE_DIR = CACHE_DIR / "vad"
+VAD_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+# Ranges longer than this (seconds) are decoded and analyzed block by block
+# with bounded memory instead of being loaded whole
+VAD_STREAM_THRESHOLD = float(os.getenv("VAD_STREAM_THRESHOLD", 600))
+AUDIO_BLOCK_SECONDS = float(os.getenv("AUDIO_BLOCK_SECONDS", 30))
+
+# VAD engine: "onnx" (ONNX Runtime, local model file) or "torch" (torch.hub).
+# ONNX falls back to torch when onnxruntime or the model file is missing.
+# VAD_ONNX_MODEL overrides the model file location.
+VAD_ENGINE = os.getenv("VAD_ENGINE", "onnx")
+VAD_ONNX_MODEL = os.getenv("VAD_ONNX_MODEL", "")
+VAD_ONNX_THREADS = int(os.getenv("VAD_ONNX_THREADS", 1))
+# Opt-in approximation: VAD_ONNX_LANES > 1 scores each block as parallel
+# lanes that start from fresh state after VAD_ONNX_LANE_OVERLAP warm-up
+# frames, so probabilities and boundaries can differ from a sequential
+# pass. The default of 1 carries the state through and matches torch.
+VAD_ONNX_LANES = int(os.getenv("VAD_ONNX_LANES", 1))
+VAD_ONNX_LANE_OVERLAP = int(os.getenv("VAD_ONNX_LANE_OVERLAP", 64))  # frames (32 ms each)
+
+# VAD chunk output: encoder/writer threads, and the size at which a new
+# shard file is started when chunks are written as sharded archives
+CHUNK_WRITE_WORKERS = int(os.getenv("CHUNK_WRITE_WORKERS", 4))
+CHUNK_SHARD_MAX_BYTES = int(os.getenv("CHUNK_SHARD_MAX_BYTES", 1024 ** 3))
+
+# Whisper transcription cache (SQLite under CACHE_DIR), keyed by audio
+# content, model, compute type, language and decode options
+TRANSCRIPTION_CACHE_MAX_ENTRIES = int(os.getenv("TRANSCRIPTION_CACHE_MAX_ENTRIES", 200000))
+TRANSCRIPTION_CACHE_MAX_AGE = float(os.getenv("TRANSCRIPTION_CACHE_MAX_AGE", 90 * 24 * 3600))
+
+# Waveform peak pyramids for the dashboard: finest level has one min/max
+# pair per PEAKS_SAMPLES_PER_PEAK source samples, each level above is 4x coarser
+PEAKS_DIR = CACHE_DIR / "peaks"
+PEAKS_DIR.mkdir(parents=True, exist_ok=True)
+PEAKS_SAMPLES_PER_PEAK = int(os.getenv("PEAKS_SAMPLES_PER_PEAK", 256))
+# Recently viewed pyramids kept in memory
+PEAKS_CACHE_SIZE = int(os.getenv("PEAKS_CACHE_SIZE", 16))
+
+# Longest [start, end] slice /api/data/audio/{id}/slice decodes and encodes
+AUDIO_SLICE_MAX_SECONDS = float(os.getenv("AUDIO_SLICE_MAX_SECONDS", 600))
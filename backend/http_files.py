@@ -0,0 +1,141 @@
+"""
+HTTP file serving - byte ranges and conditional requests
+"""
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Iterator, Optional
+import os
+
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+READ_SIZE = 256 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def etag_for(st: os.stat_result) -> str:
+    return f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison against an If-None-Match / If-Range list"""
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+def _since(header: Optional[str]) -> Optional[float]:
+    try:
+        return parsedate_to_datetime(header).timestamp() if header else None
+    except (TypeError, ValueError):
+        return None
+
+
+def not_modified(request: Request, etag: str, mtime: Optional[float] = None) -> bool:
+    """Whether the client's cached copy is current (If-None-Match wins over If-Modified-Since)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    since = _since(request.headers.get("if-modified-since"))
+    return since is not None and mtime is not None and int(mtime) <= since
+
+
+def _if_range_matches(if_range: str, etag: str, mtime: float) -> bool:
+    """If-Range holds either an entity tag or an HTTP date"""
+    if_range = if_range.strip()
+    if if_range.startswith("W/"):
+        return False  # weak tags never validate a range
+    if if_range.startswith('"'):
+        return if_range == etag
+    since = _since(if_range)
+    return since is not None and int(mtime) <= since
+
+
+def parse_range(header: str, size: int) -> Optional[tuple[int, int]]:
+    """
+    Inclusive (first, last) byte positions of a single "bytes=" range
+
+    Returns None when the header should be ignored (other units, several
+    ranges, malformed), which means serving the whole file.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first:
+            first, last = int(first), int(last) if last else size - 1
+        else:
+            # Suffix range: the last N bytes
+            first, last = max(0, size - int(last)), size - 1
+    except ValueError:
+        return None
+
+    if first >= size:
+        raise RangeNotSatisfiable()
+    if first > last:
+        return None
+    return first, min(last, size - 1)
+
+
+def _read(path: Path, offset: int, length: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while length > 0:
+            block = f.read(min(READ_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+
+
+def file_response(request: Request, path: Path, media_type: str) -> Response:
+    """
+    Serve a file with ETag / Last-Modified validation and single byte ranges
+
+    Answers 304 when the client's copy is current, 206 for a satisfiable
+    Range (honouring If-Range), 416 for one past the end, and 200 with the
+    whole file otherwise.
+    """
+    st = path.stat()
+    etag = etag_for(st)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Last-Modified": formatdate(st.st_mtime, usegmt=True),
+    }
+
+    if not_modified(request, etag, st.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and if_range and not _if_range_matches(if_range, etag, st.st_mtime):
+        # The client's partial copy is of another version: send everything
+        range_header = None
+
+    if range_header:
+        try:
+            byte_range = parse_range(range_header, st.st_size)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{st.st_size}"})
+        if byte_range is not None:
+            first, last = byte_range
+            length = last - first + 1
+            return StreamingResponse(
+                _read(path, first, length),
+                status_code=206,
+                media_type=media_type,
+                headers={**headers, "Content-Range": f"bytes {first}-{last}/{st.st_size}", "Content-Length": str(length)},
+            )
+
+    return StreamingResponse(
+        _read(path, 0, st.st_size),
+        media_type=media_type,
+        headers={**headers, "Content-Length": str(st.st_size)},
+    )
@@ -3,11 +3,18 @@ XTTS Backend - FastAPI server with GPU workers
 """
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 from contextlib import asynccontextmanager
+import asyncio
 import uvicorn
 
-from .config import HOST, PORT
+from .config import HOST, PORT, PRELOAD_MODELS
+from .metrics import MetricsMiddleware, render as render_metrics
 from .routes import data, training, inference
+from .warmup import preload, readiness
+from .workers.pool import inference_pool
+from .workers.batch import batch_worker
+from .workers.speakers import speaker_index
 
 
 @asynccontextmanager
@@ -15,8 +22,27 @@ async def lifespan(app: FastAPI):
     """Startup and shutdown events"""
     print("Starting XTTS Backend...")
     print(f"Server running at http://{HOST}:{PORT}")
+
+    # Worker processes start loading their models right away
+    if inference_pool.enabled:
+        print(f"Starting inference pool: {', '.join(inference_pool.specs)}")
+        inference_pool.start()
+
+    # Preload in the background so /health answers while models load; /ready
+    # turns 200 once every PRELOAD_MODELS target is loaded and warmed up
+    if PRELOAD_MODELS:
+        print(f"Preloading models: {', '.join(PRELOAD_MODELS)}")
+    asyncio.get_running_loop().run_in_executor(None, preload)
+
+    # Hash and probe speaker references off the event loop before first use
+    asyncio.get_running_loop().run_in_executor(None, speaker_index.build)
+
+    # Continue batch jobs interrupted by a restart
+    batch_worker.resume_all()
+
     yield
     print("Shutting down XTTS Backend...")
+    inference_pool.stop()
 
 
 app = FastAPI(
@@ -35,6 +61,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency per route for /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(data.router, prefix="/api/data", tags=["Data Processing"])
 app.include_router(training.router, prefix="/api/training", tags=["Training"])
@@ -52,6 +81,20 @@ async def health():
     }
 
 
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 200 when preloaded models are loaded and warm, else 503"""
+    status = readiness()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics"""
+    body, content_type = render_metrics()
+    return Response(body, media_type=content_type)
+
+
 @app.get("/")
 async def root():
     return {"message": "XTTS API", "docs": "/docs"}
@@ -0,0 +1,190 @@
+"""
+Prometheus metrics - request latency, synthesis speed, model and queue state
+"""
+import sys
+import time
+
+from prometheus_client import Counter, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+
+# Hot-path metrics are plain counters/histograms (a lock and a few adds per
+# observation). Everything that can be read from existing state - queue
+# depths, job tables, model load times, memory - is collected at scrape time.
+
+REQUEST_LATENCY = Histogram(
+    "xtts_http_request_duration_seconds",
+    "HTTP request latency by route (until the response body is sent)",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+
+SYNTHESIS_RTF = Histogram(
+    "xtts_synthesis_rtf",
+    "Synthesis real-time factor (synthesis seconds per audio second)",
+    ["mode"],
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 3, 5, 10),
+)
+
+SYNTHESIZED_AUDIO = Counter(
+    "xtts_synthesized_audio_seconds_total",
+    "Seconds of audio synthesized",
+    ["mode"],
+)
+
+TIME_TO_FIRST_AUDIO = Histogram(
+    "xtts_time_to_first_audio_seconds",
+    "Time from synthesis start to the first streamed audio chunk",
+    ["mode"],
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 3, 5, 10),
+)
+
+PROCESSED_AUDIO = Counter(
+    "xtts_processed_audio_seconds_total",
+    "Seconds of audio processed by analysis workers",
+    ["worker"],
+)
+
+PROCESSING_TIME = Counter(
+    "xtts_processing_seconds_total",
+    "Wall-clock seconds spent by analysis workers",
+    ["worker"],
+)
+
+PROCESSING_SPEED = Histogram(
+    "xtts_processing_speed",
+    "Audio seconds processed per wall-clock second, per call",
+    ["worker"],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000),
+)
+
+
+def observe_synthesis(mode: str, duration: float, synthesis_time: float):
+    """Record one finished synthesis (mode: generate, long, stream, batch)"""
+    if duration:
+        SYNTHESIZED_AUDIO.labels(mode).inc(duration)
+        SYNTHESIS_RTF.labels(mode).observe(synthesis_time / duration)
+
+
+def observe_first_audio(mode: str, seconds: float):
+    TIME_TO_FIRST_AUDIO.labels(mode).observe(seconds)
+
+
+def observe_processing(worker: str, audio_seconds: float, wall_seconds: float):
+    """Record one Whisper / VAD call over audio_seconds of input"""
+    PROCESSED_AUDIO.labels(worker).inc(audio_seconds)
+    PROCESSING_TIME.labels(worker).inc(wall_seconds)
+    if wall_seconds > 0:
+        PROCESSING_SPEED.labels(worker).observe(audio_seconds / wall_seconds)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing HTTP requests
+
+    Requests are labelled with the matched route template (e.g.
+    /api/inference/audio/{filename}) rather than the raw path, so label
+    cardinality stays bounded. WebSocket sessions are not timed.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            REQUEST_LATENCY.labels(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status),
+            ).observe(time.perf_counter() - started)
+
+
+class StateCollector:
+    """Scrape-time gauges read from worker singletons"""
+
+    def collect(self):
+        from .routes import data, training
+        from .workers.batch import batch_worker
+        from .workers.executor import inference_executor
+        from .workers.models import model_registry
+        from .workers.pool import inference_pool
+        from .workers.vad import vad_worker
+        from .workers.whisper import whisper_worker
+
+        queue = GaugeMetricFamily("xtts_inference_queue", "Inference executor requests by state", labels=["state"])
+        executor_stats = inference_executor.stats()
+        queue.add_metric(["queued"], executor_stats["queued"])
+        queue.add_metric(["running"], executor_stats["running"])
+        yield queue
+
+        queued_cost = GaugeMetricFamily("xtts_inference_queued_cost", "Estimated cost (characters) of queued requests")
+        queued_cost.add_metric([], executor_stats["queuedCost"])
+        yield queued_cost
+
+        jobs = GaugeMetricFamily("xtts_jobs", "Background jobs by kind and status", labels=["kind", "status"])
+        for kind, table in (("data", data.jobs), ("training", training.jobs), ("batch", batch_worker.jobs)):
+            counts = {}
+            for job in list(table.values()):
+                status = job.get("status", "unknown")
+                counts[status] = counts.get(status, 0) + 1
+            for status, count in counts.items():
+                jobs.add_metric([kind, status], count)
+        yield jobs
+
+        load = GaugeMetricFamily("xtts_model_load_seconds", "Time taken to load each model", labels=["model"])
+        if whisper_worker.load_time is not None:
+            load.add_metric(["whisper"], whisper_worker.load_time)
+        if vad_worker.load_time is not None:
+            load.add_metric(["vad"], vad_worker.load_time)
+        for model in model_registry.available():
+            if model["loadTime"] is not None:
+                load.add_metric([f"xtts:{model['name']}"], model["loadTime"])
+        yield load
+
+        if inference_pool.enabled:
+            workers = GaugeMetricFamily("xtts_pool_worker_in_flight", "Requests in flight per pool worker", labels=["worker", "device"])
+            ready = GaugeMetricFamily("xtts_pool_worker_ready", "Whether a pool worker has loaded its model", labels=["worker", "device"])
+            restarts = GaugeMetricFamily("xtts_pool_worker_restarts", "Pool worker respawns", labels=["worker", "device"])
+            worker_load = GaugeMetricFamily("xtts_pool_worker_load_seconds", "Model load time per pool worker", labels=["worker", "device"])
+            for w in inference_pool.stats():
+                labels = [str(w["index"]), w["device"]]
+                workers.add_metric(labels, w["inFlight"])
+                ready.add_metric(labels, int(w["ready"]))
+                restarts.add_metric(labels, w["restarts"])
+                if w["loadTime"] is not None:
+                    worker_load.add_metric(labels, w["loadTime"])
+            yield from (workers, ready, restarts, worker_load)
+
+        # Only report device memory once torch is in use; never import it here
+        torch = sys.modules.get("torch")
+        if torch is not None and torch.cuda.is_available():
+            allocated = GaugeMetricFamily("xtts_device_memory_allocated_bytes", "CUDA memory allocated by tensors", labels=["device"])
+            reserved = GaugeMetricFamily("xtts_device_memory_reserved_bytes", "CUDA memory reserved by the caching allocator", labels=["device"])
+            for i in range(torch.cuda.device_count()):
+                allocated.add_metric([str(i)], torch.cuda.memory_allocated(i))
+                reserved.add_metric([str(i)], torch.cuda.memory_reserved(i))
+            yield from (allocated, reserved)
+
+
+# Process CPU / memory / fds come from the default registry's ProcessCollector
+REGISTRY.register(StateCollector())
+
+
+def render() -> tuple[bytes, str]:
+    """Current metrics in the Prometheus text format"""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -1,17 +1,24 @@
 """
 Data Processing Routes - Upload, transcription, VAD chunking
 """
-from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks
-from fastapi.responses import StreamingResponse, FileResponse
+from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks, Request
+from fastapi.responses import StreamingResponse, Response
+from starlette.concurrency import run_in_threadpool
 from pathlib import Path
 import uuid
 import json
 import asyncio
 from typing import Optional
 
-from ..config import UPLOAD_DIR, DATASETS_DIR
+from ..config import UPLOAD_DIR, DATASETS_DIR, AUDIO_SLICE_MAX_SECONDS
+from ..http_files import file_response, etag_for, not_modified
 from ..workers.whisper import whisper_worker
 from ..workers.vad import vad_worker
+from ..workers.chunk_writer import CHUNK_FORMATS
+from ..workers.transcription_cache import transcription_cache
+from ..workers.peaks import peaks_worker
+from ..workers.uploads import upload_index, MEDIA_TYPES
+from ..workers import audio_io, codec
 
 router = APIRouter()
 
@@ -22,8 +29,8 @@ jobs: dict[str, dict] = {}
 # ============== Upload ==============
 
 @router.post("/upload")
-async def upload_files(files: list[UploadFile] = File(...)):
-    """Upload audio files"""
+async def upload_files(background_tasks: BackgroundTasks, files: list[UploadFile] = File(...)):
+    """Upload audio files (waveform peaks are computed after the response)"""
     uploaded = []
 
     for file in files:
@@ -46,10 +53,19 @@ async def upload_files(files: list[UploadFile] = File(...)):
             "size": len(content),
             "path": str(filepath),
         })
+        upload_index.add(filepath)
+        background_tasks.add_task(_build_peaks, file_id, str(filepath))
 
     return {"success": True, "files": uploaded}
 
 
+def _build_peaks(file_id: str, path: str):
+    try:
+        peaks_worker.build(file_id, path)
+    except Exception as e:
+        print(f"Could not compute waveform peaks for {file_id}: {e}")
+
+
 # ============== Whisper Processing ==============
 
 @router.post("/process")
@@ -97,6 +113,22 @@ def run_whisper_job(job_id: str, files: list, language: str):
         }
 
 
+@router.get("/transcriptions/cache")
+async def get_transcription_cache_stats():
+    """Whisper transcription cache statistics"""
+    return {"success": True, "data": await run_in_threadpool(transcription_cache.stats)}
+
+
+@router.delete("/transcriptions/cache")
+async def clear_transcription_cache(model: Optional[str] = None):
+    """Drop cached transcriptions, all of them or only those of one Whisper model"""
+    if model:
+        removed = await run_in_threadpool(transcription_cache.invalidate_model, model)
+    else:
+        removed = await run_in_threadpool(transcription_cache.clear)
+    return {"success": True, "removed": removed}
+
+
 @router.get("/progress/{job_id}")
 async def get_progress(job_id: str):
     """SSE endpoint for job progress"""
@@ -159,9 +191,13 @@ async def start_chunking(request: dict, background_tasks: BackgroundTasks):
     vad_config = request.get("vadConfig", {})
     auto_transcribe = request.get("autoTranscribe", False)
     language = request.get("language", "ru")
+    output_format = request.get("outputFormat", "wav")
+    sharded = bool(request.get("sharded", False))
 
     if not audio_path or not Path(audio_path).exists():
         raise HTTPException(status_code=400, detail="Audio file not found")
+    if output_format not in CHUNK_FORMATS:
+        raise HTTPException(status_code=400, detail=f"outputFormat must be one of {', '.join(CHUNK_FORMATS)}")
 
     job_id = str(uuid.uuid4())
     jobs[job_id] = {
@@ -178,6 +214,8 @@ async def start_chunking(request: dict, background_tasks: BackgroundTasks):
         vad_config,
         auto_transcribe,
         language,
+        output_format,
+        sharded,
     )
 
     return {"success": True, "jobId": job_id}
@@ -190,6 +228,8 @@ def run_chunking_job(
     vad_config: dict,
     auto_transcribe: bool,
     language: str,
+    output_format: str = "wav",
+    sharded: bool = False,
 ):
     """Background task for VAD chunking"""
     def on_progress(progress: int, message: str):
@@ -206,6 +246,8 @@ def run_chunking_job(
             auto_transcribe,
             language,
             on_progress,
+            output_format,
+            sharded,
         )
 
         jobs[job_id] = {
@@ -230,35 +272,104 @@ async def get_chunking_progress(job_id: str):
 
 # ============== Audio Streaming ==============
 
+# Widest peaks view served in one request
+MAX_PEAKS_WIDTH = 20000
+
+# Sample rates libsndfile's Opus encoder accepts
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+
+def _find_upload(file_id: str) -> Optional[Path]:
+    """Uploaded file for an id (with or without its extension)"""
+    return upload_index.get(file_id)
+
+
 @router.get("/audio/{file_id}")
-async def stream_audio(file_id: str):
-    """Stream audio file"""
-    # Try upload directory
-    for ext in [".wav", ".mp3", ".flac", ".ogg", ".m4a"]:
-        filepath = UPLOAD_DIR / f"{file_id}{ext}"
-        if filepath.exists():
-            return FileResponse(
-                filepath,
-                media_type=f"audio/{ext[1:]}",
-            )
-
-    # Try direct filename
-    filepath = UPLOAD_DIR / file_id
-    if filepath.exists():
-        ext = filepath.suffix.lower()
-        content_types = {
-            ".wav": "audio/wav",
-            ".mp3": "audio/mpeg",
-            ".ogg": "audio/ogg",
-            ".flac": "audio/flac",
-            ".m4a": "audio/mp4",
-        }
-        return FileResponse(
-            filepath,
-            media_type=content_types.get(ext, "application/octet-stream"),
-        )
+async def stream_audio(file_id: str, request: Request):
+    """Stream audio file (supports Range, If-None-Match and If-Modified-Since)"""
+    filepath = _find_upload(file_id)
+    if filepath is None:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    return file_response(
+        request,
+        filepath,
+        MEDIA_TYPES.get(filepath.suffix.lower(), "application/octet-stream"),
+    )
+
 
-    raise HTTPException(status_code=404, detail="File not found")
+def _render_slice(path: Path, start: float, end: float, fmt: str) -> bytes:
+    """Decode [start, end) seconds of path (seeking, mono) and encode it as fmt"""
+    import numpy as np
+
+    sample_rate, num_frames = audio_io.info(str(path))
+    first = int(start * sample_rate)
+    if first >= num_frames:
+        raise ValueError("slice starts after the end of the file")
+    audio, sample_rate = audio_io.read_frames(str(path), first, min(int(end * sample_rate), num_frames) - first)
+
+    if fmt in ("ogg", "opus") and sample_rate not in OPUS_SAMPLE_RATES:
+        target = next((r for r in OPUS_SAMPLE_RATES if r >= sample_rate), OPUS_SAMPLE_RATES[-1])
+        audio = audio_io.resample(audio, sample_rate, target)
+        sample_rate = target
+
+    if fmt == "wav":
+        wav, _ = codec.wav_buffer(audio.numpy(), sample_rate)
+        return bytes(wav)
+    pcm = (np.clip(audio.numpy(), -1.0, 1.0) * 32767).astype(np.int16)
+    return codec.encode(pcm, sample_rate, fmt)
+
+
+@router.get("/audio/{file_id}/slice")
+async def slice_audio(file_id: str, request: Request, start: float, end: float, format: str = "opus"):
+    """
+    Only [start, end] seconds of an uploaded file, encoded for preview
+
+    The slice is decoded with seeking, so previewing a chunk of a long
+    recording never transfers or decodes the rest of it.
+    """
+    try:
+        fmt = codec.check_format(format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if start < 0 or end <= start:
+        raise HTTPException(status_code=400, detail="Invalid time window")
+    if end - start > AUDIO_SLICE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"Slices are limited to {AUDIO_SLICE_MAX_SECONDS:g} seconds")
+
+    filepath = _find_upload(file_id)
+    if filepath is None:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    etag = f'{etag_for(filepath.stat())[:-1]}-{start:g}-{end:g}-{fmt}"'
+    if not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    try:
+        content = await run_in_threadpool(_render_slice, filepath, start, end, fmt)
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"Could not read audio: {e}")
+    return Response(content=content, media_type=codec.media_type(fmt), headers={"ETag": etag})
+
+
+@router.get("/peaks/{file_id}")
+async def get_peaks(file_id: str, width: int = 1000, start: float = 0.0, end: Optional[float] = None):
+    """Waveform min/max peaks of an uploaded file for a time window at `width` pixels"""
+    if not 1 <= width <= MAX_PEAKS_WIDTH:
+        raise HTTPException(status_code=400, detail=f"width must be between 1 and {MAX_PEAKS_WIDTH}")
+    if start < 0 or (end is not None and end <= start):
+        raise HTTPException(status_code=400, detail="Invalid time window")
+
+    filepath = _find_upload(file_id)
+    if filepath is None:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    file_id = filepath.stem
+    try:
+        data = await run_in_threadpool(peaks_worker.peaks, file_id, str(filepath), width, start, end)
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"Could not read audio: {e}")
+    return {"success": True, "data": data}
 
 
 # ============== Datasets ==============
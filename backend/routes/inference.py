@@ -1,46 +1,440 @@
 """
 Inference Routes - TTS generation
 """
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, UploadFile, File, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse, StreamingResponse, Response
+from starlette.concurrency import run_in_threadpool
 from pathlib import Path
+import asyncio
+import json
+import struct
 import uuid
+from typing import Optional
 
-from ..config import OUTPUT_DIR, SPEAKERS_DIR
-from ..workers.inference import inference_worker
+from ..cache import file_hash
+from ..config import OUTPUT_DIR, SPEAKERS_DIR, SPEAKER_ORIGINALS_DIR, LONG_TEXT_THRESHOLD, BATCH_MAX_ITEMS
+from ..workers.inference import inference_worker, SAMPLE_RATE
+from ..workers.speaker_cache import speaker_latent_cache
+from ..workers.speakers import speaker_index, normalize_reference
+from ..workers.executor import inference_executor, QueueFullError, DeadlineExceededError
+from ..workers.result_cache import audio_result_cache
+from ..workers.models import model_registry, ModelNotFoundError
+from ..workers.pool import inference_pool
+from ..workers.batch import batch_worker
+from ..workers import codec
+from .. import metrics
 
 router = APIRouter()
 
+# Synthesis runs in pool worker processes when INFERENCE_POOL is set
+synthesizer = inference_pool if inference_pool.enabled else inference_worker
 
-@router.post("/generate")
-async def generate_speech(request: dict):
-    """Generate speech from text"""
-    text = request.get("text", "")
-    speaker_wav = request.get("speakerWav", "")
-    language = request.get("language", "ru")
-    temperature = request.get("temperature", 0.7)
-    speed = request.get("speed", 1.0)
-    top_k = request.get("topK", 50)
-    top_p = request.get("topP", 0.85)
 
+def _generate_params(request: dict) -> dict:
+    """Extract synthesis parameters from a generate request body"""
+    text = request.get("text", "")
     if not text:
         raise HTTPException(status_code=400, detail="Text is required")
 
+    # Validate the model name up front; loading happens on the inference thread
     try:
-        result = inference_worker.generate(
-            text=text,
-            speaker_wav=speaker_wav,
-            language=language,
-            temperature=temperature,
-            speed=speed,
-            top_k=top_k,
-            top_p=top_p,
+        model, _ = model_registry.resolve(request.get("model") or request.get("modelPath"))
+    except ModelNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    return {
+        "text": text,
+        "speaker_wav": request.get("speakerWav", ""),
+        "language": request.get("language", "ru"),
+        "temperature": request.get("temperature", 0.7),
+        "speed": request.get("speed", 1.0),
+        "top_k": request.get("topK", 50),
+        "top_p": request.get("topP", 0.85),
+        "model": model,
+    }
+
+
+def _wav_stream_header(sample_rate: int) -> bytes:
+    """WAV header for 16-bit mono PCM of unknown length"""
+    unknown_size = 0xFFFFFFFF
+    return b"".join([
+        b"RIFF",
+        struct.pack("<I", unknown_size),
+        b"WAVE",
+        b"fmt ",
+        struct.pack("<IHHIIHH", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16),
+        b"data",
+        struct.pack("<I", unknown_size),
+    ])
+
+
+def _queue_error(e: Exception) -> HTTPException:
+    """Map executor admission/deadline errors to HTTP errors"""
+    if isinstance(e, QueueFullError):
+        return HTTPException(
+            status_code=e.status_code,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
         )
+    return HTTPException(status_code=504, detail=str(e))
+
+
+def _audio_response(result: dict, cache_status: str) -> Response:
+    """Return encoded audio in the response body, metadata in headers"""
+    headers = {
+        "X-Audio-Id": result["id"],
+        "X-Audio-Duration": f"{result['duration']:.3f}",
+        "X-Cache": cache_status,
+    }
+    if "audio_url" in result:
+        headers["X-Audio-Url"] = result["audio_url"]
+    if "synthesis_time" in result:
+        headers["X-Synthesis-Time"] = f"{result['synthesis_time']:.3f}"
+
+    # Starlette before 0.38 only sends bytes as is, so the bytearray from
+    # wav_buffer is converted once here
+    return Response(content=bytes(result["audio"]), media_type=result["media_type"], headers=headers)
+
+
+def _read_cached_audio(result: dict, response_format: str) -> dict:
+    """Load a cached OUTPUT_DIR file in the requested format"""
+    import soundfile as sf
+
+    path = OUTPUT_DIR / Path(result["audio_url"]).name
+    if response_format == "wav":
+        audio = path.read_bytes()
+    else:
+        pcm, sample_rate = sf.read(str(path), dtype="int16")
+        audio = codec.encode(pcm, sample_rate, response_format)
+
+    return {**result, "audio": audio, "media_type": codec.media_type(response_format)}
+
+
+def _observe_stream(mode: str, stats: dict):
+    """Record RTF and time-to-first-audio of a finished stream"""
+    if "time_to_first_chunk" in stats:
+        metrics.observe_first_audio(mode, stats["time_to_first_chunk"])
+    metrics.observe_synthesis(mode, stats.get("duration", 0.0), stats.get("synthesis_time", 0.0))
+
+
+def _cache_lookup(params: dict, long_text: bool) -> tuple[str, Optional[dict]]:
+    """(result cache key, cached result or None) for a /generate request"""
+    speaker_path = inference_worker.resolve_speaker(params["speaker_wav"])
+    cache_key = audio_result_cache.make_key(
+        params["text"],
+        file_hash(speaker_path),
+        params["language"],
+        model_registry.resolve(params["model"])[1],
+        temperature=params["temperature"],
+        speed=params["speed"],
+        top_k=params["top_k"],
+        top_p=params["top_p"],
+        long_text=long_text,
+    )
+    return cache_key, audio_result_cache.get(cache_key)
+
+
+@router.post("/generate")
+async def generate_speech(request: dict):
+    """
+    Generate speech from text
+
+    Texts longer than LONG_TEXT_THRESHOLD characters (or with longText: true)
+    are synthesized sentence by sentence and return per-segment timings.
+
+    Identical requests are answered from the result cache without
+    synthesis unless the body sets cache: false.
+
+    With responseFormat ("wav", "flac", "ogg"/"opus") the audio itself is
+    returned as the response body and nothing is written to OUTPUT_DIR
+    unless save: true is also given.
+    """
+    params = _generate_params(request)
+
+    try:
+        response_format = codec.check_format(request.get("responseFormat"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    save = request.get("save", response_format is None) or response_format is None
+
+    long_text = request.get("longText")
+    if long_text is None:
+        long_text = len(params["text"]) > LONG_TEXT_THRESHOLD
+    generate = synthesizer.generate_long if long_text else synthesizer.generate
+
+    cache_key = None
+    if request.get("cache", True):
+        # Speaker resolution, hashing and the SQLite lookup all block
+        cache_key, cached = await run_in_threadpool(_cache_lookup, params, long_text)
+        if cached is not None:
+            if response_format:
+                cached = await run_in_threadpool(_read_cached_audio, cached, response_format)
+                return _audio_response(cached, "hit")
+            return {"success": True, "data": {**cached, "cached": True}}
+
+    try:
+        result = await inference_executor.run(
+            generate,
+            cost=inference_executor.estimate_cost(params["text"]),
+            timeout=request.get("timeout"),
+            cancellable=True,
+            save=save,
+            response_format=response_format,
+            **params,
+        )
+        metrics.observe_synthesis("long" if long_text else "generate", result["duration"], result["synthesis_time"])
+        if cache_key is not None and save:
+            await run_in_threadpool(
+                audio_result_cache.put,
+                cache_key,
+                {k: v for k, v in result.items() if k not in ("audio", "media_type")},
+            )
+        if response_format:
+            return _audio_response(result, "miss")
         return {"success": True, "data": result}
+    except (QueueFullError, DeadlineExceededError) as e:
+        raise _queue_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/generate/stream")
+async def generate_speech_stream(request: dict):
+    """
+    Stream speech as it is synthesized (chunked HTTP)
+
+    Body is the same as /generate plus optional:
+        format: "wav" (default, streaming WAV header) or "pcm" (raw s16le)
+        streamChunkSize: GPT tokens per chunk
+    """
+    params = _generate_params(request)
+    audio_format = request.get("format", "wav")
+    stream_chunk_size = request.get("streamChunkSize", 20)
+
+    if audio_format not in ("wav", "pcm"):
+        raise HTTPException(status_code=400, detail="format must be 'wav' or 'pcm'")
+
+    stats = {}
+    try:
+        chunks = inference_executor.stream(
+            lambda: synthesizer.generate_stream(
+                **params,
+                stream_chunk_size=stream_chunk_size,
+                stats=stats,
+            ),
+            cost=inference_executor.estimate_cost(params["text"]),
+            timeout=request.get("timeout"),
+        )
+    except QueueFullError as e:
+        raise _queue_error(e)
+
+    async def audio_stream():
+        if audio_format == "wav":
+            yield _wav_stream_header(SAMPLE_RATE)
+        async for chunk in chunks:
+            yield chunk
+        _observe_stream("stream", stats)
+        print(
+            f"Streamed {stats.get('duration', 0):.2f}s audio, "
+            f"first chunk after {stats.get('time_to_first_chunk', 0):.3f}s, "
+            f"total {stats.get('synthesis_time', 0):.2f}s"
+        )
+
+    media_type = "audio/wav" if audio_format == "wav" else f"audio/L16;rate={SAMPLE_RATE};channels=1"
+    return StreamingResponse(
+        audio_stream(),
+        media_type=media_type,
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Sample-Rate": str(SAMPLE_RATE),
+        },
+    )
+
+
+@router.websocket("/generate/ws")
+async def generate_speech_ws(websocket: WebSocket):
+    """
+    Stream speech over a WebSocket
+
+    The client sends one JSON message per utterance (same body as /generate).
+    The server replies with:
+        {"event": "start", "sampleRate": ..., "format": "pcm_s16le"}
+        binary frames of raw PCM
+        {"event": "first_chunk", "timeToFirstChunk": ...} after the first frame
+        {"event": "done", "timeToFirstChunk": ..., "synthesisTime": ..., "duration": ...}
+    or {"event": "error", "error": ...}
+    """
+    await websocket.accept()
+
+    try:
+        while True:
+            request = await websocket.receive_json()
+
+            try:
+                params = _generate_params(request)
+            except HTTPException as e:
+                await websocket.send_json({"event": "error", "error": e.detail})
+                continue
+
+            stats = {}
+            await websocket.send_json({
+                "event": "start",
+                "sampleRate": SAMPLE_RATE,
+                "format": "pcm_s16le",
+            })
+
+            try:
+                chunks = inference_executor.stream(
+                    lambda: synthesizer.generate_stream(
+                        **params,
+                        stream_chunk_size=request.get("streamChunkSize", 20),
+                        stats=stats,
+                    ),
+                    cost=inference_executor.estimate_cost(params["text"]),
+                    timeout=request.get("timeout"),
+                )
+                first = True
+                async for chunk in chunks:
+                    await websocket.send_bytes(chunk)
+                    if first:
+                        first = False
+                        await websocket.send_json({
+                            "event": "first_chunk",
+                            "timeToFirstChunk": stats.get("time_to_first_chunk"),
+                        })
+            except WebSocketDisconnect:
+                raise
+            except Exception as e:
+                await websocket.send_json({"event": "error", "error": str(e)})
+                continue
+
+            _observe_stream("websocket", stats)
+            await websocket.send_json({
+                "event": "done",
+                "timeToFirstChunk": stats.get("time_to_first_chunk"),
+                "synthesisTime": stats.get("synthesis_time"),
+                "duration": stats.get("duration"),
+            })
+    except WebSocketDisconnect:
+        pass
+
+
+# ============== Batch Synthesis ==============
+
+@router.post("/batch")
+async def start_batch(request: dict):
+    """
+    Start a bulk synthesis job
+
+    Body: {"items": [text | {"text", "id", "speakerWav", "language", ...}],
+           "format": "wav" | "flac" | "ogg", plus /generate defaults}
+    """
+    items = request.get("items", [])
+    if not items:
+        raise HTTPException(status_code=400, detail="No items provided")
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Too many items (max {BATCH_MAX_ITEMS})")
+
+    params = {k: v for k, v in request.items() if k != "items"}
+    try:
+        params["format"] = codec.check_format(params.get("format", "wav"))
+        model_registry.resolve(params.get("model"))
+        job_id = batch_worker.submit(items, params)
+    except ModelNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {"success": True, "jobId": job_id, "total": len(items)}
+
+
+@router.get("/batch/progress/{job_id}")
+async def get_batch_progress(job_id: str):
+    """SSE endpoint for batch job progress"""
+    async def event_stream():
+        while True:
+            job = batch_worker.status(job_id)
+            if job is None:
+                yield f"data: {json.dumps({'error': 'Job not found'})}\n\n"
+                break
+
+            yield f"data: {json.dumps(job)}\n\n"
+
+            if job["status"] in ["completed", "failed", "cancelled"]:
+                yield f"event: complete\ndata: {json.dumps(job)}\n\n"
+                break
+
+            await asyncio.sleep(1)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+        },
+    )
+
+
+@router.get("/batch/{job_id}/manifest")
+async def get_batch_manifest(job_id: str):
+    """Finished items with their audio file paths inside the archive"""
+    status = batch_worker.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"success": True, "status": status, "data": batch_worker.read_manifest(job_id)}
+
+
+@router.get("/batch/{job_id}/archive")
+async def get_batch_archive(job_id: str):
+    """Download finished audio and manifest.json as a zip"""
+    if batch_worker.status(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    archive = await run_in_threadpool(batch_worker.build_archive, job_id)
+    return FileResponse(archive, media_type="application/zip", filename=f"batch_{job_id}.zip")
+
+
+@router.post("/batch/{job_id}/cancel")
+async def cancel_batch(job_id: str):
+    """Stop a running batch job after the items in flight"""
+    if batch_worker.cancel(job_id):
+        return {"success": True}
+    return {"success": False, "error": "Job not found or not running"}
+
+
+@router.get("/queue")
+async def get_queue():
+    """Inference queue depth and admission counters"""
+    return {"success": True, "data": inference_executor.stats()}
+
+
+@router.get("/workers")
+async def list_workers():
+    """Per-worker state and metrics of the inference process pool"""
+    if not inference_pool.enabled:
+        return {"success": True, "data": {"pool": False, "workers": []}}
+    return {"success": True, "data": {"pool": True, "workers": inference_pool.stats()}}
+
+
+@router.get("/models")
+async def list_models():
+    """List servable models (base + fine-tuned checkpoints) and their residency"""
+    return {"success": True, "data": model_registry.available()}
+
+
+@router.get("/cache")
+async def get_cache_stats():
+    """Generated audio cache statistics"""
+    return {"success": True, "data": audio_result_cache.stats()}
+
+
+@router.delete("/cache")
+async def clear_cache():
+    """Drop all cached generated audio"""
+    removed = await run_in_threadpool(audio_result_cache.clear)
+    return {"success": True, "removed": removed}
+
+
 @router.get("/audio/{filename}")
 async def get_audio(filename: str):
     """Get generated audio file"""
@@ -62,8 +456,8 @@ async def get_audio(filename: str):
 
 @router.get("/speakers")
 async def list_speakers():
-    """List available speaker WAV files"""
-    speakers = inference_worker.list_speakers()
+    """List available speaker reference files with duration, sample rate and hash"""
+    speakers = await run_in_threadpool(inference_worker.list_speakers)
     return {"success": True, "data": speakers}
 
 
@@ -74,15 +468,50 @@ async def upload_speaker(file: UploadFile = File(...)):
         raise HTTPException(status_code=400, detail="Only audio files allowed")
 
     # Save with original filename or generate new
-    filename = file.filename or f"{uuid.uuid4()}.wav"
-    filepath = SPEAKERS_DIR / filename
+    filename = Path(file.filename).name if file.filename else f"{uuid.uuid4()}.wav"
+    original_path = SPEAKER_ORIGINALS_DIR / filename
+    filepath = SPEAKERS_DIR / f"{Path(filename).stem}.wav"
 
+    # Staged next to originals/ until it is known to decode, so a bad upload
+    # never replaces a good original or the latents computed from it
+    upload_path = SPEAKER_ORIGINALS_DIR / f".{uuid.uuid4().hex}{Path(filename).suffix}"
     content = await file.read()
-    with open(filepath, "wb") as f:
-        f.write(content)
+    # Hash of the reference being replaced, to drop its latents once the new one is in place
+    previous_hash = await run_in_threadpool(file_hash, filepath) if filepath.exists() else None
+    try:
+        with open(upload_path, "wb") as f:
+            f.write(content)
+
+        # Decode / downmix / trim / resample once here instead of on every synthesis.
+        # The canonical file is renamed into place, so the directory mtime changes
+        # and watchers in other processes pick up replacements too.
+        try:
+            ingest = await run_in_threadpool(normalize_reference, upload_path, filepath)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Could not decode audio: {e}")
+
+        upload_path.replace(original_path)
+    finally:
+        upload_path.unlink(missing_ok=True)
+
+    # Replacing a reference invalidates latents computed from the old audio
+    if previous_hash is not None:
+        speaker_latent_cache.invalidate(filepath, previous_hash)
+
+    entry = await run_in_threadpool(speaker_index.add, filepath)
+
+    # Warm the latent cache in the background when the model is loaded here
+    if not inference_pool.enabled:
+        inference_executor.submit(inference_worker.precompute_conditioning, str(filepath))
 
     return {
         "success": True,
         "name": Path(filename).stem,
         "path": str(filepath),
+        "original": str(original_path),
+        "duration": entry["duration"],
+        "sampleRate": entry["sampleRate"],
+        "sourceDuration": ingest["sourceDuration"],
+        "sourceSampleRate": ingest["sourceSampleRate"],
+        "sourceChannels": ingest["sourceChannels"],
     }
@@ -0,0 +1,118 @@
+"""
+Startup preloading, warmup and readiness state
+"""
+from typing import Optional
+import threading
+import time
+
+from .config import PRELOAD_MODELS, WARMUP
+
+# target -> {"state", "loadTime", "warmupTime", "error"}
+_status: dict[str, dict] = {}
+_lock = threading.Lock()
+_done = threading.Event()
+
+
+def _set(target: str, **fields):
+    with _lock:
+        _status.setdefault(target, {}).update(fields)
+
+
+def _preload_xtts(model: Optional[str], warmup: bool):
+    from .workers.executor import inference_executor
+    from .workers.inference import inference_worker
+    from .workers.models import model_registry
+    from .workers.pool import inference_pool
+
+    if inference_pool.enabled:
+        # Pool workers load and warm up the default model themselves
+        if model:
+            raise ValueError("Named XTTS preload is not supported with INFERENCE_POOL")
+        if not inference_pool.wait_ready():
+            errors = [w["error"] for w in inference_pool.stats() if w["error"]]
+            raise RuntimeError(f"Inference workers failed to load: {'; '.join(errors)}")
+        load_times = [w["loadTime"] for w in inference_pool.stats() if w["loadTime"] is not None]
+        return max(load_times, default=0.0), None
+
+    # Load on the inference thread so preload never races a request for the GPU
+    started = time.perf_counter()
+    inference_executor.call(model_registry.get, model)
+    load_time = time.perf_counter() - started
+
+    warmup_time = None
+    if warmup:
+        started = time.perf_counter()
+        inference_executor.call(inference_worker.warmup, model)
+        warmup_time = time.perf_counter() - started
+    return load_time, warmup_time
+
+
+def _preload_worker(worker, warmup: bool):
+    started = time.perf_counter()
+    worker._load_model()
+    load_time = time.perf_counter() - started
+
+    warmup_time = None
+    if warmup:
+        started = time.perf_counter()
+        worker.warmup()
+        warmup_time = time.perf_counter() - started
+    return load_time, warmup_time
+
+
+def _preload_target(target: str, warmup: bool):
+    kind, _, name = target.partition(":")
+
+    if kind == "xtts":
+        return _preload_xtts(name or None, warmup)
+    if kind == "whisper":
+        from .workers.whisper import whisper_worker
+        return _preload_worker(whisper_worker, warmup)
+    if kind == "vad":
+        from .workers.vad import vad_worker
+        return _preload_worker(vad_worker, warmup)
+
+    raise ValueError(f"Unknown preload target: {target}")
+
+
+def preload(targets: list[str] = PRELOAD_MODELS, warmup: bool = WARMUP):
+    """Load (and optionally warm up) each target in order; blocking"""
+    for target in targets:
+        _set(target, state="pending")
+
+    for target in targets:
+        _set(target, state="loading")
+        print(f"Preloading {target}...")
+        try:
+            load_time, warmup_time = _preload_target(target, warmup)
+            _set(target, state="ready", loadTime=load_time, warmupTime=warmup_time)
+            print(f"Preloaded {target} (load {load_time:.1f}s"
+                  + (f", warmup {warmup_time:.1f}s)" if warmup_time is not None else ")"))
+        except Exception as e:
+            _set(target, state="failed", error=str(e))
+            print(f"Failed to preload {target}: {e}")
+
+    _done.set()
+
+
+def readiness() -> dict:
+    """Load state of preloaded and lazily loaded models"""
+    from .workers.models import model_registry
+    from .workers.vad import vad_worker
+    from .workers.whisper import whisper_worker
+
+    with _lock:
+        models = {target: dict(status) for target, status in _status.items()}
+
+    # Models loaded on demand outside the preload list (no MODELS_DIR scan)
+    for m in model_registry.loaded():
+        target = "xtts" if m["name"] == "default" else f"xtts:{m['name']}"
+        if target not in models and m["state"] != "unloaded":
+            models[target] = {"state": "ready" if m["state"] != "loading" else "loading", "loadTime": m["loadTime"]}
+    for target, worker in (("whisper", whisper_worker), ("vad", vad_worker)):
+        if target not in models and worker.loaded:
+            models[target] = {"state": "ready", "loadTime": worker.load_time}
+
+    preloaded = [models[t] for t in PRELOAD_MODELS if t in models]
+    ready = _done.is_set() and all(m["state"] == "ready" for m in preloaded)
+    return {"ready": ready, "models": models}
@@ -0,0 +1,187 @@
+"""
+Audio IO - range-aware decoding and block-wise processing of long recordings
+"""
+from functools import lru_cache
+from math import gcd
+from typing import Iterator
+
+import torch
+import torchaudio
+
+
+# Source samples resampled on each side of a region and then discarded
+REGION_MARGIN = 1024
+
+
+@lru_cache(maxsize=32)
+def resampler(orig_sr: int, new_sr: int) -> torchaudio.transforms.Resample:
+    """Resample transform per rate pair; its filter kernel is computed once and reused"""
+    return torchaudio.transforms.Resample(orig_sr, new_sr)
+
+
+def resample(audio: torch.Tensor, orig_sr: int, new_sr: int) -> torch.Tensor:
+    """Resample with a cached kernel (no-op when the rates match)"""
+    if orig_sr == new_sr:
+        return audio
+    return resampler(orig_sr, new_sr)(audio)
+
+
+def resample_region(
+    audio: torch.Tensor,
+    start: int,
+    end: int,
+    orig_sr: int,
+    new_sr: int,
+    margin: int = REGION_MARGIN,
+) -> torch.Tensor:
+    """
+    Resample only audio[..., start:end]
+
+    The region is resampled with `margin` extra source samples on each side
+    (when available), which are cut off again, so the edges match what
+    resampling the whole signal would give.
+    """
+    if orig_sr == new_sr:
+        return audio[..., start:end]
+
+    lo = max(0, start - margin)
+    hi = min(audio.shape[-1], end + margin)
+    out = resample(audio[..., lo:hi], orig_sr, new_sr)
+    skip = round((start - lo) * new_sr / orig_sr)
+    return out[..., skip:skip + round((end - start) * new_sr / orig_sr)]
+
+
+def _open(path: str):
+    """SoundFile for path, or None when libsndfile cannot decode the format"""
+    import soundfile as sf
+
+    try:
+        return sf.SoundFile(path)
+    except RuntimeError:
+        return None
+
+
+def info(path: str) -> tuple[int, int]:
+    """(sample_rate, total frames) without decoding the audio"""
+    f = _open(path)
+    if f is not None:
+        with f:
+            return f.samplerate, f.frames
+    meta = torchaudio.info(path)
+    return meta.sample_rate, meta.num_frames
+
+
+def _to_mono(data) -> torch.Tensor:
+    """(frames, channels) numpy or (channels, frames) tensor -> 1D float32 tensor"""
+    if isinstance(data, torch.Tensor):
+        return data.mean(dim=0) if data.shape[0] > 1 else data[0]
+    mono = data.mean(axis=1) if data.shape[1] > 1 else data[:, 0]
+    return torch.from_numpy(mono)
+
+
+def read_frames(path: str, start_frame: int, num_frames: int) -> tuple[torch.Tensor, int]:
+    """
+    Decode only num_frames frames starting at start_frame, downmixed to mono
+
+    Returns:
+        (1D float32 tensor, sample_rate)
+    """
+    num_frames = max(0, num_frames)
+    f = _open(path)
+    if f is not None:
+        with f:
+            f.seek(min(start_frame, f.frames))
+            data = f.read(num_frames, dtype="float32", always_2d=True)
+            return _to_mono(data), f.samplerate
+
+    waveform, sample_rate = torchaudio.load(path, frame_offset=start_frame, num_frames=num_frames)
+    return _to_mono(waveform), sample_rate
+
+
+def read_range(path: str, start: float, end: float) -> tuple[torch.Tensor, int]:
+    """Decode [start, end) seconds of path as mono (seeks instead of decoding from 0)"""
+    sample_rate, _ = info(path)
+    start_frame = int(start * sample_rate)
+    return read_frames(path, start_frame, int(end * sample_rate) - start_frame)
+
+
+def iter_blocks(
+    path: str,
+    start: float,
+    end: float,
+    block_frames: int,
+) -> Iterator[torch.Tensor]:
+    """
+    Yield [start, end) seconds of path as consecutive mono blocks
+
+    Every block but the last has exactly block_frames frames, so memory
+    stays at one block regardless of the range length.
+    """
+    f = _open(path)
+    if f is not None:
+        with f:
+            start_frame = min(int(start * f.samplerate), f.frames)
+            remaining = int(end * f.samplerate) - start_frame
+            f.seek(start_frame)
+            while remaining > 0:
+                data = f.read(min(block_frames, remaining), dtype="float32", always_2d=True)
+                if len(data) == 0:
+                    break
+                remaining -= len(data)
+                yield _to_mono(data)
+        return
+
+    sample_rate, _ = info(path)
+    frame = int(start * sample_rate)
+    end_frame = int(end * sample_rate)
+    while frame < end_frame:
+        block, _ = read_frames(path, frame, min(block_frames, end_frame - frame))
+        if block.numel() == 0:
+            break
+        frame += block.numel()
+        yield block
+
+
+def block_frames_for(seconds: float, orig_sr: int, new_sr: int) -> int:
+    """Block size near `seconds` that resample_blocks() can stitch exactly"""
+    step = orig_sr // gcd(orig_sr, new_sr)
+    return max(step, round(seconds * orig_sr / step) * step)
+
+
+def resample_blocks(blocks: Iterator[torch.Tensor], orig_sr: int, new_sr: int) -> Iterator[torch.Tensor]:
+    """
+    Resample a block stream without seams at block boundaries
+
+    Each block is resampled together with a little context from its
+    neighbours, and the context is cut off again from the output. Block
+    lengths (except the last) must be multiples of
+    orig_sr / gcd(orig_sr, new_sr); see block_frames_for().
+    """
+    if orig_sr == new_sr:
+        yield from blocks
+        return
+
+    g = gcd(orig_sr, new_sr)
+    step = orig_sr // g
+    # Context is far wider than the resampling kernel and aligned to step
+    pad = step * -(-256 // step)
+
+    def out_len(frames: int) -> int:
+        return -(-frames * new_sr // orig_sr)
+
+    previous_tail = None
+    current = None
+    for block in blocks:
+        if current is not None:
+            yield _resample_with_context(current, previous_tail, block[:pad], orig_sr, new_sr, out_len)
+            previous_tail = current[-pad:]
+        current = block
+    if current is not None:
+        yield _resample_with_context(current, previous_tail, None, orig_sr, new_sr, out_len)
+
+
+def _resample_with_context(block, left, right, orig_sr, new_sr, out_len) -> torch.Tensor:
+    parts = [p for p in (left, block, right) if p is not None]
+    out = resample(torch.cat(parts) if len(parts) > 1 else block, orig_sr, new_sr)
+    skip = out_len(len(left)) if left is not None else 0
+    return out[skip:skip + out_len(len(block))]
@@ -0,0 +1,322 @@
+"""
+Batch Synthesis Worker - resumable bulk TTS jobs
+"""
+from collections import deque
+from pathlib import Path
+from typing import Optional
+import json
+import threading
+import time
+import uuid
+import zipfile
+
+from ..config import BATCH_DIR
+from .executor import inference_executor
+from .inference import inference_worker
+from .pool import inference_pool
+from .. import metrics
+
+# Per-item parameters that may override the job defaults, with their types
+ITEM_FIELDS = {
+    "speakerWav": (str,),
+    "language": (str,),
+    "temperature": (int, float),
+    "speed": (int, float),
+    "topK": (int,),
+    "topP": (int, float),
+    "model": (str,),
+}
+
+
+class BatchSynthesisWorker:
+    """
+    Runs bulk synthesis jobs on the inference executor
+
+    A job lives in BATCH_DIR/<job_id>/:
+        job.json        items and default parameters
+        manifest.jsonl  one line per finished item (append-only progress log)
+        audio/          one file per item, named by item index
+        <job_id>.zip    archive built on request
+
+    Items are ordered by speaker and language so consecutive items reuse the
+    same conditioning latents, and enough items are kept in flight to keep
+    every inference thread busy. After a crash, resume_all() restarts
+    unfinished jobs from the items not yet in their manifest.
+    """
+
+    _instance: Optional["BatchSynthesisWorker"] = None
+    jobs: dict[str, dict] = {}
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    # ---------- job files ----------
+
+    @staticmethod
+    def _job_dir(job_id: str) -> Path:
+        if Path(job_id).name != job_id:
+            raise ValueError("Invalid job id")
+        return BATCH_DIR / job_id
+
+    def _load_job(self, job_id: str) -> dict:
+        with open(self._job_dir(job_id) / "job.json", "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_job(self, job: dict):
+        job_dir = self._job_dir(job["id"])
+        tmp_path = job_dir / "job.json.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(job, f, ensure_ascii=False)
+        tmp_path.replace(job_dir / "job.json")
+
+    def read_manifest(self, job_id: str) -> list[dict]:
+        """Finished items ordered by index (a torn last line from a crash is ignored)"""
+        path = self._job_dir(job_id) / "manifest.jsonl"
+        entries = {}
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    entries[entry["index"]] = entry
+        return [entries[i] for i in sorted(entries)]
+
+    # ---------- submission ----------
+
+    def submit(self, items: list, params: dict) -> str:
+        """
+        Create a job and start it
+
+        Args:
+            items: list of texts or {"text", "id"?, "speakerWav"?, "language"?, ...}
+            params: default synthesis parameters (same keys as /generate) plus format
+
+        Returns:
+            job id
+        """
+        normalized = []
+        for i, item in enumerate(items):
+            if isinstance(item, str):
+                item = {"text": item}
+            if not isinstance(item, dict) or not isinstance(item.get("text"), str) or not item["text"]:
+                raise ValueError(f"Item {i} has no text")
+            entry = {"index": i, "id": item.get("id", str(i)), "text": item["text"]}
+            for k, types in ITEM_FIELDS.items():
+                value = item.get(k)
+                if value is None:
+                    continue
+                if isinstance(value, bool) or not isinstance(value, types):
+                    raise ValueError(f"Item {i}: {k} must be a {types[-1].__name__}")
+                entry[k] = value
+            normalized.append(entry)
+
+        job_id = uuid.uuid4().hex[:12]
+        job_dir = self._job_dir(job_id)
+        (job_dir / "audio").mkdir(parents=True, exist_ok=True)
+
+        job = {
+            "id": job_id,
+            "created": time.time(),
+            "status": "pending",
+            "params": params,
+            "items": normalized,
+        }
+        self._save_job(job)
+        self._start(job)
+        return job_id
+
+    def resume_all(self) -> list[str]:
+        """Restart jobs left unfinished by a previous process"""
+        resumed = []
+        for job_file in sorted(BATCH_DIR.glob("*/job.json")):
+            try:
+                with open(job_file, "r", encoding="utf-8") as f:
+                    job = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if job["status"] in ("pending", "processing") and job["id"] not in self.jobs:
+                print(f"Resuming batch job {job['id']}")
+                self._start(job)
+                resumed.append(job["id"])
+        return resumed
+
+    def cancel(self, job_id: str) -> bool:
+        with self._lock:
+            state = self.jobs.get(job_id)
+            if state is None or state["status"] not in ("pending", "processing"):
+                return False
+            state["cancelled"] = True
+            return True
+
+    def status(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            state = self.jobs.get(job_id)
+            if state is not None:
+                return {k: v for k, v in state.items() if k != "cancelled"}
+
+        # Finished in an earlier process
+        try:
+            job = self._load_job(job_id)
+        except (OSError, ValueError):
+            return None
+        done = self.read_manifest(job_id)
+        return {
+            "status": job["status"],
+            "progress": int(100 * len(done) / len(job["items"])) if job["items"] else 100,
+            "message": job.get("message", ""),
+            "total": len(job["items"]),
+            "completed": sum(1 for e in done if "error" not in e),
+            "failed": sum(1 for e in done if "error" in e),
+        }
+
+    # ---------- execution ----------
+
+    def _start(self, job: dict):
+        finished = self.read_manifest(job["id"])
+        failed = sum(1 for e in finished if "error" in e)
+        with self._lock:
+            self.jobs[job["id"]] = {
+                "status": "pending",
+                "progress": int(100 * len(finished) / len(job["items"])) if job["items"] else 100,
+                "message": "Queued",
+                "total": len(job["items"]),
+                "completed": len(finished) - failed,
+                "failed": failed,
+                "cancelled": False,
+            }
+        threading.Thread(target=self._run_job, args=(job, finished), name=f"batch-{job['id']}", daemon=True).start()
+
+    def _update(self, job_id: str, **fields):
+        with self._lock:
+            self.jobs[job_id].update(fields)
+
+    def _item_params(self, job: dict, item: dict) -> dict:
+        merged = {**job["params"], **{k: item[k] for k in ITEM_FIELDS if k in item}}
+        return {
+            "text": item["text"],
+            "speaker_wav": merged.get("speakerWav", ""),
+            "language": merged.get("language", "ru"),
+            "temperature": merged.get("temperature", 0.7),
+            "speed": merged.get("speed", 1.0),
+            "top_k": merged.get("topK", 50),
+            "top_p": merged.get("topP", 0.85),
+            "model": merged.get("model"),
+        }
+
+    def _run_job(self, job: dict, finished: list[dict]):
+        try:
+            self._run(job, finished)
+        except Exception as e:
+            print(f"Batch job {job['id']} failed: {e}")
+            job["status"] = "failed"
+            job["message"] = str(e)
+            self._save_job(job)
+            self._update(job["id"], status="failed", message=str(e), error=str(e))
+
+    def _run(self, job: dict, finished: list[dict]):
+        job_id = job["id"]
+        done = {e["index"] for e in finished}
+        job_dir = self._job_dir(job_id)
+        fmt = job["params"].get("format", "wav")
+        synthesizer = inference_pool if inference_pool.enabled else inference_worker
+
+        # Group by voice so conditioning latents stay hot in the speaker cache
+        todo = [item for item in job["items"] if item["index"] not in done]
+        todo.sort(key=lambda item: tuple(
+            str(item.get(k, job["params"].get(k)) or "") for k in ("model", "speakerWav", "language")
+        ))
+
+        job["status"] = "processing"
+        self._save_job(job)
+        self._update(job_id, status="processing", message=f"Synthesizing {len(todo)} items...")
+
+        # Items finished before a restart count as they were recorded
+        total = len(job["items"])
+        failed = sum(1 for e in finished if "error" in e)
+        completed = len(finished) - failed
+        depth = inference_executor.max_workers + 1
+        in_flight: deque = deque()
+        pending = iter(todo)
+
+        def synthesize(item: dict) -> dict:
+            params = self._item_params(job, item)
+            result = synthesizer.generate(**params, save=False, response_format=fmt)
+            metrics.observe_synthesis("batch", result["duration"], result["synthesis_time"])
+            filename = f"{item['index']:06d}.{fmt}"
+            (job_dir / "audio" / filename).write_bytes(result["audio"])
+            return {"file": f"audio/{filename}", "duration": result["duration"]}
+
+        with open(job_dir / "manifest.jsonl", "a", encoding="utf-8") as manifest:
+            while True:
+                cancelled = self.jobs[job_id]["cancelled"]
+                while not cancelled and len(in_flight) < depth:
+                    item = next(pending, None)
+                    if item is None:
+                        break
+                    # Counted in the executor's queue depth and cost like HTTP requests
+                    cost = inference_executor.estimate_cost(item["text"])
+                    in_flight.append((item, inference_executor.submit(synthesize, item, cost=cost)))
+                if not in_flight:
+                    break
+
+                item, future = in_flight.popleft()
+                entry = {"index": item["index"], "id": item["id"], "text": item["text"]}
+                try:
+                    entry.update(future.result())
+                    completed += 1
+                except Exception as e:
+                    entry["error"] = str(e)
+                    failed += 1
+
+                manifest.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                manifest.flush()
+
+                finished = completed + failed
+                self._update(
+                    job_id,
+                    progress=int(100 * finished / total),
+                    message=f"Synthesized {finished}/{total}",
+                    completed=completed,
+                    failed=failed,
+                )
+
+        if self.jobs[job_id]["cancelled"]:
+            status, message = "cancelled", "Cancelled"
+        else:
+            status, message = "completed", f"Completed {completed}/{total} ({failed} failed)"
+
+        job["status"] = status
+        job["message"] = message
+        self._save_job(job)
+        self._update(job_id, status=status, message=message, progress=100 if status == "completed" else self.jobs[job_id]["progress"])
+
+    # ---------- results ----------
+
+    def build_archive(self, job_id: str) -> Path:
+        """Zip the job's audio and manifest (rebuilt when the manifest changed)"""
+        job_dir = self._job_dir(job_id)
+        archive = job_dir / f"{job_id}.zip"
+        manifest_path = job_dir / "manifest.jsonl"
+
+        if archive.exists() and manifest_path.exists() and archive.stat().st_mtime >= manifest_path.stat().st_mtime:
+            return archive
+
+        entries = self.read_manifest(job_id)
+        tmp_path = archive.with_suffix(".zip.tmp")
+        # Audio is already compressed or PCM; deflate would cost CPU for little gain
+        with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_STORED) as zf:
+            zf.writestr("manifest.json", json.dumps(entries, ensure_ascii=False, indent=2))
+            for entry in entries:
+                if "file" in entry:
+                    zf.write(job_dir / entry["file"], entry["file"])
+        tmp_path.replace(archive)
+        return archive
+
+
+# Global instance
+batch_worker = BatchSynthesisWorker()
@@ -0,0 +1,128 @@
+"""
+Chunk Writer - parallel encoding and writing of dataset chunks
+"""
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+import json
+
+import numpy as np
+
+from ..config import CHUNK_WRITE_WORKERS, CHUNK_SHARD_MAX_BYTES
+from . import codec
+
+CHUNK_FORMATS = ("wav", "flac")
+
+
+class ChunkWriter:
+    """
+    Encodes and writes dataset chunks on a bounded thread pool
+
+    Chunks are handed over in order with add(); encoding (and, for separate
+    files, the disk write) happens on CHUNK_WRITE_WORKERS threads with at
+    most twice that many chunks in flight, so memory stays bounded.
+    Finished entries come back in submission order.
+
+    With sharded=True, chunks are appended as complete WAV/FLAC files to
+    shard_NNN.bin files of up to CHUNK_SHARD_MAX_BYTES instead of one file
+    per chunk, and index.json records each chunk's shard, offset and length.
+    Appends happen on the caller's thread, in order, so each shard is
+    written sequentially. Sharded output is for export only: the dataset
+    listing, transcription and training read per-chunk files.
+    """
+
+    def __init__(
+        self,
+        dataset_path: Path,
+        sample_rate: int,
+        fmt: str = "wav",
+        sharded: bool = False,
+        workers: int = CHUNK_WRITE_WORKERS,
+        shard_max_bytes: int = CHUNK_SHARD_MAX_BYTES,
+    ):
+        if fmt not in CHUNK_FORMATS:
+            raise ValueError(f"Unsupported chunk format: {fmt} (expected one of {', '.join(CHUNK_FORMATS)})")
+
+        self.dataset_path = dataset_path
+        self.sample_rate = sample_rate
+        self.fmt = fmt
+        self.sharded = sharded
+        self.shard_max_bytes = shard_max_bytes
+        self.max_pending = max(1, workers) * 2
+
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="chunk-writer")
+        self._pending: deque[Future] = deque()
+        self._index: list[dict] = []
+        self._shard = None
+        self._shard_name: Optional[str] = None
+        self._shard_count = 0
+
+    # ---------- producer side ----------
+
+    def add(self, filename: str, audio) -> list[dict]:
+        """
+        Queue one chunk (float audio in [-1, 1] at sample_rate)
+
+        Blocks while max_pending chunks are in flight.
+
+        Returns:
+            entries of chunks that finished meanwhile, in order
+        """
+        # Copy: the encoder clips in place and audio may be a view of the source
+        samples = np.array(audio, dtype=np.float32)
+        self._pending.append(self._pool.submit(self._encode, filename, samples))
+
+        finished = []
+        while len(self._pending) > self.max_pending:
+            finished.append(self._complete(self._pending.popleft()))
+        return finished
+
+    def flush(self) -> list[dict]:
+        """Wait for every queued chunk; returns their entries in order"""
+        finished = []
+        while self._pending:
+            finished.append(self._complete(self._pending.popleft()))
+        return finished
+
+    def close(self):
+        self.flush()
+        self._pool.shutdown(wait=True)
+        if self._shard is not None:
+            self._shard.close()
+            self._shard = None
+        if self.sharded:
+            with open(self.dataset_path / "index.json", "w", encoding="utf-8") as f:
+                json.dump({"format": self.fmt, "sampleRate": self.sample_rate, "chunks": self._index}, f, indent=2)
+
+    # ---------- workers ----------
+
+    def _encode(self, filename: str, samples: np.ndarray) -> dict:
+        wav_bytes, pcm = codec.wav_buffer(samples, self.sample_rate)
+        data = wav_bytes if self.fmt == "wav" else codec.encode(pcm, self.sample_rate, self.fmt)
+
+        entry = {"filename": filename}
+        if self.sharded:
+            entry["data"] = data
+        else:
+            (self.dataset_path / filename).write_bytes(data)
+        return entry
+
+    def _complete(self, future: Future) -> dict:
+        entry = future.result()
+        if self.sharded:
+            data = entry.pop("data")
+            if self._shard is None or self._shard.tell() + len(data) > self.shard_max_bytes:
+                self._next_shard()
+            entry.update(shard=self._shard_name, offset=self._shard.tell(), length=len(data))
+            self._shard.write(data)
+            self._index.append(entry)
+        return entry
+
+    def _next_shard(self):
+        if self._shard is not None:
+            self._shard.close()
+        self._shard_name = f"shard_{self._shard_count:03d}.bin"
+        self._shard_count += 1
+        self._shard = open(self.dataset_path / self._shard_name, "wb")
+
@@ -0,0 +1,79 @@
+"""
+Audio Codec - in-memory encoding of synthesized audio
+"""
+from typing import Optional
+import io
+import struct
+
+import numpy as np
+
+WAV_HEADER_SIZE = 44
+
+# format -> (soundfile format, soundfile subtype, media type)
+FORMATS = {
+    "wav": ("WAV", "PCM_16", "audio/wav"),
+    "flac": ("FLAC", "PCM_16", "audio/flac"),
+    "ogg": ("OGG", "OPUS", "audio/ogg; codecs=opus"),
+    "opus": ("OGG", "OPUS", "audio/ogg; codecs=opus"),
+}
+
+
+def media_type(fmt: str) -> str:
+    return FORMATS[fmt][2]
+
+
+def wav_header(num_samples: int, sample_rate: int) -> bytes:
+    """Header for 16-bit mono PCM WAV"""
+    data_size = num_samples * 2
+    return b"".join([
+        b"RIFF",
+        struct.pack("<I", 36 + data_size),
+        b"WAVE",
+        b"fmt ",
+        struct.pack("<IHHIIHH", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16),
+        b"data",
+        struct.pack("<I", data_size),
+    ])
+
+
+def wav_buffer(wav, sample_rate: int) -> tuple[bytearray, np.ndarray]:
+    """
+    Convert float audio in [-1, 1] to a complete WAV file in one allocation
+
+    The int16 samples are written straight into the data region of the
+    returned buffer, so the PCM view and the WAV bytes share memory.
+
+    Returns:
+        (wav_bytes, pcm16 view into wav_bytes)
+    """
+    wav = np.asarray(wav, dtype=np.float32)
+    buf = bytearray(WAV_HEADER_SIZE + wav.size * 2)
+    buf[:WAV_HEADER_SIZE] = wav_header(wav.size, sample_rate)
+
+    pcm = np.frombuffer(buf, dtype="<i2", offset=WAV_HEADER_SIZE)
+    np.clip(wav, -1.0, 1.0, out=wav)
+    np.multiply(wav, 32767, out=pcm, casting="unsafe")
+    return buf, pcm
+
+
+def encode(pcm: np.ndarray, sample_rate: int, fmt: str) -> bytes:
+    """Encode int16 PCM to wav, flac or ogg/opus bytes"""
+    if fmt == "wav":
+        return wav_header(len(pcm), sample_rate) + pcm.tobytes()
+
+    import soundfile as sf
+
+    sf_format, subtype, _ = FORMATS[fmt]
+    out = io.BytesIO()
+    sf.write(out, pcm, sample_rate, format=sf_format, subtype=subtype)
+    return out.getvalue()
+
+
+def check_format(fmt: Optional[str]) -> Optional[str]:
+    """Validate an output format name (None means no in-memory audio)"""
+    if fmt is None:
+        return None
+    fmt = fmt.lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported audio format: {fmt} (expected one of {', '.join(FORMATS)})")
+    return fmt
@@ -0,0 +1,279 @@
+"""
+Inference Executor - runs blocking synthesis off the event loop with admission control
+"""
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import AsyncIterator, Callable, Iterator, Optional
+import asyncio
+import threading
+import time
+
+from ..config import (
+    INFERENCE_QUEUE_SIZE,
+    INFERENCE_QUEUE_MAX_CHARS,
+    INFERENCE_TIMEOUT,
+    INFERENCE_TIMEOUT_PER_CHAR,
+    INFERENCE_POOL,
+)
+
+
+class QueueFullError(Exception):
+    """Request rejected at admission"""
+
+    def __init__(self, message: str, status_code: int = 503, retry_after: int = 1):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class RequestCancelledError(Exception):
+    """Synthesis stopped because its request expired or was abandoned"""
+
+
+class DeadlineExceededError(RequestCancelledError):
+    """Request did not finish before its deadline"""
+
+
+_STREAM_END = object()
+
+
+class InferenceExecutor:
+    """
+    Dedicated executor for GPU synthesis with a bounded queue
+
+    Requests are admitted only while the number of pending requests is below
+    max_queue and their summed cost (characters of text) stays below
+    max_queued_cost. Rejected requests fail immediately instead of piling up
+    behind a long synthesis.
+
+    Every request carries a cancellation event that is set when its
+    deadline passes or its consumer goes away. Cancellable synthesis
+    functions receive it as `cancel` and stop at the next segment or chunk
+    boundary; requests that end this way are counted as expired or
+    cancelled, never as completed.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 1,
+        max_queue: int = INFERENCE_QUEUE_SIZE,
+        max_queued_cost: int = INFERENCE_QUEUE_MAX_CHARS,
+        default_timeout: float = INFERENCE_TIMEOUT,
+        timeout_per_cost: float = INFERENCE_TIMEOUT_PER_CHAR,
+    ):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.max_queued_cost = max_queued_cost
+        self.default_timeout = default_timeout
+        self.timeout_per_cost = timeout_per_cost
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._pending_cost = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._expired = 0
+        self._cancelled = 0
+
+    @staticmethod
+    def estimate_cost(text: str) -> int:
+        """Synthesis cost estimate - XTTS time grows roughly linearly with text length"""
+        return max(1, len(text))
+
+    def _admit(self, cost: int):
+        with self._lock:
+            if self._pending >= self.max_queue + self.max_workers:
+                self._rejected += 1
+                raise QueueFullError("Inference queue is full", status_code=503)
+            if self._pending and self._pending_cost + cost > self.max_queued_cost:
+                self._rejected += 1
+                raise QueueFullError(
+                    "Too much queued synthesis work, retry later",
+                    status_code=429,
+                    retry_after=max(1, int(self._pending_cost / 1000)),
+                )
+            self._pending += 1
+            self._pending_cost += cost
+
+    def _release(self, cost: int, future: Future):
+        succeeded = not future.cancelled() and future.exception() is None
+        with self._lock:
+            self._pending -= 1
+            self._pending_cost -= cost
+            if succeeded:
+                self._completed += 1
+
+    def _submit(self, fn: Callable, cost: int, deadline: float, cancel: threading.Event) -> Future:
+        def task():
+            if cancel.is_set():
+                # Already counted by whoever gave up on the request
+                raise RequestCancelledError("Request was cancelled while queued")
+            if time.monotonic() > deadline:
+                with self._lock:
+                    self._expired += 1
+                raise DeadlineExceededError("Request deadline expired while queued")
+
+            with self._lock:
+                self._running += 1
+            try:
+                result = fn()
+            finally:
+                with self._lock:
+                    self._running -= 1
+            if cancel.is_set():
+                raise RequestCancelledError("Request was cancelled while running")
+            return result
+
+        self._admit(cost)
+        future = self._executor.submit(task)
+        future.add_done_callback(lambda f: self._release(cost, f))
+        return future
+
+    def _deadline(self, timeout: Optional[float], cost: int = 1) -> tuple[float, float]:
+        """Explicit timeout, or the default scaled with the request's cost"""
+        timeout = timeout or max(self.default_timeout, cost * self.timeout_per_cost)
+        return timeout, time.monotonic() + timeout
+
+    async def run(
+        self,
+        fn: Callable,
+        *args,
+        cost: int = 1,
+        timeout: Optional[float] = None,
+        cancellable: bool = False,
+        **kwargs,
+    ):
+        """
+        Run fn(*args, **kwargs) on the inference thread
+
+        With cancellable=True, fn is also passed cancel=<threading.Event>,
+        which is set when the deadline passes so fn can stop early.
+
+        Raises:
+            QueueFullError: queue is full or over its cost budget
+            DeadlineExceededError: not finished within timeout seconds
+        """
+        timeout, deadline = self._deadline(timeout, cost)
+        cancel = threading.Event()
+        if cancellable:
+            kwargs["cancel"] = cancel
+        future = self._submit(lambda: fn(*args, **kwargs), cost, deadline, cancel)
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            # Drops the request if it has not started yet, otherwise asks it to stop
+            cancel.set()
+            future.cancel()
+            with self._lock:
+                self._expired += 1
+            raise DeadlineExceededError(f"Synthesis did not finish within {timeout:.0f}s")
+        except asyncio.CancelledError:
+            # Client went away
+            cancel.set()
+            future.cancel()
+            with self._lock:
+                self._cancelled += 1
+            raise
+
+    def stream(
+        self,
+        gen_fn: Callable[[], Iterator],
+        cost: int = 1,
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator:
+        """
+        Run a blocking generator on the inference thread and iterate it asynchronously
+
+        Admission happens immediately (so QueueFullError is raised here, before
+        any response is started). The deadline only applies to time spent
+        waiting in the queue; once audio starts flowing it is not cut off.
+        When the consumer stops iterating, the generator is abandoned at the
+        next chunk.
+        """
+        _, deadline = self._deadline(timeout, cost)
+        loop = asyncio.get_running_loop()
+        items: asyncio.Queue = asyncio.Queue()
+        cancelled = threading.Event()
+
+        def produce():
+            for item in gen_fn():
+                if cancelled.is_set():
+                    break
+                loop.call_soon_threadsafe(items.put_nowait, item)
+
+        future = self._submit(produce, cost, deadline, cancelled)
+        # Runs after the last item was queued, or right away if never started
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(items.put_nowait, _STREAM_END))
+
+        async def consume():
+            try:
+                while True:
+                    item = await items.get()
+                    if item is _STREAM_END:
+                        # Re-raise producer or deadline errors
+                        future.result()
+                        return
+                    yield item
+            finally:
+                if not future.done():
+                    cancelled.set()
+                    future.cancel()
+                    with self._lock:
+                        self._cancelled += 1
+
+        return consume()
+
+    def submit(self, fn: Callable, *args, cost: Optional[int] = None, **kwargs) -> Future:
+        """
+        Queue fn on the inference thread(s) without admission control
+
+        For internal work (preloading, warmup, batch jobs) that paces itself
+        instead of going through the request queue limits. With a cost, the
+        work is never rejected but is counted in the queue depth, queued
+        cost and completion stats like admitted requests, so /queue and
+        admission of HTTP requests see the load.
+        """
+        if cost is None:
+            return self._executor.submit(fn, *args, **kwargs)
+
+        def task():
+            with self._lock:
+                self._running += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+
+        with self._lock:
+            self._pending += 1
+            self._pending_cost += cost
+        future = self._executor.submit(task)
+        future.add_done_callback(lambda f: self._release(cost, f))
+        return future
+
+    def call(self, fn: Callable, *args, **kwargs):
+        """Run fn on the inference thread from another (non-async) thread and wait"""
+        return self.submit(fn, *args, **kwargs).result()
+
+    def stats(self) -> dict:
+        """Queue depth and counters"""
+        with self._lock:
+            return {
+                "queued": self._pending - self._running,
+                "running": self._running,
+                "queuedCost": self._pending_cost,
+                "maxQueue": self.max_queue,
+                "maxQueuedCost": self.max_queued_cost,
+                "workers": self.max_workers,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "expired": self._expired,
+                "cancelled": self._cancelled,
+            }
+
+
+# Global instance - one thread per pool worker process (or one in-process)
+inference_executor = InferenceExecutor(max_workers=max(1, len(INFERENCE_POOL)))
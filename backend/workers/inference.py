@@ -1,45 +1,145 @@
 """
 Inference Worker - TTS generation using XTTS v2
 """
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
+import re
+import threading
+import time
 import uuid
+import io
 import numpy as np
 import scipy.io.wavfile as wavfile
+import soundfile as sf
 
-from ..config import XTTS_MODEL, OUTPUT_DIR, SPEAKERS_DIR, CACHE_DIR
+from ..config import OUTPUT_DIR, SPEAKERS_DIR, CACHE_DIR, LONG_TEXT_CROSSFADE_MS
+from .models import model_registry
+from .speaker_cache import speaker_latent_cache
+from .speakers import speaker_index
+from .executor import RequestCancelledError
+from . import codec
+
+# XTTS v2 output sample rate
+SAMPLE_RATE = 24000
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…;])\s+|\n+")
+_CLAUSE_END = re.compile(r"(?<=[,:—])\s+")
+
+
+def split_sentences(text: str, max_chars: int = 250) -> list[str]:
+    """
+    Split text into sentence-sized segments of at most max_chars
+
+    Short sentences are packed together; sentences over the limit are split
+    on clause punctuation and then on whitespace.
+    """
+    pieces = []
+    for sentence in _SENTENCE_END.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if len(sentence) <= max_chars:
+            pieces.append(sentence)
+            continue
+        for clause in _CLAUSE_END.split(sentence):
+            while len(clause) > max_chars:
+                cut = clause.rfind(" ", 0, max_chars)
+                if cut <= 0:
+                    cut = max_chars
+                pieces.append(clause[:cut].strip())
+                clause = clause[cut:].strip()
+            if clause:
+                pieces.append(clause)
+
+    segments = []
+    for piece in pieces:
+        if segments and len(segments[-1]) + 1 + len(piece) <= max_chars:
+            segments[-1] = f"{segments[-1]} {piece}"
+        else:
+            segments.append(piece)
+    return segments
+
+
+class _SegmentWriter:
+    """
+    Writes synthesized segments to one or more audio files, crossfading at
+    the joins
+
+    targets are (path or file object, format) pairs that all receive the
+    same samples as they are produced, so e.g. the saved WAV and an
+    encoded response are written side by side without re-reading either.
+    """
+
+    def __init__(self, targets: list[tuple], sample_rate: int, crossfade_ms: int):
+        self.sample_rate = sample_rate
+        self.fade_len = int(sample_rate * crossfade_ms / 1000)
+        self.fade_in = np.linspace(0.0, 1.0, self.fade_len, dtype=np.float32)
+        self.fade_out = 1.0 - self.fade_in
+        self.tail = np.zeros(0, dtype=np.float32)
+        self.samples = 0
+        self.files = []
+        for target, fmt in targets:
+            sf_format, subtype, _ = codec.FORMATS[fmt]
+            if isinstance(target, Path):
+                target = str(target)
+            self.files.append(
+                sf.SoundFile(target, "w", samplerate=sample_rate, channels=1, format=sf_format, subtype=subtype)
+            )
+
+    def _emit(self, samples: np.ndarray):
+        for f in self.files:
+            f.write(samples)
+
+    def write(self, wav, timing: dict):
+        """Append one segment; the last fade_len samples are held back for the next join"""
+        started = time.perf_counter()
+        wav = np.asarray(wav, dtype=np.float32)
+        np.clip(wav, -1.0, 1.0, out=wav)
+
+        n = min(self.fade_len, len(self.tail), len(wav))
+        if n:
+            head = wav[:n] * self.fade_in[-n:] + self.tail[-n:] * self.fade_out[:n]
+            self._emit(self.tail[:-n])
+            self._emit(head)
+            wav = wav[n:]
+        else:
+            self._emit(self.tail)
+        self.samples += len(self.tail) - n
+
+        keep = min(self.fade_len, len(wav))
+        body = wav[:len(wav) - keep]
+        self._emit(body)
+        self.samples += n + len(body)
+        self.tail = wav[len(wav) - keep:].copy()
+
+        timing["postTime"] = time.perf_counter() - started
+
+    def close(self):
+        self._emit(self.tail)
+        self.samples += len(self.tail)
+        self.tail = np.zeros(0, dtype=np.float32)
+        for f in self.files:
+            f.close()
 
 
 class InferenceWorker:
     """Singleton XTTS model for speech synthesis"""
 
     _instance: Optional["InferenceWorker"] = None
-    _tts = None
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
         return cls._instance
 
-    def _load_model(self):
-        """Lazy load XTTS model"""
-        if self._tts is None:
-            import torch
-
-            # Patch torch.load for compatibility
-            _original_torch_load = torch.load
-            def _patched_torch_load(*args, **kwargs):
-                kwargs.setdefault('weights_only', False)
-                return _original_torch_load(*args, **kwargs)
-            torch.load = _patched_torch_load
+    def _load_model(self, model: Optional[str] = None) -> tuple:
+        """Get (model, model_id) from the registry, loading it on first use"""
+        return model_registry.get(model)
 
-            from TTS.api import TTS
-
-            print(f"Loading XTTS model: {XTTS_MODEL}")
-            self._tts = TTS(XTTS_MODEL, gpu=True)
-            print("XTTS model loaded")
-
-        return self._tts
+    def warmup(self, model: Optional[str] = None):
+        """Synthesize one short phrase so CUDA kernels and latents are initialized"""
+        self.generate("Warmup.", language="en", model=model, save=False)
 
     def _get_default_speaker(self) -> str:
         """Get or create default speaker WAV"""
@@ -58,6 +158,36 @@ class InferenceWorker:
 
         return str(default_speaker)
 
+    def resolve_speaker(self, speaker_wav: Optional[str]) -> str:
+        """Resolve speaker name or path to a reference WAV path"""
+        if speaker_wav:
+            # Names and SPEAKERS_DIR paths are index hits; other paths are used as given
+            entry = speaker_index.get(speaker_wav)
+            if entry is not None:
+                return entry["path"]
+            if Path(speaker_wav).exists():
+                return speaker_wav
+
+        return self._get_default_speaker()
+
+    def precompute_conditioning(self, speaker_wav: str, model: Optional[str] = None):
+        """Compute and cache latents for a reference file if the model is already loaded"""
+        if not model_registry.is_resident(model):
+            return
+        self._conditioning(speaker_wav, model)
+
+    def _conditioning(self, speaker_wav: Optional[str], model_name: Optional[str] = None) -> tuple:
+        """Load model and get (model, gpt_cond_latent, speaker_embedding)"""
+        model, model_id = self._load_model(model_name)
+
+        # Conditioning latents are cached per reference file and model
+        speaker_wav = self.resolve_speaker(speaker_wav)
+        gpt_cond_latent, speaker_embedding = speaker_latent_cache.get(model, model_id, speaker_wav)
+        if Path(speaker_wav).parent == SPEAKERS_DIR:
+            speaker_index.mark_conditioning(Path(speaker_wav).name, model_id)
+
+        return model, gpt_cond_latent, speaker_embedding
+
     def generate(
         self,
         text: str,
@@ -67,6 +197,10 @@ class InferenceWorker:
         speed: float = 1.0,
         top_k: int = 50,
         top_p: float = 0.85,
+        model: Optional[str] = None,
+        save: bool = True,
+        response_format: Optional[str] = None,
+        cancel: Optional[threading.Event] = None,
     ) -> dict:
         """
         Generate speech from text
@@ -79,59 +213,246 @@ class InferenceWorker:
             speed: Speech speed multiplier
             top_k: Top-k sampling
             top_p: Top-p sampling
+            model: Registry model name (None for the base model)
+            save: Write a WAV to OUTPUT_DIR and return its URL
+            response_format: Also return encoded audio bytes ("wav", "flac", "ogg")
+            cancel: Set when the request expired; checked before synthesis starts
 
         Returns:
-            dict with audio_url, duration, id
+            dict with id, duration, synthesis_time, audio_url (if saved),
+            audio and media_type (if requested)
         """
-        tts = self._load_model()
-
-        # Get speaker wav
-        if not speaker_wav or not Path(speaker_wav).exists():
-            # Try to find in speakers directory
-            if speaker_wav:
-                speaker_path = SPEAKERS_DIR / speaker_wav
-                if speaker_path.exists():
-                    speaker_wav = str(speaker_path)
-                else:
-                    speaker_wav = self._get_default_speaker()
-            else:
-                speaker_wav = self._get_default_speaker()
-
-        # Generate audio
-        wav = tts.tts(
-            text=text,
-            speaker_wav=speaker_wav,
-            language=language,
-        )
+        import torch
+
+        started = time.perf_counter()
+        with torch.inference_mode():
+            xtts, gpt_cond_latent, speaker_embedding = self._conditioning(speaker_wav, model)
+            if cancel is not None and cancel.is_set():
+                raise RequestCancelledError("Synthesis cancelled")
+
+            # Generate audio
+            out = xtts.inference(
+                text,
+                language,
+                gpt_cond_latent,
+                speaker_embedding,
+                temperature=temperature,
+                length_penalty=xtts.config.length_penalty,
+                repetition_penalty=xtts.config.repetition_penalty,
+                top_k=top_k,
+                top_p=top_p,
+                speed=speed,
+                enable_text_splitting=True,
+            )
+        wav = out["wav"]
+
+        # Samples are converted once, straight into a WAV buffer
+        output_id = str(uuid.uuid4())
+        wav_bytes, pcm = codec.wav_buffer(wav, SAMPLE_RATE)
+
+        result = {
+            "id": output_id,
+            "duration": len(pcm) / SAMPLE_RATE,
+            "synthesis_time": time.perf_counter() - started,
+        }
+
+        if save:
+            output_path = OUTPUT_DIR / f"{output_id}.wav"
+            output_path.write_bytes(wav_bytes)
+            result["audio_url"] = f"/api/inference/audio/{output_id}.wav"
+
+        if response_format:
+            result["audio"] = wav_bytes if response_format == "wav" else codec.encode(pcm, SAMPLE_RATE, response_format)
+            result["media_type"] = codec.media_type(response_format)
+
+        return result
+
+    def generate_long(
+        self,
+        text: str,
+        speaker_wav: str = None,
+        language: str = "ru",
+        temperature: float = 0.7,
+        speed: float = 1.0,
+        top_k: int = 50,
+        top_p: float = 0.85,
+        model: Optional[str] = None,
+        crossfade_ms: int = LONG_TEXT_CROSSFADE_MS,
+        save: bool = True,
+        response_format: Optional[str] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> dict:
+        """
+        Generate speech for long text, sentence by sentence
+
+        Segments are synthesized one after another while the previous
+        segment is post-processed and appended to the output file on a
+        second thread, so only one or two segments are held in memory.
+
+        With save=False the output is encoded in memory instead of going
+        through OUTPUT_DIR. When cancel is set (the request's deadline
+        passed) synthesis stops before the next segment and the partial
+        output is discarded.
+
+        Returns:
+            dict with id, duration, per-segment timings, audio_url (if saved),
+            audio and media_type (if requested)
+        """
+        import torch
+
+        started = time.perf_counter()
+        with torch.inference_mode():
+            xtts, gpt_cond_latent, speaker_embedding = self._conditioning(speaker_wav, model)
+
+        char_limits = getattr(xtts.tokenizer, "char_limits", {})
+        segments = split_sentences(text, char_limits.get(language.split("-")[0], 250))
 
-        # Save output
         output_id = str(uuid.uuid4())
         output_path = OUTPUT_DIR / f"{output_id}.wav"
+        # A non-WAV response is encoded alongside the saved WAV, so the
+        # output is never read back and decoded in full
+        targets = [(output_path, "wav")] if save else []
+        if response_format and not (save and response_format == "wav"):
+            buffer = io.BytesIO()
+            targets.append((buffer, response_format))
+        writer = _SegmentWriter(targets, SAMPLE_RATE, crossfade_ms)
+        timings = []
+        try:
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts-post") as post:
+                pending = None
+                for i, segment in enumerate(segments):
+                    if cancel is not None and cancel.is_set():
+                        raise RequestCancelledError(f"Synthesis cancelled after {i}/{len(segments)} segments")
+                    seg_started = time.perf_counter()
+                    with torch.inference_mode():
+                        out = xtts.inference(
+                            segment,
+                            language,
+                            gpt_cond_latent,
+                            speaker_embedding,
+                            temperature=temperature,
+                            length_penalty=xtts.config.length_penalty,
+                            repetition_penalty=xtts.config.repetition_penalty,
+                            top_k=top_k,
+                            top_p=top_p,
+                            speed=speed,
+                            enable_text_splitting=False,
+                        )
+                    wav = out["wav"]
+                    timing = {
+                        "index": i,
+                        "chars": len(segment),
+                        "synthesisTime": time.perf_counter() - seg_started,
+                        "duration": len(wav) / SAMPLE_RATE,
+                    }
+                    timings.append(timing)
 
-        wav_array = np.array(wav)
-        wav_int16 = (wav_array * 32767).astype(np.int16)
-        wavfile.write(str(output_path), 24000, wav_int16)
+                    # Wait for segment i-1 before queueing i (surfaces errors, bounds memory)
+                    if pending is not None:
+                        pending.result()
+                    pending = post.submit(writer.write, wav, timing)
+                    del out, wav
 
-        duration = len(wav) / 24000
+                if pending is not None:
+                    pending.result()
+        except BaseException:
+            writer.close()
+            if save:
+                output_path.unlink(missing_ok=True)
+            raise
+        else:
+            writer.close()
 
-        return {
+        result = {
             "id": output_id,
-            "audio_url": f"/api/inference/audio/{output_id}.wav",
-            "duration": duration,
+            "duration": writer.samples / SAMPLE_RATE,
+            "segments": timings,
+            "synthesis_time": time.perf_counter() - started,
         }
 
-    def list_speakers(self) -> list[dict]:
-        """List available speaker WAV files"""
-        speakers = []
+        if save:
+            result["audio_url"] = f"/api/inference/audio/{output_id}.wav"
+        if save and response_format == "wav":
+            result["audio"] = output_path.read_bytes()
+        elif response_format:
+            result["audio"] = buffer.getvalue()
+
+        if response_format:
+            result["media_type"] = codec.media_type(response_format)
+
+        return result
+
+    def generate_stream(
+        self,
+        text: str,
+        speaker_wav: str = None,
+        language: str = "ru",
+        temperature: float = 0.7,
+        speed: float = 1.0,
+        top_k: int = 50,
+        top_p: float = 0.85,
+        model: Optional[str] = None,
+        stream_chunk_size: int = 20,
+        stats: dict = None,
+    ) -> Iterator[bytes]:
+        """
+        Generate speech from text, yielding audio as it is produced
 
-        if SPEAKERS_DIR.exists():
-            for wav_file in SPEAKERS_DIR.glob("*.wav"):
-                speakers.append({
-                    "name": wav_file.stem,
-                    "path": str(wav_file),
-                })
+        Args:
+            text: Text to synthesize
+            speaker_wav: Path to speaker reference audio
+            language: Target language
+            temperature: Generation temperature
+            speed: Speech speed multiplier
+            top_k: Top-k sampling
+            top_p: Top-p sampling
+            model: Registry model name (None for the base model)
+            stream_chunk_size: GPT tokens per yielded chunk (smaller = faster first chunk)
+            stats: Optional dict filled with time_to_first_chunk, synthesis_time, duration
 
-        return speakers
+        Yields:
+            Mono 16-bit little-endian PCM at SAMPLE_RATE
+        """
+        if stats is None:
+            stats = {}
+
+        started = time.perf_counter()
+        xtts, gpt_cond_latent, speaker_embedding = self._conditioning(speaker_wav, model)
+
+        chunks = xtts.inference_stream(
+            text,
+            language,
+            gpt_cond_latent,
+            speaker_embedding,
+            stream_chunk_size=stream_chunk_size,
+            temperature=temperature,
+            length_penalty=xtts.config.length_penalty,
+            repetition_penalty=xtts.config.repetition_penalty,
+            top_k=top_k,
+            top_p=top_p,
+            speed=speed,
+            enable_text_splitting=True,
+        )
+
+        total_samples = 0
+        for chunk in chunks:
+            pcm = chunk.detach().float().cpu().numpy()
+            np.clip(pcm, -1.0, 1.0, out=pcm)
+            pcm_int16 = (pcm * 32767).astype("<i2")
+
+            if "time_to_first_chunk" not in stats:
+                stats["time_to_first_chunk"] = time.perf_counter() - started
+
+            total_samples += len(pcm_int16)
+            stats["duration"] = total_samples / SAMPLE_RATE
+            yield pcm_int16.tobytes()
+
+        stats["synthesis_time"] = time.perf_counter() - started
+        stats.setdefault("duration", 0.0)
+
+    def list_speakers(self) -> list[dict]:
+        """List indexed speaker reference files"""
+        return speaker_index.list()
 
 
 # Global instance
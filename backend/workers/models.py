@@ -0,0 +1,408 @@
+"""
+Model Registry - named XTTS models with LRU residency
+"""
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Optional
+import threading
+import time
+
+from ..config import (
+    XTTS_MODEL,
+    MODELS_DIR,
+    MODEL_DEVICE_BUDGET_MB,
+    MODEL_HOST_BUDGET_MB,
+    XTTS_DEVICE,
+    XTTS_CPU_QUANTIZE,
+    XTTS_CPU_THREADS,
+    XTTS_CPU_INTEROP_THREADS,
+    XTTS_COMPILE,
+)
+
+DEFAULT_MODEL = "default"
+CHECKPOINT_NAMES = ("model.pth", "best_model.pth")
+
+
+class ModelNotFoundError(Exception):
+    """Requested model is not the base model or a servable checkpoint in MODELS_DIR"""
+
+
+def _patch_torch_load():
+    """Default torch.load to weights_only=False (XTTS checkpoints pickle configs)"""
+    import torch
+
+    if getattr(torch.load, "_xtts_patched", False):
+        return
+
+    _original_torch_load = torch.load
+
+    def _patched_torch_load(*args, **kwargs):
+        kwargs.setdefault("weights_only", False)
+        return _original_torch_load(*args, **kwargs)
+
+    _patched_torch_load._xtts_patched = True
+    torch.load = _patched_torch_load
+
+
+def _conv1d_to_linear(module):
+    """
+    Replace transformers Conv1D (used by GPT-2 for attention and MLP) with
+    equivalent nn.Linear layers so dynamic quantization can pick them up
+    """
+    import torch
+    from transformers.pytorch_utils import Conv1D
+
+    for name, child in module.named_children():
+        if isinstance(child, Conv1D):
+            in_features, out_features = child.weight.shape
+            linear = torch.nn.Linear(in_features, out_features)
+            with torch.no_grad():
+                linear.weight.copy_(child.weight.t())
+                linear.bias.copy_(child.bias)
+            setattr(module, name, linear)
+        else:
+            _conv1d_to_linear(child)
+
+
+def configure_cpu_threads(num_threads: int = XTTS_CPU_THREADS, interop_threads: int = XTTS_CPU_INTEROP_THREADS):
+    """Apply intra-op / inter-op thread counts (inter-op can only be set once per process)"""
+    import torch
+
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    if interop_threads:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError:
+            # Parallel work already started in this process
+            pass
+
+
+def optimize_for_cpu(model, quantize: bool = XTTS_CPU_QUANTIZE):
+    """
+    Prepare an XTTS model for CPU serving
+
+    Dynamic int8 quantization is applied to the GPT-2 transformer blocks and
+    to the Linear layers of the HiFi-GAN decoder. The embeddings, the text
+    and mel heads and the convolutional waveform generator stay in fp32:
+    the heads drive sampling and are sensitive to quantization error, and
+    dynamic quantization does not apply to convolutions.
+    """
+    import torch
+
+    model.eval()
+    for p in model.parameters():
+        p.requires_grad_(False)
+
+    if quantize:
+        # gpt.gpt is shared with the inference wrapper, so in-place swaps reach both
+        _conv1d_to_linear(model.gpt.gpt)
+        torch.ao.quantization.quantize_dynamic(model.gpt.gpt, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+        torch.ao.quantization.quantize_dynamic(model.hifigan_decoder, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+    return model
+
+
+def _model_bytes(model) -> int:
+    params = sum(p.numel() * p.element_size() for p in model.parameters())
+    buffers = sum(b.numel() * b.element_size() for b in model.buffers())
+    return params + buffers
+
+
+class ModelRegistry:
+    """
+    Loads XTTS models by name and keeps recently used ones resident
+
+    "default" (or an empty name) is the hub model from XTTS_MODEL; any other
+    name refers to a directory in MODELS_DIR holding config.json, vocab.json
+    and model.pth (or best_model.pth).
+
+    Resident models are tracked in LRU order. When models on the device
+    exceed MODEL_DEVICE_BUDGET_MB the least recently used ones are moved to
+    host memory; when host copies exceed MODEL_HOST_BUDGET_MB they are
+    unloaded. Concurrent requests for a cold model share one load.
+
+    Residency changes happen inside get(), which runs on the inference
+    thread, so a model is never moved while it is synthesizing.
+    """
+
+    def __init__(
+        self,
+        device: str = XTTS_DEVICE,
+        device_budget_mb: int = MODEL_DEVICE_BUDGET_MB,
+        host_budget_mb: int = MODEL_HOST_BUDGET_MB,
+        cpu_quantize: bool = XTTS_CPU_QUANTIZE,
+        compile: bool = XTTS_COMPILE,
+    ):
+        self._device = device
+        self.cpu_quantize = cpu_quantize
+        self.compile = compile
+        self._threads_configured = False
+        self.device_budget = device_budget_mb * 1024 * 1024
+        self.host_budget = host_budget_mb * 1024 * 1024
+
+        self._lock = threading.Lock()
+        # name -> {"model", "model_id", "device", "bytes", "last_used", "load_time"}
+        self._resident: dict[str, dict] = {}
+        self._loading: dict[str, Future] = {}
+
+    @property
+    def device(self) -> str:
+        """Serving device; "auto" picks CUDA when available"""
+        if self._device == "auto":
+            import torch
+
+            self._device = "cuda" if torch.cuda.is_available() else "cpu"
+        return self._device
+
+    def _variant(self) -> str:
+        """Suffix for model ids when weights are transformed at load time"""
+        return "#cpu-int8" if self.device == "cpu" and self.cpu_quantize else ""
+
+    def resolve(self, name: Optional[str]) -> tuple[str, str]:
+        """
+        Normalize a model name
+
+        Returns:
+            (name, model_id) - model_id identifies weights for cache keys
+        """
+        if not name or name in (DEFAULT_MODEL, XTTS_MODEL):
+            return DEFAULT_MODEL, XTTS_MODEL + self._variant()
+
+        # Accept the absolute path of a model directory directly under
+        # MODELS_DIR; nested paths are rejected, models are named by their
+        # directory there (see list() and load)
+        path = Path(name)
+        if path.is_absolute():
+            if path.parent.resolve() != MODELS_DIR.resolve():
+                raise ModelNotFoundError(f"Model path must be a directory directly under {MODELS_DIR}")
+            name = path.name
+
+        model_dir = MODELS_DIR / name
+        if Path(name).name != name or not self._is_servable(model_dir):
+            raise ModelNotFoundError(f"Model not found or not servable: {name}")
+
+        checkpoint = self._checkpoint_path(model_dir)
+        return name, f"{model_dir}@{checkpoint.stat().st_mtime_ns}{self._variant()}"
+
+    @staticmethod
+    def _checkpoint_path(model_dir: Path) -> Optional[Path]:
+        for filename in CHECKPOINT_NAMES:
+            if (model_dir / filename).exists():
+                return model_dir / filename
+        return None
+
+    def _is_servable(self, model_dir: Path) -> bool:
+        return (
+            model_dir.is_dir()
+            and (model_dir / "config.json").exists()
+            and (model_dir / "vocab.json").exists()
+            and self._checkpoint_path(model_dir) is not None
+        )
+
+    def available(self) -> list[dict]:
+        """List servable models and their residency"""
+        names = [DEFAULT_MODEL]
+        if MODELS_DIR.exists():
+            names += sorted(d.name for d in MODELS_DIR.iterdir() if self._is_servable(d))
+        return self._describe(names)
+
+    def loaded(self) -> list[dict]:
+        """Resident and loading models only, without scanning MODELS_DIR"""
+        with self._lock:
+            names = sorted(set(self._resident) | set(self._loading))
+        return self._describe(names)
+
+    def _describe(self, names: list[str]) -> list[dict]:
+        with self._lock:
+            resident = {name: dict(entry) for name, entry in self._resident.items()}
+            loading = set(self._loading)
+
+        models = []
+        for name in names:
+            entry = resident.get(name)
+            models.append({
+                "name": name,
+                "state": "loading" if name in loading else entry["device"] if entry else "unloaded",
+                "sizeMb": round(entry["bytes"] / 1024 / 1024, 1) if entry else None,
+                "loadTime": entry["load_time"] if entry else None,
+            })
+        return models
+
+    def is_resident(self, name: Optional[str] = None) -> bool:
+        """Whether a model is loaded (on device or host) without loading it"""
+        name, _ = self.resolve(name)
+        with self._lock:
+            return name in self._resident
+
+    def get(self, name: Optional[str] = None) -> tuple:
+        """
+        Get a model on the serving device, loading it if needed
+
+        Returns:
+            (model, model_id)
+        """
+        name, model_id = self.resolve(name)
+
+        with self._lock:
+            entry = self._resident.get(name)
+            if entry is not None and entry["model_id"] != model_id:
+                # Checkpoint was replaced on disk
+                self._resident.pop(name)
+                entry = None
+
+            if entry is None:
+                future = self._loading.get(name)
+                owner = future is None
+                if owner:
+                    future = Future()
+                    self._loading[name] = future
+            else:
+                owner = False
+                future = None
+
+        if future is not None:
+            if not owner:
+                future.result()
+                return self.get(name)
+
+            try:
+                started = time.perf_counter()
+                model = self._load(name)
+                entry = {
+                    "model": model,
+                    "model_id": model_id,
+                    "device": self.device,
+                    "bytes": _model_bytes(model),
+                    "last_used": time.monotonic(),
+                    "load_time": time.perf_counter() - started,
+                }
+                with self._lock:
+                    self._resident[name] = entry
+                future.set_result(None)
+            except BaseException as e:
+                future.set_exception(e)
+                raise
+            finally:
+                with self._lock:
+                    self._loading.pop(name, None)
+            print(f"Loaded model {name} in {entry['load_time']:.1f}s ({entry['bytes'] / 1024 / 1024:.0f} MB)")
+
+        if entry["device"] != self.device:
+            print(f"Moving model {name} to {self.device}")
+            entry["model"].to(self.device)
+            entry["device"] = self.device
+
+        entry["last_used"] = time.monotonic()
+        self._enforce_budget(keep=name)
+        return entry["model"], model_id
+
+    def _load(self, name: str):
+        if self.device == "cpu" and not self._threads_configured:
+            configure_cpu_threads()
+            self._threads_configured = True
+
+        model = self._load_weights(name)
+
+        if self.device == "cpu":
+            optimize_for_cpu(model, quantize=self.cpu_quantize)
+        else:
+            model.eval()
+
+        if self.compile:
+            import torch
+
+            # Autoregressive GPT sampling does not compile well; the vocoder does
+            decoder = model.hifigan_decoder
+            decoder.waveform_decoder = torch.compile(decoder.waveform_decoder, dynamic=True)
+
+        return model
+
+    def _load_weights(self, name: str):
+        _patch_torch_load()
+
+        if name == DEFAULT_MODEL:
+            from TTS.api import TTS
+
+            print(f"Loading XTTS model: {XTTS_MODEL}")
+            tts = TTS(XTTS_MODEL, gpu=False)
+            return tts.synthesizer.tts_model.to(self.device)
+
+        from TTS.tts.configs.xtts_config import XttsConfig
+        from TTS.tts.models.xtts import Xtts
+
+        model_dir = MODELS_DIR / name
+        print(f"Loading fine-tuned XTTS model: {model_dir}")
+        config = XttsConfig()
+        config.load_json(str(model_dir / "config.json"))
+        model = Xtts.init_from_config(config)
+        model.load_checkpoint(
+            config,
+            checkpoint_path=str(self._checkpoint_path(model_dir)),
+            vocab_path=str(model_dir / "vocab.json"),
+            eval=True,
+        )
+        return model.to(self.device)
+
+    def _enforce_budget(self, keep: str):
+        """Offload or unload least recently used models until within budget"""
+        changed = False
+        with self._lock:
+            lru = sorted(
+                (n for n in self._resident if n != keep),
+                key=lambda n: self._resident[n]["last_used"],
+            )
+
+            if self.device != "cpu":
+                on_device = sum(e["bytes"] for e in self._resident.values() if e["device"] == self.device)
+                for name in lru:
+                    if on_device <= self.device_budget:
+                        break
+                    entry = self._resident[name]
+                    if entry["device"] == self.device:
+                        print(f"Offloading model {name} to host memory")
+                        entry["model"].to("cpu")
+                        entry["device"] = "cpu"
+                        on_device -= entry["bytes"]
+                        changed = True
+                host_limit = self.host_budget
+            else:
+                # Serving from host memory: the device budget is the host budget
+                host_limit = self.device_budget
+
+            on_host = sum(e["bytes"] for e in self._resident.values() if e["device"] == "cpu")
+            for name in lru:
+                if on_host <= host_limit:
+                    break
+                entry = self._resident[name]
+                if entry["device"] == "cpu":
+                    print(f"Unloading model {name}")
+                    self._resident.pop(name)
+                    on_host -= entry["bytes"]
+                    changed = True
+
+        if changed:
+            self._release_memory()
+
+    def _release_memory(self):
+        import gc
+        import torch
+
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def unload(self, name: str) -> bool:
+        """Drop a model from memory"""
+        name, _ = self.resolve(name)
+        with self._lock:
+            entry = self._resident.pop(name, None)
+        if entry is None:
+            return False
+        del entry
+        self._release_memory()
+        return True
+
+
+# Global instance
+model_registry = ModelRegistry()
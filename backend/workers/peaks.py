@@ -0,0 +1,217 @@
+"""
+Waveform Peaks - min/max pyramids for drawing long recordings
+"""
+from pathlib import Path
+from typing import Optional
+import os
+import threading
+
+import numpy as np
+
+from ..cache import LRUCache
+from ..config import PEAKS_DIR, PEAKS_SAMPLES_PER_PEAK, PEAKS_CACHE_SIZE, AUDIO_BLOCK_SECONDS
+from . import audio_io
+
+LEVEL_FACTOR = 4       # peaks merged per step up the pyramid
+MIN_LEVEL_PEAKS = 512  # the coarsest level still has at least this many peaks
+SCALE = 32767          # int16 full scale
+
+
+def _merge(mins: np.ndarray, maxs: np.ndarray, factor: int) -> tuple[np.ndarray, np.ndarray]:
+    """Combine every `factor` consecutive peaks into one"""
+    edges = np.arange(0, len(mins), factor)
+    return np.minimum.reduceat(mins, edges), np.maximum.reduceat(maxs, edges)
+
+
+class PeaksWorker:
+    """
+    Precomputed waveform peaks per uploaded file
+
+    The file is decoded block by block once (at upload) into a pyramid of
+    int16 min/max arrays: level 0 has one pair per PEAKS_SAMPLES_PER_PEAK
+    source samples, every level above is LEVEL_FACTOR times coarser. A
+    request for any window and pixel width is answered from the finest
+    level that is still at least as coarse as one pixel, so even a
+    multi-hour recording costs a few kB per view instead of the whole file.
+    Pyramids are stored as .npz under CACHE_DIR/peaks (about 4 bytes per
+    256 samples, e.g. 6 MB for three hours at 44.1 kHz) together with the
+    source size and mtime, so a replaced upload is rebuilt instead of
+    served stale; recently used ones are also kept in memory.
+    """
+
+    _instance: Optional["PeaksWorker"] = None
+    _lock = threading.Lock()
+    _building: dict[str, threading.Lock] = {}
+    _memory = LRUCache(PEAKS_CACHE_SIZE)
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    @staticmethod
+    def _path(file_id: str) -> Path:
+        return PEAKS_DIR / f"{Path(file_id).stem}.npz"
+
+    @staticmethod
+    def _source(audio_path: str) -> tuple[int, int]:
+        st = os.stat(audio_path)
+        return st.st_size, st.st_mtime_ns
+
+    def _cached(self, file_id: str, source: tuple[int, int]) -> Optional[dict]:
+        """Pyramid from memory or disk if it was built from this version of the file"""
+        pyramid = self._memory.get(file_id)
+        if pyramid is None or pyramid["source"] != source:
+            pyramid = self._read(file_id)
+            if pyramid is None or pyramid["source"] != source:
+                return None
+            self._memory.put(file_id, pyramid)
+        return pyramid
+
+    def build(self, file_id: str, audio_path: str) -> dict:
+        """Compute and store the pyramid for a file (once; concurrent callers wait)"""
+        with self._lock:
+            lock = self._building.setdefault(file_id, threading.Lock())
+
+        with lock:
+            source = self._source(audio_path)
+            pyramid = self._cached(file_id, source)
+            if pyramid is None:
+                pyramid = self._compute(audio_path)
+                pyramid["source"] = source
+                self._write(file_id, pyramid)
+                self._memory.put(file_id, pyramid)
+
+        with self._lock:
+            self._building.pop(file_id, None)
+        return pyramid
+
+    def _compute(self, audio_path: str) -> dict:
+        sample_rate, num_frames = audio_io.info(audio_path)
+        spp = PEAKS_SAMPLES_PER_PEAK
+        # Whole peaks per block, so blocks never split a peak
+        block_frames = max(1, int(AUDIO_BLOCK_SECONDS * sample_rate) // spp) * spp
+
+        mins, maxs = [], []
+        for block in audio_io.iter_blocks(audio_path, 0, num_frames / sample_rate, block_frames):
+            samples = block.numpy()
+            edges = np.arange(0, len(samples), spp)
+            mins.append(np.minimum.reduceat(samples, edges))
+            maxs.append(np.maximum.reduceat(samples, edges))
+
+        level_min = np.concatenate(mins) if mins else np.zeros(0, dtype=np.float32)
+        level_max = np.concatenate(maxs) if maxs else np.zeros(0, dtype=np.float32)
+        level_min = np.round(np.clip(level_min, -1, 1) * SCALE).astype(np.int16)
+        level_max = np.round(np.clip(level_max, -1, 1) * SCALE).astype(np.int16)
+
+        levels = [(level_min, level_max)]
+        while len(levels[-1][0]) > MIN_LEVEL_PEAKS * LEVEL_FACTOR:
+            levels.append(_merge(*levels[-1], LEVEL_FACTOR))
+
+        return {
+            "sampleRate": sample_rate,
+            "numFrames": num_frames,
+            "samplesPerPeak": spp,
+            "levels": levels,
+        }
+
+    def _write(self, file_id: str, pyramid: dict):
+        arrays = {}
+        for i, (level_min, level_max) in enumerate(pyramid["levels"]):
+            arrays[f"min_{i}"] = level_min
+            arrays[f"max_{i}"] = level_max
+
+        path = self._path(file_id)
+        tmp_path = path.with_suffix(".tmp.npz")
+        np.savez(
+            tmp_path,
+            sample_rate=pyramid["sampleRate"],
+            num_frames=pyramid["numFrames"],
+            samples_per_peak=pyramid["samplesPerPeak"],
+            source_size=pyramid["source"][0],
+            source_mtime_ns=pyramid["source"][1],
+            **arrays,
+        )
+        tmp_path.replace(path)
+
+    def _read(self, file_id: str) -> Optional[dict]:
+        path = self._path(file_id)
+        if not path.exists():
+            return None
+        try:
+            with np.load(path) as data:
+                levels = []
+                while f"min_{len(levels)}" in data:
+                    levels.append((data[f"min_{len(levels)}"], data[f"max_{len(levels)}"]))
+                return {
+                    "sampleRate": int(data["sample_rate"]),
+                    "numFrames": int(data["num_frames"]),
+                    "samplesPerPeak": int(data["samples_per_peak"]),
+                    "levels": levels,
+                    "source": (int(data["source_size"]), int(data["source_mtime_ns"])),
+                }
+        except (OSError, ValueError, KeyError):
+            path.unlink(missing_ok=True)
+            return None
+
+    def remove(self, file_id: str):
+        self._memory.pop(file_id)
+        self._path(file_id).unlink(missing_ok=True)
+
+    def peaks(
+        self,
+        file_id: str,
+        audio_path: str,
+        width: int,
+        start: float = 0.0,
+        end: Optional[float] = None,
+    ) -> dict:
+        """
+        Min/max peaks for [start, end) seconds at `width` pixels
+
+        Returns:
+            dict with the window actually covered, the source samples per
+            pixel, and int16 min / max lists of up to `width` values each
+        """
+        pyramid = self._cached(file_id, self._source(audio_path)) or self.build(file_id, audio_path)
+        sample_rate = pyramid["sampleRate"]
+        duration = pyramid["numFrames"] / sample_rate
+
+        end = duration if end is None else min(end, duration)
+        start = max(0.0, min(start, end))
+        first = int(start * sample_rate)
+        frames = int(end * sample_rate) - first
+
+        # Coarsest level that still has at least one peak per pixel
+        samples_per_pixel = frames / width if width else 0
+        level = 0
+        level_spp = pyramid["samplesPerPeak"]
+        while level + 1 < len(pyramid["levels"]) and level_spp * LEVEL_FACTOR <= samples_per_pixel:
+            level += 1
+            level_spp *= LEVEL_FACTOR
+
+        level_min, level_max = pyramid["levels"][level]
+        lo = min(first // level_spp, len(level_min))
+        hi = min(max(lo + 1, -(-(first + frames) // level_spp)), len(level_min))
+        window_min, window_max = level_min[lo:hi], level_max[lo:hi]
+
+        # Spread the level's peaks over `width` pixels
+        if len(window_min) > width:
+            edges = np.unique((np.arange(width) * len(window_min)) // width)
+            window_min = np.minimum.reduceat(window_min, edges)
+            window_max = np.maximum.reduceat(window_max, edges)
+
+        return {
+            "sampleRate": sample_rate,
+            "duration": duration,
+            "start": start,
+            "end": end,
+            "samplesPerPixel": frames / max(1, len(window_min)),
+            "bits": 16,
+            "min": window_min.tolist(),
+            "max": window_max.tolist(),
+        }
+
+
+# Global instance
+peaks_worker = PeaksWorker()
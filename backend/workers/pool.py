@@ -0,0 +1,436 @@
+"""
+Inference Pool - XTTS worker processes pinned to GPUs or CPU sets
+"""
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from typing import Iterator, Optional
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+import uuid
+
+from ..config import (
+    INFERENCE_POOL,
+    POOL_HEALTH_INTERVAL,
+    POOL_PING_TIMEOUT,
+    POOL_RESTART_BACKOFF,
+    POOL_RESTART_BACKOFF_MAX,
+    POOL_MAX_FAILED_STARTS,
+    WARMUP,
+)
+from .executor import RequestCancelledError
+
+
+class WorkerError(Exception):
+    """Synthesis failed inside a worker process"""
+
+
+class WorkerCrashedError(WorkerError):
+    """Worker process died while handling the request"""
+
+
+_STREAM_END = object()
+_env_lock = threading.Lock()
+
+
+def _parse_cpus(spec: str) -> Optional[list[int]]:
+    """"0-7+16-23" -> [0..7, 16..23]"""
+    if not spec:
+        return None
+    cpus = []
+    for part in spec.split("+"):
+        start, _, end = part.partition("-")
+        cpus.extend(range(int(start), int(end or start) + 1))
+    return cpus
+
+
+@contextmanager
+def _child_env(env: dict):
+    """
+    Temporarily patch os.environ so a spawned child starts with it
+
+    Config and torch read the environment at import time in the child,
+    before the process target runs, so it has to be set before start().
+    """
+    with _env_lock:
+        saved = {k: os.environ.get(k) for k in env}
+        os.environ.update(env)
+        try:
+            yield
+        finally:
+            for k, v in saved.items():
+                if v is None:
+                    os.environ.pop(k, None)
+                else:
+                    os.environ[k] = v
+
+
+def _worker_main(cpus: Optional[list[int]], warmup: bool, requests, responses):
+    """Worker process loop: load the default model, then serve requests"""
+    if cpus:
+        os.sched_setaffinity(0, cpus)
+
+    from .inference import inference_worker
+    from .models import model_registry
+
+    try:
+        started = time.perf_counter()
+        model_registry.get(None)
+        load_time = time.perf_counter() - started
+        if warmup:
+            inference_worker.warmup()
+        responses.put(("ready", None, {"pid": os.getpid(), "loadTime": load_time}))
+    except Exception as e:
+        responses.put(("failed", None, f"{type(e).__name__}: {e}"))
+        return
+
+    while True:
+        msg = requests.get()
+        if msg is None:
+            break
+
+        kind, req_id, payload = msg
+        if kind == "ping":
+            responses.put(("pong", req_id, None))
+            continue
+
+        try:
+            if kind == "generate_stream":
+                stats = {}
+                for chunk in inference_worker.generate_stream(**payload, stats=stats):
+                    responses.put(("chunk", req_id, chunk))
+                responses.put(("result", req_id, stats))
+            else:
+                result = getattr(inference_worker, kind)(**payload)
+                responses.put(("result", req_id, result))
+        except Exception as e:
+            responses.put(("error", req_id, f"{type(e).__name__}: {e}"))
+
+
+class _Pending:
+    def __init__(self, chunks: Optional[queue.Queue] = None):
+        self.future = Future()
+        self.chunks = chunks
+        self.started = time.monotonic()
+
+
+class _WorkerHandle:
+    def __init__(self, index: int, spec: str):
+        self.index = index
+        self.spec = spec
+        device, _, rest = spec.partition(":")
+        self.device = device
+        self.gpu = rest if device == "cuda" else None
+        self.cpus = _parse_cpus(rest) if device == "cpu" else None
+
+        self.process = None
+        self.requests = None
+        self.in_flight: dict[str, _Pending] = {}
+        self.ready = False
+        self.error: Optional[str] = None
+        self.load_time: Optional[float] = None
+        self.ping_sent: Optional[float] = None
+        self.last_pong: Optional[float] = None
+
+        self.completed = 0
+        self.failed = 0
+        self.restarts = 0
+        self.failed_starts = 0  # exits in a row without becoming ready
+        self.respawn_at: Optional[float] = None
+        self.given_up = False
+        self.last_latency: Optional[float] = None
+        self.total_latency = 0.0
+
+    def env(self) -> dict:
+        if self.device == "cuda":
+            return {"CUDA_VISIBLE_DEVICES": self.gpu or "0", "XTTS_DEVICE": "cuda"}
+        env = {"CUDA_VISIBLE_DEVICES": "", "XTTS_DEVICE": "cpu"}
+        if self.cpus and not os.getenv("XTTS_CPU_THREADS"):
+            env["XTTS_CPU_THREADS"] = str(len(self.cpus))
+        return env
+
+
+class InferenceWorkerPool:
+    """
+    Dispatches synthesis to a pool of worker processes
+
+    Each worker owns one device (a GPU via CUDA_VISIBLE_DEVICES, or a CPU set
+    via sched_setaffinity) and its own model registry. Requests go to the
+    ready worker with the fewest requests in flight. A monitor thread pings
+    idle workers and respawns any that exit or stop answering, with
+    exponential backoff; requests in flight on a crashed worker fail with
+    WorkerCrashedError. A worker that exits POOL_MAX_FAILED_STARTS times in
+    a row without loading its model is not respawned again and keeps its
+    error in stats().
+
+    Exposes generate / generate_long / generate_stream with the same
+    signatures as InferenceWorker.
+    """
+
+    def __init__(self, specs: list[str] = INFERENCE_POOL, warmup: bool = WARMUP):
+        self.specs = specs
+        self.warmup = warmup
+        self.workers = [_WorkerHandle(i, spec) for i, spec in enumerate(specs)]
+        self._ctx = mp.get_context("spawn")
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._running = False
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.specs)
+
+    # ---------- lifecycle ----------
+
+    def start(self):
+        if not self.enabled or self._running:
+            return
+        self._running = True
+        for handle in self.workers:
+            self._spawn(handle)
+        threading.Thread(target=self._monitor, name="inference-pool-monitor", daemon=True).start()
+
+    def stop(self):
+        self._running = False
+        for handle in self.workers:
+            if handle.process is not None and handle.process.is_alive():
+                handle.requests.put(None)
+        for handle in self.workers:
+            if handle.process is not None:
+                handle.process.join(timeout=10)
+                if handle.process.is_alive():
+                    handle.process.terminate()
+
+    def _spawn(self, handle: _WorkerHandle):
+        requests = self._ctx.Queue()
+        responses = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(handle.cpus, self.warmup, requests, responses),
+            name=f"xtts-worker-{handle.index}",
+            daemon=True,
+        )
+        with _child_env(handle.env()):
+            process.start()
+
+        # handle.error is kept until the new process reports ready, so
+        # _pick() does not route to a worker that keeps failing to load
+        with self._lock:
+            handle.process = process
+            handle.requests = requests
+            handle.ready = False
+            handle.ping_sent = None
+            handle.respawn_at = None
+
+        threading.Thread(
+            target=self._reader,
+            args=(handle, process, responses),
+            name=f"inference-pool-reader-{handle.index}",
+            daemon=True,
+        ).start()
+        print(f"Started inference worker {handle.index} ({handle.spec}), pid {process.pid}")
+
+    def _reader(self, handle: _WorkerHandle, process, responses):
+        """Route responses from one worker process to waiting requests"""
+        while self._running and handle.process is process:
+            try:
+                kind, req_id, payload = responses.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+
+            with self._lock:
+                if kind == "ready":
+                    handle.ready = True
+                    handle.error = None
+                    handle.failed_starts = 0
+                    handle.load_time = payload["loadTime"]
+                    self._ready.notify_all()
+                    continue
+                if kind == "failed":
+                    handle.error = payload
+                    self._ready.notify_all()
+                    continue
+                if kind == "pong":
+                    handle.ping_sent = None
+                    handle.last_pong = time.monotonic()
+                    continue
+
+                pending = handle.in_flight.get(req_id)
+                if pending is None:
+                    continue
+                if kind == "chunk":
+                    pending.chunks.put(payload)
+                    continue
+
+                handle.in_flight.pop(req_id)
+                latency = time.monotonic() - pending.started
+                if kind == "result":
+                    handle.completed += 1
+                    handle.last_latency = latency
+                    handle.total_latency += latency
+                else:
+                    handle.failed += 1
+
+            if kind == "result":
+                pending.future.set_result(payload)
+            else:
+                pending.future.set_exception(WorkerError(payload))
+            if pending.chunks is not None:
+                pending.chunks.put(_STREAM_END)
+
+    def _monitor(self):
+        """Respawn dead workers and ping idle ones"""
+        while self._running:
+            time.sleep(POOL_HEALTH_INTERVAL)
+            now = time.monotonic()
+
+            for handle in self.workers:
+                process = handle.process
+                if process is None:
+                    if self._running and handle.respawn_at is not None and now >= handle.respawn_at:
+                        self._spawn(handle)
+                    continue
+
+                if not process.is_alive():
+                    self._handle_crash(handle, f"exit code {process.exitcode}")
+                    continue
+
+                with self._lock:
+                    idle = handle.ready and not handle.in_flight
+                    ping_sent = handle.ping_sent
+                    if idle and ping_sent is None:
+                        handle.ping_sent = now
+                        handle.requests.put(("ping", None, None))
+
+                if ping_sent is not None and now - ping_sent > POOL_PING_TIMEOUT:
+                    print(f"Inference worker {handle.index} not responding, terminating")
+                    process.terminate()
+                    process.join(timeout=5)
+                    self._handle_crash(handle, "health check timed out")
+
+    def _handle_crash(self, handle: _WorkerHandle, reason: str):
+        with self._lock:
+            failed = list(handle.in_flight.values())
+            handle.in_flight.clear()
+            handle.failed += len(failed)
+            if not handle.ready:
+                handle.failed_starts += 1
+            handle.ready = False
+            handle.process = None
+            if handle.error is None:
+                handle.error = f"Worker exited: {reason}"
+
+            if handle.failed_starts >= POOL_MAX_FAILED_STARTS:
+                handle.given_up = True
+                print(
+                    f"Inference worker {handle.index} ({handle.spec}) died: {reason}; "
+                    f"failed to start {handle.failed_starts} times in a row, not respawning"
+                )
+            else:
+                delay = min(POOL_RESTART_BACKOFF * 2 ** max(0, handle.failed_starts - 1), POOL_RESTART_BACKOFF_MAX)
+                handle.respawn_at = time.monotonic() + delay
+                handle.restarts += 1
+                print(f"Inference worker {handle.index} ({handle.spec}) died: {reason}; respawning in {delay:.0f}s")
+
+        for pending in failed:
+            pending.future.set_exception(WorkerCrashedError(f"Inference worker crashed ({reason})"))
+            if pending.chunks is not None:
+                pending.chunks.put(_STREAM_END)
+
+    # ---------- dispatch ----------
+
+    def _pick(self) -> _WorkerHandle:
+        alive = [h for h in self.workers if h.process is not None and h.process.is_alive()]
+        candidates = [h for h in alive if h.ready] or [h for h in alive if h.error is None]
+        if not candidates:
+            raise WorkerError("No inference workers available")
+        return min(candidates, key=lambda h: len(h.in_flight))
+
+    def _submit(self, kind: str, payload: dict, chunks: Optional[queue.Queue] = None) -> _Pending:
+        req_id = uuid.uuid4().hex
+        pending = _Pending(chunks)
+        with self._lock:
+            handle = self._pick()
+            handle.in_flight[req_id] = pending
+            handle.requests.put((kind, req_id, payload))
+        return pending
+
+    @staticmethod
+    def _wait(pending: _Pending, cancel: Optional[threading.Event]):
+        """
+        Wait for a result, giving up when cancel is set
+
+        The worker process cannot be interrupted mid-request; it finishes
+        the item, but the calling inference thread is freed right away.
+        """
+        if cancel is None:
+            return pending.future.result()
+        while not cancel.is_set():
+            try:
+                return pending.future.result(timeout=0.25)
+            except FutureTimeoutError:
+                continue
+        raise RequestCancelledError("Request cancelled")
+
+    def generate(self, cancel: Optional[threading.Event] = None, **params) -> dict:
+        return self._wait(self._submit("generate", params), cancel)
+
+    def generate_long(self, cancel: Optional[threading.Event] = None, **params) -> dict:
+        return self._wait(self._submit("generate_long", params), cancel)
+
+    def generate_stream(self, stats: dict = None, **params) -> Iterator[bytes]:
+        chunks = queue.Queue()
+        pending = self._submit("generate_stream", params, chunks)
+        while True:
+            item = chunks.get()
+            if item is _STREAM_END:
+                break
+            yield item
+        result = pending.future.result()
+        if stats is not None:
+            stats.update(result)
+
+    # ---------- status ----------
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until every worker has loaded its model (or failed)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while not all(h.ready or h.error for h in self.workers):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._ready.wait(remaining)
+            return all(h.ready for h in self.workers)
+
+    def stats(self) -> list[dict]:
+        """Per-worker state and counters"""
+        with self._lock:
+            return [
+                {
+                    "index": h.index,
+                    "device": h.spec,
+                    "pid": h.process.pid if h.process else None,
+                    "alive": bool(h.process and h.process.is_alive()),
+                    "ready": h.ready,
+                    "error": h.error,
+                    "inFlight": len(h.in_flight),
+                    "completed": h.completed,
+                    "failed": h.failed,
+                    "restarts": h.restarts,
+                    "failedStarts": h.failed_starts,
+                    "givenUp": h.given_up,
+                    "loadTime": h.load_time,
+                    "lastLatency": h.last_latency,
+                    "avgLatency": h.total_latency / h.completed if h.completed else None,
+                }
+                for h in self.workers
+            ]
+
+
+# Global instance
+inference_pool = InferenceWorkerPool()
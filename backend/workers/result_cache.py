@@ -0,0 +1,177 @@
+"""
+Audio Result Cache - content-addressed reuse of generated audio
+"""
+from pathlib import Path
+from typing import Optional
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+
+from ..config import (
+    OUTPUT_DIR,
+    CACHE_DIR,
+    RESULT_CACHE_MAX_ENTRIES,
+    RESULT_CACHE_MAX_BYTES,
+    RESULT_CACHE_MAX_AGE,
+)
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form of input text for cache keys"""
+    text = unicodedata.normalize("NFC", text)
+    return " ".join(text.split())
+
+
+class AudioResultCache:
+    """
+    Maps synthesis requests to previously generated files in OUTPUT_DIR
+
+    Keys are hashes of normalized text, speaker content hash, language,
+    sampling parameters and model identity. Entries are persisted in a
+    SQLite table under CACHE_DIR, one row per put, so recording a result
+    never rewrites the whole index; they are evicted by age, count and
+    total size (least recently used first), deleting their audio files.
+    Methods do blocking IO and are meant to be called off the event loop.
+    """
+
+    def __init__(
+        self,
+        db_path: Path = CACHE_DIR / "audio_results.sqlite3",
+        max_entries: int = RESULT_CACHE_MAX_ENTRIES,
+        max_bytes: int = RESULT_CACHE_MAX_BYTES,
+        max_age: float = RESULT_CACHE_MAX_AGE,
+    ):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, filename TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created REAL NOT NULL, last_access REAL NOT NULL, result TEXT NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS results_access ON results (last_access)")
+
+        self._count, self._bytes = self._totals()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def _totals(self) -> tuple[int, int]:
+        count, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        return count, total
+
+    @staticmethod
+    def make_key(
+        text: str,
+        speaker_hash: str,
+        language: str,
+        model_id: str,
+        **sampling,
+    ) -> str:
+        """Cache key for a synthesis request"""
+        payload = json.dumps(
+            {
+                "text": normalize_text(text),
+                "speaker": speaker_hash,
+                "language": language,
+                "model": model_id,
+                "sampling": {k: sampling[k] for k in sorted(sampling)},
+            },
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return cached result dict, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT filename, created, result FROM results WHERE key = ?", (key,)).fetchone()
+            if row is not None and (now - row[1] > self.max_age or not (OUTPUT_DIR / row[0]).exists()):
+                self._drop_where("key = ?", (key,))
+                row = None
+
+            if row is None:
+                self._misses += 1
+                return None
+
+            self._hits += 1
+            self._db.execute("UPDATE results SET last_access = ? WHERE key = ?", (now, key))
+            return json.loads(row[2])
+
+    def put(self, key: str, result: dict):
+        """Record a freshly generated result (its file must already exist in OUTPUT_DIR)"""
+        filename = Path(result["audio_url"]).name
+        path = OUTPUT_DIR / filename
+        if not path.exists():
+            return
+
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results (key, filename, size, created, last_access, result) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, filename, path.stat().st_size, now, now, json.dumps(result, ensure_ascii=False)),
+            )
+            self._count, self._bytes = self._totals()
+            if self._count > self.max_entries or self._bytes > self.max_bytes:
+                self._evict(now)
+
+    def _drop_where(self, where: str, args: tuple) -> int:
+        """Delete matching rows and their audio files"""
+        rows = self._db.execute(f"SELECT filename FROM results WHERE {where}", args).fetchall()
+        self._db.execute(f"DELETE FROM results WHERE {where}", args)
+        for (filename,) in rows:
+            (OUTPUT_DIR / filename).unlink(missing_ok=True)
+        self._evictions += len(rows)
+        self._count, self._bytes = self._totals()
+        return len(rows)
+
+    def _evict(self, now: float):
+        self._drop_where("created < ?", (now - self.max_age,))
+        if self._count <= self.max_entries and self._bytes <= self.max_bytes:
+            return
+
+        # Least recently used first until both budgets hold
+        stale, count, total = [], self._count, self._bytes
+        for key, size in self._db.execute("SELECT key, size FROM results ORDER BY last_access"):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            stale.append(key)
+            count -= 1
+            total -= size
+        for i in range(0, len(stale), 500):
+            batch = stale[i:i + 500]
+            self._drop_where(f"key IN ({', '.join('?' * len(batch))})", tuple(batch))
+
+    def clear(self) -> int:
+        """Remove all entries and their files"""
+        with self._lock:
+            return self._drop_where("1", ())
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": self._count,
+                "bytes": self._bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hitRate": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "maxEntries": self.max_entries,
+                "maxBytes": self.max_bytes,
+                "maxAge": self.max_age,
+            }
+
+
+# Global instance
+audio_result_cache = AudioResultCache()
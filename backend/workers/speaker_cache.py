@@ -0,0 +1,123 @@
+"""
+Speaker Latent Cache - reuse XTTS conditioning latents between requests
+"""
+from pathlib import Path
+from typing import Optional
+import threading
+
+from ..cache import LRUCache, file_hash, cached_file_hash, forget_file_hash, short_key
+from ..config import SPEAKER_LATENT_CACHE_SIZE, SPEAKER_LATENT_CACHE_DIR
+
+
+class SpeakerLatentCache:
+    """
+    Two-level cache of (gpt_cond_latent, speaker_embedding) pairs
+
+    Entries are keyed by the reference audio content hash and the model id,
+    kept in an in-memory LRU and persisted as .pt files under CACHE_DIR so
+    they survive restarts.
+    """
+
+    def __init__(self, max_size: int = SPEAKER_LATENT_CACHE_SIZE, cache_dir: Path = SPEAKER_LATENT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._memory = LRUCache(max_size)
+        self._lock = threading.Lock()
+        # One computation per key at a time
+        self._key_locks: dict[tuple[str, str], threading.Lock] = {}
+
+    def _disk_path(self, content_hash: str, model_id: str) -> Path:
+        return self.cache_dir / f"{content_hash}-{short_key(model_id)}.pt"
+
+    def _key_lock(self, key: tuple[str, str]) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def get(self, model, model_id: str, speaker_wav: str) -> tuple:
+        """
+        Get conditioning latents for speaker_wav, computing them on a miss
+
+        Args:
+            model: Loaded Xtts model
+            model_id: Identifier of the loaded model
+            speaker_wav: Path to speaker reference audio
+
+        Returns:
+            (gpt_cond_latent, speaker_embedding) on the model device
+        """
+        import torch
+
+        content_hash = file_hash(speaker_wav)
+        key = (content_hash, model_id)
+
+        latents = self._memory.get(key)
+        if latents is not None:
+            return latents
+
+        with self._key_lock(key):
+            latents = self._memory.get(key)
+            if latents is not None:
+                return latents
+
+            disk_path = self._disk_path(content_hash, model_id)
+            if disk_path.exists():
+                try:
+                    data = torch.load(disk_path, map_location=model.device, weights_only=True)
+                    latents = (data["gpt_cond_latent"], data["speaker_embedding"])
+                except Exception as e:
+                    print(f"Discarding unreadable speaker latents {disk_path.name}: {e}")
+                    disk_path.unlink(missing_ok=True)
+
+            if latents is None:
+                config = model.config
+                gpt_cond_latent, speaker_embedding = model.get_conditioning_latents(
+                    audio_path=[speaker_wav],
+                    gpt_cond_len=config.gpt_cond_len,
+                    gpt_cond_chunk_len=config.gpt_cond_chunk_len,
+                    max_ref_length=config.max_ref_len,
+                    sound_norm_refs=config.sound_norm_refs,
+                )
+                latents = (gpt_cond_latent, speaker_embedding)
+
+                tmp_path = disk_path.with_suffix(".tmp")
+                torch.save(
+                    {
+                        "gpt_cond_latent": gpt_cond_latent.cpu(),
+                        "speaker_embedding": speaker_embedding.cpu(),
+                    },
+                    tmp_path,
+                )
+                tmp_path.replace(disk_path)
+
+            self._memory.put(key, latents)
+            return latents
+
+    def invalidate(self, speaker_wav: str | Path, content_hash: Optional[str] = None) -> int:
+        """
+        Drop all cached latents for a reference file, for every model
+
+        Call before the file is replaced so the old content hash is known.
+
+        Returns:
+            Number of disk entries removed
+        """
+        path = Path(speaker_wav)
+        if content_hash is None:
+            content_hash = cached_file_hash(path)
+            if content_hash is None and path.exists():
+                content_hash = file_hash(path)
+        forget_file_hash(path)
+
+        if content_hash is None:
+            return 0
+
+        self._memory.discard_where(lambda key: key[0] == content_hash)
+
+        removed = 0
+        for entry in self.cache_dir.glob(f"{content_hash}-*.pt"):
+            entry.unlink(missing_ok=True)
+            removed += 1
+        return removed
+
+
+# Global instance
+speaker_latent_cache = SpeakerLatentCache()
@@ -0,0 +1,266 @@
+"""
+Speaker Index - in-memory catalogue of reference voices in SPEAKERS_DIR
+"""
+from pathlib import Path
+from typing import Optional
+import json
+import threading
+import time
+
+from ..cache import file_hash
+from ..config import (
+    SPEAKERS_DIR,
+    CACHE_DIR,
+    SPEAKER_INDEX_POLL_INTERVAL,
+    SPEAKER_REF_SAMPLE_RATE,
+    SPEAKER_REF_MAX_SECONDS,
+    SPEAKER_REF_TRIM_DB,
+)
+
+AUDIO_EXTENSIONS = {".wav", ".mp3", ".flac", ".ogg", ".m4a"}
+
+
+def _probe(path: Path) -> dict:
+    """Duration / sample rate / channels without decoding the audio"""
+    import soundfile as sf
+
+    try:
+        info = sf.info(str(path))
+        return {"duration": info.duration, "sampleRate": info.samplerate, "channels": info.channels}
+    except Exception:
+        return {"duration": None, "sampleRate": None, "channels": None}
+
+
+def _trim_silence(wav, sample_rate: int, trim_db: float, frame_ms: int = 20, pad_ms: int = 100):
+    """Cut leading and trailing frames quieter than trim_db below the loudest frame"""
+    import numpy as np
+
+    frame = max(1, sample_rate * frame_ms // 1000)
+    n_frames = len(wav) // frame
+    if n_frames == 0:
+        return wav
+
+    rms = np.sqrt(np.mean(wav[:n_frames * frame].reshape(n_frames, frame) ** 2, axis=1))
+    peak = rms.max()
+    if peak <= 0:
+        return wav
+
+    loud = np.flatnonzero(rms >= peak * 10 ** (-trim_db / 20))
+    pad = sample_rate * pad_ms // 1000
+    start = max(0, loud[0] * frame - pad)
+    end = min(len(wav), (loud[-1] + 1) * frame + pad)
+    return wav[start:end]
+
+
+def normalize_reference(
+    source: Path,
+    dest: Path,
+    sample_rate: int = SPEAKER_REF_SAMPLE_RATE,
+    max_seconds: float = SPEAKER_REF_MAX_SECONDS,
+    trim_db: float = SPEAKER_REF_TRIM_DB,
+) -> dict:
+    """
+    Convert an uploaded reference to the canonical speaker format
+
+    Decodes any format torchaudio reads, downmixes to mono, trims leading and
+    trailing silence, keeps at most max_seconds and resamples to the rate
+    XTTS computes conditioning latents at, then writes mono PCM_16 WAV to
+    dest atomically. Synthesis then loads the reference without resampling.
+
+    Returns:
+        dict with source/canonical duration and sample rates
+    """
+    import soundfile as sf
+    import torch
+    import torchaudio
+
+    from . import audio_io
+
+    waveform, source_sr = torchaudio.load(str(source))
+    source_channels = waveform.shape[0]
+    source_duration = waveform.shape[1] / source_sr
+
+    if source_channels > 1:
+        waveform = waveform.mean(dim=0, keepdim=True)
+    wav = _trim_silence(waveform.squeeze(0).numpy(), source_sr, trim_db)
+    if len(wav) == 0:
+        raise ValueError("Reference audio is empty")
+
+    # Cap before resampling so long uploads are not resampled in full
+    wav = wav[:int(max_seconds * source_sr)]
+    if source_sr != sample_rate:
+        wav = audio_io.resample(torch.from_numpy(wav), source_sr, sample_rate).numpy()
+
+    tmp_path = dest.with_name(f".{dest.name}.tmp")
+    sf.write(str(tmp_path), wav, sample_rate, format="WAV", subtype="PCM_16")
+    tmp_path.replace(dest)
+
+    return {
+        "sourceDuration": source_duration,
+        "sourceSampleRate": source_sr,
+        "sourceChannels": source_channels,
+        "duration": len(wav) / sample_rate,
+        "sampleRate": sample_rate,
+    }
+
+
+class SpeakerIndex:
+    """
+    Name -> metadata index of speaker reference files
+
+    The index is built once (reusing the persisted copy in CACHE_DIR for
+    files whose size and mtime are unchanged), updated directly on upload,
+    and refreshed by a watcher thread that rescans only when the directory
+    mtime changes. Lookups by file name or stem are dict hits.
+
+    Each entry records duration, sample rate, channels, content hash and the
+    model ids whose conditioning latents have been precomputed.
+    """
+
+    def __init__(self, speakers_dir: Path = SPEAKERS_DIR, index_path: Path = CACHE_DIR / "speaker_index.json"):
+        self.speakers_dir = speakers_dir
+        self.index_path = index_path
+        self._lock = threading.RLock()
+        self._entries: dict[str, dict] = {}  # filename -> entry
+        self._by_stem: dict[str, str] = {}   # stem -> filename
+        self._dir_mtime: Optional[int] = None
+        self._built = False
+        self._watcher: Optional[threading.Thread] = None
+
+    # ---------- building ----------
+
+    def _load_persisted(self) -> dict:
+        if not self.index_path.exists():
+            return {}
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f, ensure_ascii=False)
+        tmp_path.replace(self.index_path)
+
+    def _make_entry(self, path: Path, previous: Optional[dict] = None) -> dict:
+        st = path.stat()
+        if previous and previous["size"] == st.st_size and previous["mtime"] == st.st_mtime_ns:
+            return previous
+
+        return {
+            "name": path.stem,
+            "filename": path.name,
+            "path": str(path),
+            "size": st.st_size,
+            "mtime": st.st_mtime_ns,
+            "hash": file_hash(path),
+            "conditioning": [],
+            **_probe(path),
+        }
+
+    def _rebuild_stems(self):
+        # Canonical .wav references win over same-named files in other formats
+        self._by_stem = {}
+        for filename in sorted(self._entries, key=lambda f: (Path(f).suffix.lower() != ".wav", f)):
+            self._by_stem.setdefault(Path(filename).stem, filename)
+
+    def rescan(self):
+        """Sync the index with the directory contents"""
+        with self._lock:
+            previous = self._entries or (self._load_persisted() if not self._built else {})
+            entries = {}
+            if self.speakers_dir.exists():
+                self._dir_mtime = self.speakers_dir.stat().st_mtime_ns
+                for path in self.speakers_dir.iterdir():
+                    if path.is_file() and path.suffix.lower() in AUDIO_EXTENSIONS:
+                        try:
+                            entries[path.name] = self._make_entry(path, previous.get(path.name))
+                        except OSError:
+                            continue
+
+            self._entries = entries
+            self._rebuild_stems()
+            self._built = True
+            self._save()
+
+    def _ensure_built(self):
+        if not self._built:
+            self.rescan()
+            self.start_watcher()
+
+    def build(self):
+        """Build the index and start the watcher (hashes files; call off the event loop)"""
+        self._ensure_built()
+
+    def start_watcher(self, interval: float = SPEAKER_INDEX_POLL_INTERVAL):
+        """Poll the directory mtime and rescan when files are added, removed or renamed"""
+        with self._lock:
+            if interval <= 0 or self._watcher is not None:
+                return
+            self._watcher = threading.Thread(target=self._watch, args=(interval,), name="speaker-index-watcher", daemon=True)
+        self._watcher.start()
+
+    def _watch(self, interval: float):
+        while True:
+            time.sleep(interval)
+            try:
+                mtime = self.speakers_dir.stat().st_mtime_ns
+            except OSError:
+                continue
+            if mtime != self._dir_mtime:
+                self.rescan()
+
+    # ---------- updates ----------
+
+    def add(self, path: Path) -> dict:
+        """Index (or re-index) one file, e.g. right after upload"""
+        self._ensure_built()
+        with self._lock:
+            entry = self._make_entry(path)
+            self._entries[path.name] = entry
+            self._rebuild_stems()
+            self._save()
+            return dict(entry)
+
+    def mark_conditioning(self, filename: str, model_id: str):
+        """Record that latents for model_id are in the speaker latent cache"""
+        with self._lock:
+            entry = self._entries.get(filename)
+            if entry is not None and model_id not in entry["conditioning"]:
+                entry["conditioning"].append(model_id)
+                self._save()
+
+    # ---------- lookups ----------
+
+    def get(self, name: str) -> Optional[dict]:
+        """Find a speaker by file name, stem, or path inside SPEAKERS_DIR"""
+        self._ensure_built()
+        path = Path(name)
+        if path.is_absolute():
+            try:
+                path = path.relative_to(self.speakers_dir)
+            except ValueError:
+                return None
+
+        # Only files directly in SPEAKERS_DIR are indexed; "originals/x.mp3"
+        # or "other/x.wav" must not match the speaker "x"
+        if len(path.parts) != 1:
+            return None
+        key = path.name
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                filename = self._by_stem.get(key)
+                entry = self._entries.get(filename) if filename else None
+            return dict(entry) if entry else None
+
+    def list(self) -> list[dict]:
+        self._ensure_built()
+        with self._lock:
+            return [dict(self._entries[k]) for k in sorted(self._entries)]
+
+
+# Global instance
+speaker_index = SpeakerIndex()
@@ -0,0 +1,161 @@
+"""
+Transcription Cache - Whisper results keyed by audio content
+"""
+from pathlib import Path
+from typing import BinaryIO, Optional
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from ..cache import file_hash
+from ..config import CACHE_DIR, TRANSCRIPTION_CACHE_MAX_ENTRIES, TRANSCRIPTION_CACHE_MAX_AGE
+
+
+def audio_hash(audio: "str | Path | BinaryIO | np.ndarray") -> str:
+    """
+    SHA-256 of the audio handed to Whisper
+
+    Paths hash the file bytes (memoized per size/mtime), file objects their
+    remaining bytes (the position is restored), and arrays their float32
+    samples.
+    """
+    if isinstance(audio, (str, Path)):
+        return file_hash(audio)
+    if isinstance(audio, np.ndarray):
+        return hashlib.sha256(np.ascontiguousarray(audio, dtype=np.float32).tobytes()).hexdigest()
+
+    position = audio.tell()
+    h = hashlib.sha256()
+    while block := audio.read(1 << 20):
+        h.update(block)
+    audio.seek(position)
+    return h.hexdigest()
+
+
+class TranscriptionCache:
+    """
+    Persistent Whisper results
+
+    Entries live in one SQLite table under CACHE_DIR, so lookups stay cheap
+    with hundreds of thousands of chunks and writes do not rewrite an index
+    file. Entries older than max_age are dropped on lookup and eviction;
+    beyond max_entries the least recently used go first. Every entry records
+    its model, so invalidate_model() drops all results of one Whisper model.
+    """
+
+    def __init__(
+        self,
+        db_path: Path = CACHE_DIR / "transcriptions.sqlite3",
+        max_entries: int = TRANSCRIPTION_CACHE_MAX_ENTRIES,
+        max_age: float = TRANSCRIPTION_CACHE_MAX_AGE,
+    ):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_age = max_age
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS transcriptions ("
+            "key TEXT PRIMARY KEY, model TEXT NOT NULL, result TEXT NOT NULL, "
+            "created REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS transcriptions_model ON transcriptions (model)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS transcriptions_access ON transcriptions (last_access)")
+        self._count = self._db.execute("SELECT COUNT(*) FROM transcriptions").fetchone()[0]
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def make_key(content_hash: str, model: str, compute_type: str, language: str, **options) -> str:
+        """Cache key for one transcription of one piece of audio"""
+        payload = json.dumps(
+            {
+                "audio": content_hash,
+                "model": model,
+                "computeType": compute_type,
+                "language": language,
+                "options": options,
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        """Cached result, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT result, created FROM transcriptions WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] > self.max_age:
+                self._delete("key = ?", (key,))
+                row = None
+
+            if row is None:
+                self._misses += 1
+                return None
+
+            self._hits += 1
+            self._db.execute("UPDATE transcriptions SET last_access = ? WHERE key = ?", (now, key))
+            return json.loads(row[0])
+
+    def put(self, key: str, model: str, result: dict):
+        now = time.time()
+        with self._lock:
+            exists = self._db.execute("SELECT 1 FROM transcriptions WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO transcriptions (key, model, result, created, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, model, json.dumps(result, ensure_ascii=False), now, now),
+            )
+            if exists is None:
+                self._count += 1
+            if self._count > self.max_entries:
+                self._evict(now)
+
+    def _delete(self, where: str, args: tuple) -> int:
+        removed = self._db.execute(f"DELETE FROM transcriptions WHERE {where}", args).rowcount
+        self._count = self._db.execute("SELECT COUNT(*) FROM transcriptions").fetchone()[0]
+        return removed
+
+    def _evict(self, now: float):
+        self._evictions += self._delete("created < ?", (now - self.max_age,))
+        excess = self._count - self.max_entries
+        if excess > 0:
+            self._evictions += self._delete(
+                "key IN (SELECT key FROM transcriptions ORDER BY last_access LIMIT ?)",
+                (excess,),
+            )
+
+    def invalidate_model(self, model: str) -> int:
+        """Drop every entry produced by the given Whisper model"""
+        with self._lock:
+            return self._delete("model = ?", (model,))
+
+    def clear(self) -> int:
+        with self._lock:
+            return self._delete("1", ())
+
+    def stats(self) -> dict:
+        with self._lock:
+            models = dict(self._db.execute("SELECT model, COUNT(*) FROM transcriptions GROUP BY model").fetchall())
+            lookups = self._hits + self._misses
+            return {
+                "entries": self._count,
+                "models": models,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hitRate": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "maxEntries": self.max_entries,
+                "maxAge": self.max_age,
+            }
+
+
+# Global instance
+transcription_cache = TranscriptionCache()
@@ -0,0 +1,74 @@
+"""
+Upload Index - file id -> path for files in UPLOAD_DIR
+"""
+from pathlib import Path
+from typing import Optional
+import threading
+
+from ..config import UPLOAD_DIR
+
+# Uploads are stored as <file id><extension>
+MEDIA_TYPES = {
+    ".wav": "audio/wav",
+    ".mp3": "audio/mpeg",
+    ".ogg": "audio/ogg",
+    ".flac": "audio/flac",
+    ".m4a": "audio/mp4",
+    ".aac": "audio/aac",
+}
+
+
+class UploadIndex:
+    """
+    Maps upload ids (file stems) and stored file names to paths
+
+    Built with one directory scan on first use and updated on upload.
+    Files written to UPLOAD_DIR by someone else (the dashboard saves
+    uploads there directly) are picked up by a rescan, which only runs on
+    a miss and only when the directory mtime has changed, so a lookup is a
+    dict hit instead of probing the disk once per extension.
+    """
+
+    def __init__(self, upload_dir: Path = UPLOAD_DIR):
+        self.upload_dir = upload_dir
+        self._lock = threading.Lock()
+        self._paths: dict[str, Path] = {}  # stem and file name -> path
+        self._dir_mtime: Optional[int] = None
+
+    def _rescan(self):
+        try:
+            mtime = self.upload_dir.stat().st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._dir_mtime:
+            return
+
+        paths = {}
+        for path in self.upload_dir.iterdir():
+            if path.is_file() and path.suffix.lower() in MEDIA_TYPES:
+                paths.setdefault(path.stem, path)
+                paths[path.name] = path
+        self._paths = paths
+        self._dir_mtime = mtime
+
+    def add(self, path: Path):
+        with self._lock:
+            self._paths.setdefault(path.stem, path)
+            self._paths[path.name] = path
+
+    def get(self, file_id: str) -> Optional[Path]:
+        """Path for an upload id or stored file name, or None"""
+        if Path(file_id).name != file_id:
+            return None
+
+        with self._lock:
+            path = self._paths.get(file_id)
+            if path is None or not path.exists():
+                self._paths.pop(file_id, None)
+                self._rescan()
+                path = self._paths.get(file_id)
+            return path
+
+
+# Global instance
+upload_index = UploadIndex()
@@ -5,12 +5,91 @@ from pathlib import Path
 from typing import Optional
 import uuid
 import json
+import threading
+import time
 
+import numpy as np
 import torch
-import torchaudio
-import soundfile as sf
 
-from ..config import DATASETS_DIR
+from ..config import DATASETS_DIR, VAD_STREAM_THRESHOLD, AUDIO_BLOCK_SECONDS, VAD_ENGINE, WHISPER_BATCH_SIZE
+from .. import metrics
+from . import audio_io
+from .chunk_writer import ChunkWriter
+from .vad_cache import vad_cache
+
+VAD_SAMPLE_RATE = 16000
+VAD_WINDOW = 512  # samples per Silero frame at 16 kHz
+
+
+def speech_segments(
+    probs,
+    num_samples: int,
+    threshold: float = 0.5,
+    min_silence_duration_ms: int = 100,
+    min_speech_duration_ms: int = 250,
+    speech_pad_ms: int = 30,
+    window: int = VAD_WINDOW,
+    sampling_rate: int = VAD_SAMPLE_RATE,
+) -> list[dict]:
+    """
+    Turn per-frame speech probabilities into speech segments
+
+    Same hysteresis, minimum durations and padding as Silero's
+    get_speech_timestamps (without max_speech_duration), computed with
+    array operations instead of a per-frame loop: a segment opens at a frame
+    >= threshold and closes at the first frame < threshold - 0.15 of a gap
+    between loud frames if that gap holds quiet frames spanning at least
+    min_silence_duration_ms. Re-running it with new settings on cached
+    probabilities takes milliseconds even for hours of audio.
+
+    Returns:
+        [{"start", "end"}] in samples at sampling_rate
+    """
+    probs = np.asarray(probs)
+    neg_threshold = max(threshold - 0.15, 0.01)
+    min_speech_samples = sampling_rate * min_speech_duration_ms / 1000
+    min_silence_samples = sampling_rate * min_silence_duration_ms / 1000
+    speech_pad_samples = sampling_rate * speech_pad_ms / 1000
+
+    loud = np.flatnonzero(probs >= threshold)
+    if len(loud) == 0:
+        return []
+    quiet = np.flatnonzero(probs < neg_threshold)
+
+    # Gaps after each loud frame: up to the next loud frame, or to the end
+    gap_lo = loud + 1
+    gap_hi = np.append(loud[1:], len(probs))
+    first = np.searchsorted(quiet, gap_lo)
+    last = np.searchsorted(quiet, gap_hi) - 1
+    has_quiet = first <= last
+    first_quiet = quiet[np.minimum(first, len(quiet) - 1)] if len(quiet) else gap_lo
+    last_quiet = quiet[np.maximum(last, 0)] if len(quiet) else gap_lo
+    closes = has_quiet & ((last_quiet - first_quiet) * window >= min_silence_samples)
+
+    # Segments run from a loud frame after a closing gap to the next closing gap
+    closing = np.flatnonzero(closes)
+    starts = np.append(loud[0], loud[closing[closing < len(loud) - 1] + 1]) * window
+    ends = first_quiet[closing] * window
+    if not closes[-1]:
+        ends = np.append(ends, num_samples)
+
+    keep = ends - starts > min_speech_samples
+    starts, ends = starts[keep], ends[keep]
+    if len(starts) == 0:
+        return []
+
+    # Pad segments, splitting short gaps between neighbours
+    silence = starts[1:] - ends[:-1]
+    short = silence < 2 * speech_pad_samples
+    half = silence // 2
+    padded_starts = starts.copy()
+    padded_ends = ends.copy()
+    padded_ends[:-1] = np.where(short, ends[:-1] + half, np.minimum(num_samples, ends[:-1] + speech_pad_samples))
+    padded_starts[1:] = np.where(short, np.maximum(0, starts[1:] - half), np.maximum(0, starts[1:] - speech_pad_samples))
+    padded_starts[0] = max(0, starts[0] - speech_pad_samples)
+    padded_ends[-1] = min(num_samples, ends[-1] + speech_pad_samples)
+
+    return [{"start": int(s), "end": int(e)} for s, e in zip(padded_starts, padded_ends)]
 
 
 class VADWorker:
@@ -19,6 +98,9 @@ class VADWorker:
     _instance: Optional["VADWorker"] = None
     _model = None
     _utils = None
+    _onnx = None
+    load_time: Optional[float] = None
+    _load_lock = threading.Lock()
 
     def __new__(cls):
         if cls._instance is None:
@@ -26,21 +108,199 @@ class VADWorker:
         return cls._instance
 
     def _load_model(self):
-        """Lazy load Silero VAD model"""
-        if self._model is None:
-            print("Loading Silero VAD model...")
-            torch.set_num_threads(1)
-
-            self._model, self._utils = torch.hub.load(
-                repo_or_dir="snakers4/silero-vad",
-                model="silero_vad",
-                force_reload=False,
-                onnx=False,
-                trust_repo=True,
+        """Lazy load Silero VAD model (ONNX engine when available, else torch.hub)"""
+        with self._load_lock:
+            if self._onnx is None and self._model is None:
+                started = time.perf_counter()
+                if VAD_ENGINE == "onnx":
+                    self._onnx = self._load_onnx()
+                if self._onnx is None:
+                    print("Loading Silero VAD model...")
+                    self._model, self._utils = torch.hub.load(
+                        repo_or_dir="snakers4/silero-vad",
+                        model="silero_vad",
+                        force_reload=False,
+                        onnx=False,
+                        trust_repo=True,
+                    )
+                self.load_time = time.perf_counter() - started
+                print(f"Silero VAD model loaded in {self.load_time:.1f}s ({self.engine})")
+
+        return self._onnx or self._model
+
+    def _load_onnx(self):
+        from .vad_onnx import SileroOnnx, find_model
+
+        model_path = find_model()
+        if model_path is None:
+            print("Silero ONNX model not found locally (set VAD_ONNX_MODEL); falling back to torch.hub")
+            return None
+        try:
+            print(f"Loading Silero VAD model: {model_path}")
+            return SileroOnnx(model_path)
+        except ImportError:
+            print("onnxruntime is not installed; falling back to torch.hub")
+        except Exception as e:
+            print(f"Could not load {model_path}: {e}; falling back to torch.hub")
+        return None
+
+    @property
+    def engine(self) -> Optional[str]:
+        if self._onnx is not None:
+            return "onnx"
+        return "torch" if self._model is not None else None
+
+    @property
+    def engine_key(self) -> str:
+        """Engine and the settings that change its probabilities, for cache keys"""
+        self._load_model()
+        if self._onnx is not None and self._onnx.lanes > 1:
+            return f"onnx-lanes{self._onnx.lanes}-overlap{self._onnx.overlap}"
+        return self.engine
+
+    @property
+    def loaded(self) -> bool:
+        return self.engine is not None
+
+    def warmup(self):
+        """Run VAD over one second of silence"""
+        self._frame_probabilities([torch.zeros(VAD_SAMPLE_RATE)])
+
+    def _load_range(self, audio_path: str, range_start: float, range_end: float) -> tuple:
+        """Decode only the requested range (seeking, not loading the whole file) as mono (1, N)"""
+        waveform, sample_rate = audio_io.read_range(audio_path, range_start, range_end)
+        return waveform.unsqueeze(0), sample_rate
+
+    def _frame_probabilities(self, blocks_16k) -> tuple:
+        """
+        Run Silero over a stream of 16 kHz blocks, one 512-sample frame at a time
+
+        The model state carries across blocks, so block boundaries do not
+        affect the result. Only the per-frame probabilities are kept.
+
+        Returns:
+            (probabilities, total samples seen)
+        """
+        model = self._load_model()
+        if self._onnx is not None:
+            return self._onnx.probabilities(blocks_16k)
+
+        # The model's recurrent state must not build an autograd graph
+        # across an hour of frames
+        with torch.inference_mode():
+            model.reset_states()
+
+            probs = []
+            num_samples = 0
+            leftover = torch.zeros(0)
+            for block in blocks_16k:
+                num_samples += block.numel()
+                block = torch.cat([leftover, block]) if leftover.numel() else block
+                usable = block.numel() - block.numel() % VAD_WINDOW
+                for offset in range(0, usable, VAD_WINDOW):
+                    probs.append(model(block[offset:offset + VAD_WINDOW], VAD_SAMPLE_RATE).item())
+                leftover = block[usable:]
+
+            # Last partial frame is zero-padded, as get_speech_timestamps does
+            if leftover.numel():
+                frame = torch.nn.functional.pad(leftover, (0, VAD_WINDOW - leftover.numel()))
+                probs.append(model(frame, VAD_SAMPLE_RATE).item())
+
+        return probs, num_samples
+
+    def _probabilities(
+        self,
+        audio_path: str,
+        range_start: float,
+        range_end: float,
+        loaded: Optional[tuple] = None,
+    ) -> dict:
+        """
+        Per-frame speech probabilities of a range, computed once and cached
+
+        On a miss, ranges longer than VAD_STREAM_THRESHOLD are decoded,
+        resampled and run through VAD in AUDIO_BLOCK_SECONDS blocks, so
+        memory does not grow with the range length.
+
+        Args:
+            loaded: (waveform, sample_rate) already decoded by the caller;
+                    decoded here on a cache miss otherwise
+
+        Returns:
+            dict with probs, numSamples (at 16 kHz) and sampleRate (of the source)
+        """
+        key = vad_cache.make_key(audio_path, range_start, range_end, self.engine_key)
+        cached = vad_cache.get(key)
+        if cached is not None:
+            return cached
+
+        if loaded is None and range_end - range_start > VAD_STREAM_THRESHOLD:
+            sample_rate, _ = audio_io.info(audio_path)
+            blocks = audio_io.iter_blocks(
+                audio_path,
+                range_start,
+                range_end,
+                audio_io.block_frames_for(AUDIO_BLOCK_SECONDS, sample_rate, VAD_SAMPLE_RATE),
             )
-            print("Silero VAD model loaded")
+            blocks_16k = audio_io.resample_blocks(blocks, sample_rate, VAD_SAMPLE_RATE)
+        else:
+            waveform, sample_rate = loaded or self._load_range(audio_path, range_start, range_end)
+
+            # Resample to 16kHz for VAD
+            blocks_16k = [audio_io.resample(waveform[0], sample_rate, VAD_SAMPLE_RATE)]
 
-        return self._model, self._utils
+        vad_started = time.perf_counter()
+        probs, num_samples = self._frame_probabilities(blocks_16k)
+        metrics.observe_processing("vad", num_samples / VAD_SAMPLE_RATE, time.perf_counter() - vad_started)
+
+        return vad_cache.put(key, probs, num_samples, sample_rate)
+
+    def _speech_timestamps(
+        self,
+        audio_path: str,
+        range_start: float,
+        range_end: float,
+        vad_config: dict,
+        loaded: Optional[tuple] = None,
+    ) -> dict:
+        """
+        Speech segments of a range for the given VAD settings
+
+        Only the frame probabilities are expensive; they are cached per range,
+        so changing silenceThreshold / minSilenceDuration is a NumPy pass.
+
+        Returns:
+            dict with sampleRate and timestamps ({"start", "end"} in samples
+            at sampleRate, relative to range_start)
+        """
+        frames = self._probabilities(audio_path, range_start, range_end, loaded)
+        sample_rate = frames["sampleRate"]
+
+        speech_timestamps = speech_segments(
+            frames["probs"],
+            frames["numSamples"],
+            threshold=vad_config.get("silenceThreshold", 0.5),
+            min_silence_duration_ms=int(vad_config.get("minSilenceDuration", 0.5) * 1000),
+        )
+
+        # Convert timestamps to original sample rate
+        scale = sample_rate / VAD_SAMPLE_RATE
+        return {
+            "sampleRate": sample_rate,
+            "timestamps": [
+                {"start": int(ts["start"] * scale), "end": int(ts["end"] * scale)}
+                for ts in speech_timestamps
+            ],
+        }
+
+    def _chunks(self, speech: dict, vad_config: dict) -> list:
+        return self._build_chunks(
+            speech["timestamps"],
+            speech["sampleRate"],
+            vad_config.get("minChunkDuration", 6),
+            vad_config.get("targetChunkDuration", 10),
+            vad_config.get("maxChunkDuration", 15),
+        )
 
     def analyze(
         self,
@@ -61,58 +321,11 @@ class VADWorker:
         Returns:
             dict with chunks preview and statistics
         """
-        model, utils = self._load_model()
-        get_speech_timestamps = utils[0]
-
-        # VAD config
-        min_chunk_duration = vad_config.get("minChunkDuration", 6)
-        target_chunk_duration = vad_config.get("targetChunkDuration", 10)
-        max_chunk_duration = vad_config.get("maxChunkDuration", 15)
-        min_silence_duration = vad_config.get("minSilenceDuration", 0.5)
-        silence_threshold = vad_config.get("silenceThreshold", 0.5)
-
-        # Load audio
-        waveform, sample_rate = torchaudio.load(audio_path)
-
-        # Convert to mono
-        if waveform.shape[0] > 1:
-            waveform = waveform.mean(dim=0, keepdim=True)
-
-        # Trim to range
-        start_sample = int(range_start * sample_rate)
-        end_sample = int(range_end * sample_rate)
-        waveform = waveform[:, start_sample:end_sample]
-
-        # Resample to 16kHz for VAD
-        if sample_rate != 16000:
-            resampler = torchaudio.transforms.Resample(sample_rate, 16000)
-            waveform_16k = resampler(waveform)
-        else:
-            waveform_16k = waveform
-
-        # Get speech timestamps
-        speech_timestamps = get_speech_timestamps(
-            waveform_16k.squeeze(),
-            model,
-            threshold=silence_threshold,
-            min_silence_duration_ms=int(min_silence_duration * 1000),
-            sampling_rate=16000,
-        )
-
-        # Convert timestamps to original sample rate
-        scale = sample_rate / 16000
-        for ts in speech_timestamps:
-            ts["start"] = int(ts["start"] * scale)
-            ts["end"] = int(ts["end"] * scale)
+        speech = self._speech_timestamps(audio_path, range_start, range_end, vad_config)
+        sample_rate = speech["sampleRate"]
 
         # Build chunks
-        chunks = self._build_chunks(
-            speech_timestamps,
-            sample_rate,
-            min_chunk_duration,
-            target_chunk_duration,
-            max_chunk_duration,
-        )
+        chunks = self._chunks(speech, vad_config)
 
         # Convert to time-based info
         chunk_infos = []
@@ -215,37 +428,57 @@ class VADWorker:
         auto_transcribe: bool = False,
         language: str = "ru",
         on_progress: callable = None,
+        output_format: str = "wav",
+        sharded: bool = False,
     ) -> dict:
         """
         Process audio: chunk and optionally transcribe
 
+        Args:
+            output_format: "wav" (PCM_16) or "flac" chunk files
+            sharded: Append chunks to a few large shard files with an offset
+                     index (index.json) instead of writing one file per chunk;
+                     export only, training needs per-chunk files
+
         Returns:
             dict with datasetId and chunks
         """
-        # Analyze first
-        if on_progress:
-            on_progress(5, "Analyzing audio with VAD...")
+        output_sr = 22050
+        streaming = range_end - range_start > VAD_STREAM_THRESHOLD
 
-        preview = self.analyze(audio_path, range_start, range_end, vad_config)
+        if streaming:
+            # Long range: block-wise VAD, then each chunk is decoded and
+            # resampled on its own, so the whole range is never in memory
+            if on_progress:
+                on_progress(5, "Analyzing audio with VAD...")
+            speech = self._speech_timestamps(audio_path, range_start, range_end, vad_config)
+            sample_rate = speech["sampleRate"]
+            range_offset = int(range_start * sample_rate)
+
+            def read_region(start: int, end: int) -> tuple[torch.Tensor, int]:
+                # Decode the chunk plus a resampling margin on each side
+                lo = max(0, range_offset + start - audio_io.REGION_MARGIN)
+                audio, _ = audio_io.read_frames(audio_path, lo, range_offset + end + audio_io.REGION_MARGIN - lo)
+                return audio, range_offset + start - lo
+        else:
+            if on_progress:
+                on_progress(5, "Loading audio...")
 
-        # Load audio
-        waveform, sample_rate = torchaudio.load(audio_path)
-        if waveform.shape[0] > 1:
-            waveform = waveform.mean(dim=0, keepdim=True)
+            # Decode once: the 16 kHz VAD input (on a probability cache miss)
+            # and the 22.05 kHz chunk output both come from this waveform
+            waveform, sample_rate = self._load_range(audio_path, range_start, range_end)
 
-        # Trim to range
-        start_sample = int(range_start * sample_rate)
-        end_sample = int(range_end * sample_rate)
-        waveform = waveform[:, start_sample:end_sample]
+            if on_progress:
+                on_progress(10, "Analyzing audio with VAD...")
 
-        # Resample to 22050Hz for XTTS
-        if sample_rate != 22050:
-            resampler = torchaudio.transforms.Resample(sample_rate, 22050)
-            waveform_output = resampler(waveform)
-            output_sr = 22050
-        else:
-            waveform_output = waveform
-            output_sr = sample_rate
+            speech = self._speech_timestamps(
+                audio_path, range_start, range_end, vad_config, loaded=(waveform, sample_rate)
+            )
+
+            def read_region(start: int, end: int) -> tuple[torch.Tensor, int]:
+                return waveform[0], start
+
+        chunks = self._chunks(speech, vad_config)
 
         # Create dataset
         dataset_id = f"chunks_{uuid.uuid4().hex[:8]}"
@@ -255,94 +488,63 @@ class VADWorker:
         if on_progress:
             on_progress(20, "Splitting audio into chunks...")
 
-        # Re-analyze with sample info
-        model, utils = self._load_model()
-        get_speech_timestamps = utils[0]
-
-        min_chunk_duration = vad_config.get("minChunkDuration", 6)
-        target_chunk_duration = vad_config.get("targetChunkDuration", 10)
-        max_chunk_duration = vad_config.get("maxChunkDuration", 15)
-        min_silence_duration = vad_config.get("minSilenceDuration", 0.5)
-        silence_threshold = vad_config.get("silenceThreshold", 0.5)
-
-        # Get timestamps at 16kHz
-        if sample_rate != 16000:
-            resampler_16k = torchaudio.transforms.Resample(sample_rate, 16000)
-            waveform_16k = resampler_16k(waveform)
-        else:
-            waveform_16k = waveform
-
-        speech_timestamps = get_speech_timestamps(
-            waveform_16k.squeeze(),
-            model,
-            threshold=silence_threshold,
-            min_silence_duration_ms=int(min_silence_duration * 1000),
-            sampling_rate=16000,
-        )
-
-        # Scale to original rate
-        scale = sample_rate / 16000
-        for ts in speech_timestamps:
-            ts["start"] = int(ts["start"] * scale)
-            ts["end"] = int(ts["end"] * scale)
-
-        chunks = self._build_chunks(
-            speech_timestamps,
-            sample_rate,
-            min_chunk_duration,
-            target_chunk_duration,
-            max_chunk_duration,
-        )
-
-        # Output scale
-        output_scale = output_sr / sample_rate
-
         result_chunks = []
         total_chunks = len(chunks)
+        transcriptions = {}
+        pending_speech = []  # (chunk index, 16 kHz audio) awaiting a Whisper batch
 
-        for i, chunk in enumerate(chunks):
-            if on_progress:
-                progress = 20 + int((60 * (i + 1)) / total_chunks)
-                on_progress(progress, f"Processing chunk {i + 1}/{total_chunks}...")
-
-            chunk_filename = f"chunk_{str(i + 1).zfill(3)}.wav"
-            chunk_path = dataset_path / chunk_filename
-
-            # Extract chunk
-            start_out = int(chunk["start_sample"] * output_scale)
-            end_out = int(chunk["end_sample"] * output_scale)
-            chunk_audio = waveform_output[:, start_out:end_out]
-
-            # Save
-            sf.write(
-                str(chunk_path),
-                chunk_audio.squeeze().numpy(),
-                output_sr,
-                subtype="PCM_16",
-            )
-
-            duration = (chunk["end_sample"] - chunk["start_sample"]) / sample_rate
-            result_chunks.append({
-                "filename": chunk_filename,
-                "duration": duration,
-            })
-
-        # Transcribe if needed
         if auto_transcribe:
-            if on_progress:
-                on_progress(85, "Transcribing chunks with Whisper...")
-
             from .whisper import whisper_worker
 
-            for chunk_result in result_chunks:
-                chunk_path = dataset_path / chunk_result["filename"]
-                try:
-                    result = whisper_worker.transcribe(str(chunk_path), language)
-                    transcription = " ".join([seg["text"] for seg in result["segments"]])
-                    chunk_result["transcription"] = transcription
-                except Exception as e:
-                    chunk_result["transcription"] = f"[Error: {str(e)}]"
+        def transcribe_pending():
+            try:
+                texts = whisper_worker.transcribe_batch([audio for _, audio in pending_speech], language)
+            except Exception as e:
+                texts = [f"[Error: {str(e)}]"] * len(pending_speech)
+            for (index, _), text in zip(pending_speech, texts):
+                transcriptions[index] = text
+            pending_speech.clear()
+
+        def report(finished: list[dict]):
+            result_chunks.extend(finished)
+            if on_progress and finished:
+                done = len(result_chunks)
+                progress = 20 + int((60 * done) / total_chunks)
+                on_progress(progress, f"Processing chunk {done}/{total_chunks}...")
+
+        # Slicing/resampling stays here; encoding and writes run on the pool.
+        # Only speech regions are resampled (to 22050Hz for XTTS and, when
+        # transcribing, to 16kHz for Whisper); silence is never converted.
+        writer = ChunkWriter(dataset_path, output_sr, output_format, sharded)
+        try:
+            for i, chunk in enumerate(chunks):
+                chunk_filename = f"chunk_{str(i + 1).zfill(3)}.{output_format}"
+
+                # Extract chunk
+                start, end = chunk["start_sample"], chunk["end_sample"]
+                audio, offset = read_region(start, end)
+                chunk_audio = audio_io.resample_region(audio, offset, offset + end - start, sample_rate, output_sr)
+                report(writer.add(chunk_filename, chunk_audio.numpy()))
+
+                # Whisper gets the in-memory audio in batches, no file round trip
+                if auto_transcribe:
+                    speech_16k = audio_io.resample_region(audio, offset, offset + end - start, sample_rate, 16000)
+                    pending_speech.append((i, speech_16k.numpy()))
+                    if len(pending_speech) >= WHISPER_BATCH_SIZE:
+                        transcribe_pending()
+
+            if pending_speech:
+                transcribe_pending()
+            report(writer.flush())
+        finally:
+            writer.close()
+
+        for i, (chunk, chunk_result) in enumerate(zip(chunks, result_chunks)):
+            chunk_result["duration"] = (chunk["end_sample"] - chunk["start_sample"]) / sample_rate
+            if auto_transcribe:
+                chunk_result["transcription"] = transcriptions[i]
 
+        if auto_transcribe:
             # Save metadata
             metadata = {
                 "language": language,
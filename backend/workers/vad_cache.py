@@ -0,0 +1,116 @@
+"""
+VAD Cache - per-frame speech probabilities, reused across VAD settings
+"""
+from pathlib import Path
+from typing import Optional
+import os
+import threading
+
+import numpy as np
+
+from ..cache import LRUCache, file_hash, short_key
+from ..config import VAD_CACHE_SIZE, VAD_CACHE_DIR, VAD_CACHE_MAX_BYTES
+
+
+class VADCache:
+    """
+    Silero frame probabilities keyed by audio content, range and engine
+
+    Threshold, silence and chunk-size settings are not part of the key:
+    segments and chunks are recomputed from the cached probabilities,
+    which takes milliseconds, so re-tuning VAD settings for the same range
+    never reruns decoding, resampling or the model.
+
+    Arrays live in an in-memory LRU and in .npz files under CACHE_DIR/vad,
+    so they survive restarts (about 1.3 MB per hour of audio). Once the
+    files exceed max_bytes, the least recently used are deleted; reads
+    touch a file's mtime, which serves as its last-use time.
+    """
+
+    def __init__(
+        self,
+        max_size: int = VAD_CACHE_SIZE,
+        cache_dir: Path = VAD_CACHE_DIR,
+        max_bytes: int = VAD_CACHE_MAX_BYTES,
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._memory = LRUCache(max_size)
+        self._disk_lock = threading.Lock()
+        self._disk_bytes: Optional[int] = None  # summed lazily on the first put
+
+    def make_key(self, audio_path: str, range_start: float, range_end: float, engine: str) -> str:
+        """engine identifies the model and settings that produced the probabilities"""
+        parts = [file_hash(audio_path), f"{range_start:.3f}", f"{range_end:.3f}", engine]
+        return short_key("|".join(parts), 32)
+
+    def get(self, key: str) -> Optional[dict]:
+        """{"probs": float32 array, "numSamples": 16 kHz samples, "sampleRate": source rate} or None"""
+        entry = self._memory.get(key)
+        if entry is not None:
+            return entry
+
+        path = self.cache_dir / f"{key}.npz"
+        if not path.exists():
+            return None
+        try:
+            with np.load(path) as data:
+                entry = {
+                    "probs": data["probs"],
+                    "numSamples": int(data["num_samples"]),
+                    "sampleRate": int(data["sample_rate"]),
+                }
+        except (OSError, ValueError, KeyError):
+            path.unlink(missing_ok=True)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self._memory.put(key, entry)
+        return entry
+
+    def put(self, key: str, probs, num_samples: int, sample_rate: int) -> dict:
+        entry = {
+            "probs": np.asarray(probs, dtype=np.float32),
+            "numSamples": num_samples,
+            "sampleRate": sample_rate,
+        }
+        self._memory.put(key, entry)
+
+        path = self.cache_dir / f"{key}.npz"
+        tmp_path = self.cache_dir / f"{key}.tmp.npz"
+        np.savez(tmp_path, probs=entry["probs"], num_samples=num_samples, sample_rate=sample_rate)
+        tmp_path.replace(path)
+        self._account(path.stat().st_size)
+        return entry
+
+    def _account(self, added: int):
+        """Track disk usage and evict least recently used files over max_bytes"""
+        with self._disk_lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += added
+                if self._disk_bytes <= self.max_bytes:
+                    return
+
+            files = []
+            for p in self.cache_dir.glob("*.npz"):
+                try:
+                    st = p.stat()
+                except OSError:
+                    continue
+                files.append((st.st_mtime, st.st_size, p))
+            files.sort()
+
+            # Evicted keys stay valid in the in-memory LRU until it drops them
+            total = sum(size for _, size, _ in files)
+            for _, size, p in files:
+                if total <= self.max_bytes:
+                    break
+                p.unlink(missing_ok=True)
+                total -= size
+            self._disk_bytes = total
+
+
+# Global instance
+vad_cache = VADCache()
@@ -0,0 +1,178 @@
+"""
+Silero VAD on ONNX Runtime - batched frame scoring with its own thread pool
+"""
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+
+from ..config import VAD_ONNX_MODEL, VAD_ONNX_THREADS, VAD_ONNX_LANES, VAD_ONNX_LANE_OVERLAP
+
+SAMPLE_RATE = 16000
+WINDOW = 512   # samples per frame
+CONTEXT = 64   # samples of the previous frame the v5 model sees
+STATE_SHAPE = (2, 1, 128)
+
+# Smallest lane worth splitting off; shorter audio runs as a single lane
+MIN_LANE_FRAMES = 256
+
+
+def find_model() -> Optional[Path]:
+    """
+    Locate silero_vad.onnx without touching the network
+
+    Checked in order: VAD_ONNX_MODEL, the silero-vad pip package data, and
+    the torch hub cache left by an earlier torch.hub.load of silero-vad.
+    """
+    candidates = []
+    if VAD_ONNX_MODEL:
+        candidates.append(Path(VAD_ONNX_MODEL))
+
+    try:
+        from importlib.resources import files
+        candidates.append(Path(str(files("silero_vad") / "data" / "silero_vad.onnx")))
+    except (ImportError, ModuleNotFoundError, TypeError):
+        pass
+
+    try:
+        import torch
+        hub_repo = Path(torch.hub.get_dir()) / "snakers4_silero-vad_master"
+        candidates += [
+            hub_repo / "src" / "silero_vad" / "data" / "silero_vad.onnx",
+            hub_repo / "files" / "silero_vad.onnx",
+        ]
+    except ImportError:
+        pass
+
+    return next((p for p in candidates if p.is_file()), None)
+
+
+class SileroOnnx:
+    """
+    Silero VAD v5 scored with ONNX Runtime
+
+    The model is recurrent, so frames of one stream must be scored in order.
+    With lanes=1 (the default) the state is carried through every frame
+    and the probabilities are those of the sequential torch pass.
+
+    lanes > 1 is an opt-in approximation for throughput: each block is
+    split into up to `lanes` contiguous lanes scored side by side (one ONNX
+    call per time step for all lanes). Every lane except the first starts
+    `overlap` frames early with fresh state and drops those probabilities,
+    so its state only approximately converges to the sequential one and
+    speech boundaries may shift. The first lane continues the state of the
+    previous block's last lane exactly.
+
+    The session uses its own intra-op thread count and does not touch
+    torch's global thread settings.
+    """
+
+    def __init__(
+        self,
+        model_path: Path,
+        threads: int = VAD_ONNX_THREADS,
+        lanes: int = VAD_ONNX_LANES,
+        overlap: int = VAD_ONNX_LANE_OVERLAP,
+    ):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        self.session = ort.InferenceSession(str(model_path), sess_options=options, providers=["CPUExecutionProvider"])
+
+        inputs = {i.name for i in self.session.get_inputs()}
+        if inputs != {"input", "state", "sr"}:
+            raise ValueError(f"{model_path} is not a Silero VAD v5 model (inputs: {', '.join(sorted(inputs))})")
+
+        self.model_path = model_path
+        self.lanes = max(1, lanes)
+        self.overlap = max(0, overlap)
+        self._sr = np.array(SAMPLE_RATE, dtype=np.int64)
+
+    def _run(self, frames: np.ndarray, state: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Score one (batch, CONTEXT + WINDOW) step"""
+        out, state = self.session.run(None, {"input": frames, "state": state, "sr": self._sr})
+        return out[:, 0], state
+
+    def _score_block(self, audio: np.ndarray, context: np.ndarray, state: np.ndarray) -> tuple:
+        """
+        Score a block of whole frames
+
+        Args:
+            audio: float32 samples, a multiple of WINDOW long
+            context: last CONTEXT samples before the block
+            state: model state after the previous block
+
+        Returns:
+            (probabilities, context after the block, state after the block)
+        """
+        n_frames = len(audio) // WINDOW
+        lanes = max(1, min(self.lanes, n_frames // MIN_LANE_FRAMES))
+
+        # Each frame together with the CONTEXT samples preceding it
+        padded = np.concatenate([context, audio])
+        windows = np.lib.stride_tricks.sliding_window_view(padded, CONTEXT + WINDOW)[::WINDOW]
+
+        bounds = np.linspace(0, n_frames, lanes + 1).astype(int)
+        starts = [0] + [max(0, b - self.overlap) for b in bounds[1:-1]]
+        ends = bounds[1:]
+        steps = max(e - s for s, e in zip(starts, ends))
+
+        batch_state = np.zeros((2, lanes, 128), dtype=np.float32)
+        batch_state[:, 0] = state[:, 0]
+        probs = np.zeros((lanes, steps), dtype=np.float32)
+        last_state = None
+
+        starts_arr = np.array(starts)
+        for t in range(steps):
+            # Lanes that already ran out of frames are fed silence
+            frames = starts_arr + t
+            valid = frames < ends
+            batch = np.where(valid[:, None], windows[np.minimum(frames, n_frames - 1)], 0.0).astype(np.float32)
+            probs[:, t], batch_state = self._run(batch, batch_state)
+            if t == ends[-1] - starts[-1] - 1:
+                last_state = batch_state[:, lanes - 1:lanes].copy()
+
+        result = np.concatenate([
+            probs[lane, bounds[lane] - starts[lane]:ends[lane] - starts[lane]]
+            for lane in range(lanes)
+        ])
+        return result, padded[-CONTEXT:].copy(), last_state
+
+    def probabilities(self, blocks_16k: Iterable) -> tuple[np.ndarray, int]:
+        """
+        Speech probability for every WINDOW-sample frame of a 16 kHz stream
+
+        Args:
+            blocks_16k: 1D float32 blocks (numpy arrays or torch tensors)
+
+        Returns:
+            (probabilities, total samples seen)
+        """
+        state = np.zeros(STATE_SHAPE, dtype=np.float32)
+        context = np.zeros(CONTEXT, dtype=np.float32)
+        leftover = np.zeros(0, dtype=np.float32)
+        chunks = []
+        num_samples = 0
+
+        for block in blocks_16k:
+            block = np.asarray(block, dtype=np.float32)
+            num_samples += len(block)
+            audio = np.concatenate([leftover, block]) if len(leftover) else block
+            usable = len(audio) - len(audio) % WINDOW
+            if usable:
+                probs, context, state = self._score_block(audio[:usable], context, state)
+                chunks.append(probs)
+            leftover = audio[usable:]
+
+        # Last partial frame is zero-padded, as get_speech_timestamps does
+        if len(leftover):
+            frame = np.zeros(WINDOW, dtype=np.float32)
+            frame[:len(leftover)] = leftover
+            window = np.concatenate([context, frame])[None, :]
+            prob, _ = self._run(window, state)
+            chunks.append(prob)
+
+        return (np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.float32)), num_samples
@@ -1,11 +1,29 @@
 """
 Whisper Worker - Audio transcription using faster-whisper
 """
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Optional
 import json
+import threading
+import time
 
-from ..config import WHISPER_MODEL, WHISPER_DEVICE, WHISPER_COMPUTE_TYPE, DATASETS_DIR
+from ..config import (
+    WHISPER_MODEL,
+    WHISPER_DEVICE,
+    WHISPER_COMPUTE_TYPE,
+    WHISPER_BATCH_SIZE,
+    WHISPER_BATCH_BEAM_SIZE,
+    WHISPER_DEVICE_INDEX,
+    WHISPER_NUM_WORKERS,
+    WHISPER_DECODE_WORKERS,
+    DATASETS_DIR,
+)
+from .transcription_cache import transcription_cache, audio_hash
+from .. import metrics
+
+# Decode options that change the output and so belong in cache keys
+TRANSCRIBE_OPTIONS = {"beam_size": 5, "vad_filter": True}
 
 
 class WhisperWorker:
@@ -13,6 +31,8 @@ class WhisperWorker:
 
     _instance: Optional["WhisperWorker"] = None
     _model = None
+    load_time: Optional[float] = None
+    _load_lock = threading.Lock()
 
     def __new__(cls):
         if cls._instance is None:
@@ -21,35 +41,71 @@ class WhisperWorker:
 
     def _load_model(self):
         """Lazy load Whisper model"""
-        if self._model is None:
-            from faster_whisper import WhisperModel
-            print(f"Loading Whisper model: {WHISPER_MODEL}")
-            self._model = WhisperModel(
-                WHISPER_MODEL,
-                device=WHISPER_DEVICE,
-                compute_type=WHISPER_COMPUTE_TYPE,
-            )
-            print("Whisper model loaded")
+        with self._load_lock:
+            if self._model is None:
+                from faster_whisper import WhisperModel
+                print(f"Loading Whisper model: {WHISPER_MODEL}")
+                started = time.perf_counter()
+                self._model = WhisperModel(
+                    WHISPER_MODEL,
+                    device=WHISPER_DEVICE,
+                    compute_type=WHISPER_COMPUTE_TYPE,
+                    device_index=WHISPER_DEVICE_INDEX,
+                    num_workers=WHISPER_NUM_WORKERS,
+                )
+                self.load_time = time.perf_counter() - started
+                print(f"Whisper model loaded in {self.load_time:.1f}s")
         return self._model
 
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    @property
+    def parallelism(self) -> int:
+        """Transcriptions the model can run at once (replicas x workers each)"""
+        return max(1, len(WHISPER_DEVICE_INDEX)) * max(1, WHISPER_NUM_WORKERS)
+
+    def warmup(self):
+        """Run one short transcription so kernels and buffers are initialized"""
+        import numpy as np
+
+        model = self._load_model()
+        segments, _ = model.transcribe(np.zeros(16000, dtype=np.float32), beam_size=1)
+        list(segments)
+
+    @staticmethod
+    def cache_key(content_hash: str, language: str, **options) -> str:
+        return transcription_cache.make_key(content_hash, WHISPER_MODEL, WHISPER_COMPUTE_TYPE, language, **options)
+
     def transcribe(
         self,
-        audio_path: str,
+        audio_path: "str | BinaryIO | np.ndarray",
         language: str = "ru",
+        content_hash: Optional[str] = None,
     ) -> dict:
         """
-        Transcribe audio file
+        Transcribe audio file (a path, a file object, or already decoded
+        16 kHz samples)
+
+        Results are cached by audio content; pass content_hash when it is
+        already known (e.g. the hash of the file the samples came from).
 
         Returns:
             dict with segments and language info
         """
+        key = self.cache_key(content_hash or audio_hash(audio_path), language, **TRANSCRIBE_OPTIONS)
+        cached = transcription_cache.get(key)
+        if cached is not None:
+            return cached
+
         model = self._load_model()
+        started = time.perf_counter()
 
         segments, info = model.transcribe(
             audio_path,
             language=language,
-            beam_size=5,
-            vad_filter=True,
+            **TRANSCRIBE_OPTIONS,
         )
 
         result_segments = []
@@ -59,13 +115,99 @@ class WhisperWorker:
                 "end": segment.end,
                 "text": segment.text.strip(),
             })
+        metrics.observe_processing("whisper", info.duration, time.perf_counter() - started)
 
-        return {
+        result = {
             "language": info.language,
             "language_probability": info.language_probability,
             "duration": info.duration,
             "segments": result_segments,
         }
+        transcription_cache.put(key, WHISPER_MODEL, result)
+        return result
+
+    def transcribe_batch(
+        self,
+        chunks: list,
+        language: str = "ru",
+        batch_size: int = WHISPER_BATCH_SIZE,
+        beam_size: int = WHISPER_BATCH_BEAM_SIZE,
+    ) -> list[str]:
+        """
+        Transcribe in-memory speech chunks, several per model call
+
+        For audio that is already cut into speech-only pieces (VAD chunks):
+        no file IO, no Whisper VAD filter, and each group of batch_size
+        chunks is encoded and decoded in one batched CTranslate2 call, one
+        chunk per batch row. Chunks longer than Whisper's 30 s window are
+        transcribed on their own with vad_filter=False. Chunks whose samples
+        were transcribed before come from the cache, so re-chunking a file
+        only transcribes the chunks that changed.
+
+        Args:
+            chunks: 1D float32 arrays at 16 kHz
+
+        Returns:
+            text per chunk, in input order
+        """
+        import ctranslate2
+        import numpy as np
+        from faster_whisper.tokenizer import Tokenizer
+
+        texts = [""] * len(chunks)
+        keys = [self.cache_key(audio_hash(chunk), language, beam_size=beam_size, mode="chunk") for chunk in chunks]
+        todo = []
+        for i, key in enumerate(keys):
+            cached = transcription_cache.get(key)
+            if cached is not None:
+                texts[i] = cached["text"]
+            else:
+                todo.append(i)
+        if not todo:
+            return texts
+
+        model = self._load_model()
+        started = time.perf_counter()
+
+        window = model.feature_extractor.n_samples
+        frames = model.feature_extractor.nb_max_frames
+        tokenizer = Tokenizer(model.hf_tokenizer, model.model.is_multilingual, task="transcribe", language=language)
+        prompt = list(tokenizer.sot_sequence) + [tokenizer.no_timestamps]
+
+        short = [i for i in todo if len(chunks[i]) <= window]
+
+        for group_start in range(0, len(short), batch_size):
+            group = short[group_start:group_start + batch_size]
+            features = np.stack([
+                model.feature_extractor(np.pad(np.asarray(chunks[i], dtype=np.float32), (0, window - len(chunks[i]))))[:, :frames]
+                for i in group
+            ])
+            results = model.model.generate(
+                ctranslate2.StorageView.from_array(np.ascontiguousarray(features, dtype=np.float32)),
+                [prompt] * len(group),
+                beam_size=beam_size,
+                max_length=model.max_length,
+                suppress_blank=True,
+                suppress_tokens=[-1],
+            )
+            for i, result in zip(group, results):
+                texts[i] = tokenizer.decode(result.sequences_ids[0]).strip()
+
+        for i in todo:
+            if len(chunks[i]) > window:
+                segments, _ = model.transcribe(
+                    np.asarray(chunks[i], dtype=np.float32),
+                    language=language,
+                    beam_size=beam_size,
+                    vad_filter=False,
+                )
+                texts[i] = " ".join(segment.text.strip() for segment in segments)
+
+        audio_seconds = sum(len(chunks[i]) for i in todo) / 16000
+        metrics.observe_processing("whisper", audio_seconds, time.perf_counter() - started)
+        for i in todo:
+            transcription_cache.put(keys[i], WHISPER_MODEL, {"text": texts[i]})
+        return texts
 
     def process_files(
         self,
@@ -76,6 +218,13 @@ class WhisperWorker:
         """
         Process multiple audio files
 
+        Files are decoded to 16 kHz on a pool of WHISPER_DECODE_WORKERS
+        threads and transcribed on `parallelism` threads, which CTranslate2
+        spreads over the model replicas. Only a bounded number of files is
+        decoded ahead, a file that fails gets an error entry without holding
+        up the others, and results keep the order of `files`. Files already
+        in the transcription cache are neither decoded nor transcribed.
+
         Args:
             files: List of {"id": str, "path": str, "filename": str}
             language: Target language
@@ -84,28 +233,75 @@ class WhisperWorker:
         Returns:
             dict with dataset_id and results
         """
-        results = []
+        from faster_whisper import decode_audio
+
+        def prepare(path: str) -> tuple:
+            """(content hash, cached result or None, 16 kHz samples or None)"""
+            content_hash = audio_hash(path)
+            cached = transcription_cache.get(self.cache_key(content_hash, language, **TRANSCRIBE_OPTIONS))
+            if cached is not None:
+                return content_hash, cached, None
+            return content_hash, None, decode_audio(path, sampling_rate=16000)
+
         total = len(files)
+        results: list[Optional[dict]] = [None] * total
+        model_workers = self.parallelism
+        depth = WHISPER_DECODE_WORKERS + 2 * model_workers
+        pending = iter(enumerate(files))
+        decoding = {}
+        transcribing = {}
+        finished = 0
 
-        for i, file_info in enumerate(files):
-            if on_progress:
-                progress = int((i / total) * 100)
-                on_progress(progress, f"Processing {file_info['filename']}...")
-
-            try:
-                transcription = self.transcribe(file_info["path"], language)
-                results.append({
-                    "audio_id": file_info["id"],
-                    "filename": file_info["filename"],
-                    "language": transcription["language"],
-                    "segments": transcription["segments"],
-                })
-            except Exception as e:
-                results.append({
-                    "audio_id": file_info["id"],
-                    "filename": file_info["filename"],
-                    "error": str(e),
-                })
+        def failed(i: int, e: Exception) -> dict:
+            return {"audio_id": files[i]["id"], "filename": files[i]["filename"], "error": str(e)}
+
+        if on_progress:
+            on_progress(0, f"Processing {total} files...")
+
+        with ThreadPoolExecutor(WHISPER_DECODE_WORKERS, thread_name_prefix="whisper-decode") as decoders, \
+                ThreadPoolExecutor(model_workers, thread_name_prefix="whisper-transcribe") as transcribers:
+            while True:
+                while len(decoding) + len(transcribing) < depth:
+                    item = next(pending, None)
+                    if item is None:
+                        break
+                    i, file_info = item
+                    decoding[decoders.submit(prepare, file_info["path"])] = i
+                if not decoding and not transcribing:
+                    break
+
+                done, _ = wait([*decoding, *transcribing], return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in decoding:
+                        i = decoding.pop(future)
+                        try:
+                            content_hash, transcription, audio = future.result()
+                        except Exception as e:
+                            results[i] = failed(i, e)
+                            transcription = None
+                        else:
+                            if transcription is None:
+                                transcribing[transcribers.submit(self.transcribe, audio, language, content_hash)] = i
+                                continue
+                    else:
+                        i = transcribing.pop(future)
+                        try:
+                            transcription = future.result()
+                        except Exception as e:
+                            results[i] = failed(i, e)
+                            transcription = None
+
+                    if transcription is not None:
+                        results[i] = {
+                            "audio_id": files[i]["id"],
+                            "filename": files[i]["filename"],
+                            "language": transcription["language"],
+                            "segments": transcription["segments"],
+                        }
+
+                    finished += 1
+                    if on_progress:
+                        on_progress(int((finished / total) * 100), f"Processed {files[i]['filename']} ({finished}/{total})")
 
         # Save dataset
         if results:
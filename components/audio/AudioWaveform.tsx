@@ -6,6 +6,7 @@ import RegionsPlugin, { Region } from 'wavesurfer.js/dist/plugins/regions';
 
 interface AudioWaveformProps {
   audioUrl: string;
+  peaksUrl?: string;
   onReady?: (duration: number) => void;
   onTimeUpdate?: (currentTime: number) => void;
   onRegionUpdate?: (start: number, end: number) => void;
@@ -17,6 +18,7 @@ interface AudioWaveformProps {
 
 export function AudioWaveform({
   audioUrl,
+  peaksUrl,
   onReady,
   onTimeUpdate,
   onRegionUpdate,
@@ -90,12 +92,42 @@ export function AudioWaveform({
       onRegionUpdate?.(region.start, region.end);
     });
 
-    ws.load(audioUrl);
+    // Draw from precomputed peaks so long files are streamed for playback
+    // instead of downloaded and decoded in the browser
+    let cancelled = false;
+    const load = async () => {
+      if (peaksUrl && containerRef.current) {
+        try {
+          const width = Math.min(
+            20000,
+            Math.ceil(containerRef.current.clientWidth * (window.devicePixelRatio || 1)) || 1000
+          );
+          const response = await fetch(`${peaksUrl}?width=${width}`);
+          const result = await response.json();
+          if (response.ok && result.success) {
+            const { min, max, duration, bits } = result.data;
+            const scale = 2 ** (bits - 1);
+            const channel = new Float32Array(min.length * 2);
+            for (let i = 0; i < min.length; i++) {
+              channel[2 * i] = min[i] / scale;
+              channel[2 * i + 1] = max[i] / scale;
+            }
+            if (!cancelled) ws.load(audioUrl, [channel], duration);
+            return;
+          }
+        } catch {
+          // Fall back to decoding the whole file
+        }
+      }
+      if (!cancelled) ws.load(audioUrl);
+    };
+    load();
 
     return () => {
+      cancelled = true;
       ws.destroy();
     };
-  }, [audioUrl]);
+  }, [audioUrl, peaksUrl]);
 
   // Sync play state
   useEffect(() => {
@@ -24,6 +24,7 @@ interface LongAudioProcessorProps {
   audioId: string;
   audioPath: string;
   audioUrl: string;
+  peaksUrl?: string;
   filename: string;
   onComplete?: (result: ChunkingJob['result']) => void;
   onCancel?: () => void;
@@ -57,6 +58,7 @@ export function LongAudioProcessor({
   audioId,
   audioPath,
   audioUrl,
+  peaksUrl,
   filename,
   onComplete,
   onCancel,
@@ -285,6 +287,7 @@ export function LongAudioProcessor({
             <div className="space-y-2">
               <AudioWaveform
                 audioUrl={audioUrl}
+                peaksUrl={peaksUrl}
                 onReady={handleWaveformReady}
                 onRegionUpdate={handleRegionUpdate}
                 regionStart={range.start}